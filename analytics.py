@@ -0,0 +1,239 @@
+"""
+Aggregate statistics over the analysis history, to compare text models.
+
+Everything is computed by SQLite over the columns of the HistoryIndex
+(entries and items tables) with GROUP BY and window functions, so the
+history is never loaded into Python objects one entry at a time.
+"""
+
+PERCENTILES = (50, 95)
+
+
+def _percentiles(index, column, where="1"):
+    """
+    {model: {pct: value}} of `column` per text model (nearest rank).
+    """
+    pcts = ", ".join(f"({p})" for p in PERCENTILES)
+    out = {}
+    for model, pct, value in index.query(
+        f"""
+        WITH ranked AS (
+            SELECT text_model, {column} AS value,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY text_model ORDER BY {column}
+                   ) AS rank,
+                   COUNT(*) OVER (PARTITION BY text_model) AS n
+            FROM entries
+            WHERE {column} IS NOT NULL AND {where}
+        ),
+        pcts(p) AS (VALUES {pcts})
+        SELECT text_model, p, value FROM ranked
+        JOIN pcts ON rank = MAX(1, (n * p + 99) / 100)
+        """
+    ):
+        out.setdefault(model, {})[pct] = value
+    return out
+
+
+def score_distribution(index, bucket=10):
+    """
+    Per text model: count, errors, mean, standard deviation, min, max,
+    median and a histogram of pontuacao_final in `bucket`-point bins.
+    """
+    models = {}
+    for model, count, errors, scored, mean, mean_sq, low, high in index.query(
+        """
+        SELECT text_model, COUNT(*), SUM(error), COUNT(score), AVG(score),
+               AVG(score * score), MIN(score), MAX(score)
+        FROM entries GROUP BY text_model
+        """
+    ):
+        std = max(0.0, mean_sq - mean * mean) ** 0.5 if scored else None
+        models[model] = {
+            "count": count,
+            "errors": errors,
+            "scored": scored,
+            "mean": mean,
+            "std": std,
+            "min": low,
+            "max": high,
+            "median": None,
+            "bucket": bucket,
+            "histogram": {},
+        }
+    for model, values in _percentiles(index, "score").items():
+        models[model]["median"] = values.get(50)
+    for model, low, count in index.query(
+        """
+        SELECT text_model, CAST(score / ? AS INTEGER) * ?, COUNT(*)
+        FROM entries WHERE score IS NOT NULL
+        GROUP BY 1, 2 ORDER BY 1, 2
+        """,
+        (bucket, bucket),
+    ):
+        models[model]["histogram"][int(low)] = count
+    return models
+
+
+def status_rates(index):
+    """
+    {model: {item: {status: share}}}: how often each text model gives each
+    status to each requirement (statuses case/accent folded).
+    """
+    rates = {}
+    for model, item, status, share in index.query(
+        """
+        SELECT e.text_model, MIN(i.label), i.status,
+               COUNT(*) * 1.0 / SUM(COUNT(*)) OVER (
+                   PARTITION BY e.text_model, i.item
+               )
+        FROM items i JOIN entries e ON e.id = i.id
+        GROUP BY e.text_model, i.item, i.status ORDER BY 1, 2, 4 DESC
+        """
+    ):
+        rates.setdefault(model, {}).setdefault(item, {})[status] = share
+    return rates
+
+
+def latency_by_model(index):
+    """
+    Per text model: analyses with metrics, mean/p50/p95 total seconds and
+    response tokens generated per second of analysis.
+    """
+    latency = {}
+    for model, count, mean, tokens_rate in index.query(
+        """
+        SELECT text_model, COUNT(seconds), AVG(seconds),
+               SUM(response_tokens) / SUM(CASE WHEN response_tokens IS NOT NULL
+                                              THEN seconds END)
+        FROM entries WHERE seconds > 0 GROUP BY text_model
+        """
+    ):
+        latency[model] = {
+            "count": count,
+            "mean": mean,
+            "tokens_per_second": tokens_rate,
+        }
+    for model, values in _percentiles(index, "seconds", "seconds > 0").items():
+        for p, value in values.items():
+            latency[model][f"p{p}"] = value
+    return latency
+
+
+def model_agreement(index):
+    """
+    For each pair of text models that analyzed the same files (latest entry
+    per file and model): shared files, mean absolute score difference and
+    the share of requirements given the same status.
+    """
+    latest = """
+        latest AS (
+            SELECT path, text_model, MAX(id) AS id FROM entries
+            WHERE error = 0 GROUP BY path, text_model
+        ),
+        pairs AS (
+            SELECT a.text_model AS model_a, b.text_model AS model_b,
+                   a.id AS id_a, b.id AS id_b
+            FROM latest a JOIN latest b
+              ON a.path = b.path AND a.text_model < b.text_model
+        )
+    """
+    agreement = {}
+    for model_a, model_b, files, diff in index.query(
+        f"""
+        WITH {latest}
+        SELECT model_a, model_b, COUNT(*), AVG(ABS(ea.score - eb.score))
+        FROM pairs JOIN entries ea ON ea.id = id_a JOIN entries eb ON eb.id = id_b
+        GROUP BY 1, 2
+        """
+    ):
+        agreement[(model_a, model_b)] = {
+            "files": files,
+            "score_diff": diff,
+            "status_agreement": None,
+        }
+    for model_a, model_b, same in index.query(
+        f"""
+        WITH {latest}
+        SELECT model_a, model_b, AVG(ia.status = ib.status)
+        FROM pairs
+        JOIN items ia ON ia.id = id_a
+        JOIN items ib ON ib.id = id_b AND ib.item = ia.item
+        GROUP BY 1, 2
+        """
+    ):
+        agreement[(model_a, model_b)]["status_agreement"] = same
+    return agreement
+
+
+def summary(index):
+    index.sync()
+    return {
+        "scores": score_distribution(index),
+        "status_rates": status_rates(index),
+        "latency": latency_by_model(index),
+        "agreement": model_agreement(index),
+    }
+
+
+def _fmt(value, spec=".1f"):
+    return "-" if value is None else format(value, spec)
+
+
+def format_report(data):
+    """
+    Plain-text report of summary() for the GUI tab and the CLI.
+    """
+    lines = ["Pontuação final por modelo", ""]
+    lines.append(
+        f"{'Modelo':<18}{'n':>6}{'erros':>7}{'média':>8}{'desvio':>8}"
+        f"{'mediana':>9}{'mín':>6}{'máx':>6}"
+    )
+    for model, s in sorted(data["scores"].items()):
+        lines.append(
+            f"{model:<18}{s['count']:>6}{s['errors']:>7}{_fmt(s['mean']):>8}"
+            f"{_fmt(s['std']):>8}{_fmt(s['median']):>9}"
+            f"{_fmt(s['min'], '.0f'):>6}{_fmt(s['max'], '.0f'):>6}"
+        )
+    for model, s in sorted(data["scores"].items()):
+        if not s["histogram"]:
+            continue
+        lines.append("")
+        lines.append(f"Distribuição — {model}")
+        top = max(s["histogram"].values())
+        for low, count in sorted(s["histogram"].items()):
+            bar = "#" * max(1, round(30 * count / top))
+            high = low + s["bucket"] - 1
+            lines.append(f"  {low:>3}-{high:<3} {count:>6} {bar}")
+
+    lines += ["", "Tempo por análise", ""]
+    lines.append(
+        f"{'Modelo':<18}{'n':>6}{'média s':>9}{'p50 s':>8}{'p95 s':>8}{'tokens/s':>10}"
+    )
+    for model, s in sorted(data["latency"].items()):
+        lines.append(
+            f"{model:<18}{s['count']:>6}{_fmt(s['mean']):>9}"
+            f"{_fmt(s.get('p50')):>8}{_fmt(s.get('p95')):>8}"
+            f"{_fmt(s['tokens_per_second']):>10}"
+        )
+
+    lines += ["", "Status por requisito", ""]
+    for model, items in sorted(data["status_rates"].items()):
+        lines.append(model)
+        for item, statuses in items.items():
+            shares = ", ".join(
+                f"{status or '?'} {share:.0%}" for status, share in statuses.items()
+            )
+            lines.append(f"  {item}: {shares}")
+
+    lines += ["", "Concordância entre modelos (mesmo arquivo)", ""]
+    if not data["agreement"]:
+        lines.append("  Nenhum arquivo analisado por mais de um modelo")
+    for (model_a, model_b), s in sorted(data["agreement"].items()):
+        status = s["status_agreement"]
+        lines.append(
+            f"  {model_a} × {model_b}: {s['files']} arquivos, diferença média de "
+            f"pontuação {_fmt(s['score_diff'])}, mesmo status em "
+            f"{'-' if status is None else format(status, '.0%')} dos requisitos"
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,1720 @@
+import json
+import hashlib
+import re
+import os
+import glob
+import threading
+import time
+from datetime import datetime
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import ast
+from cache_store import DiskCache, sha256_file
+from history_store import HistoryIndex, JsonlStore
+from blob_store import BlobStore
+from call_policy import CallPolicy
+import analytics
+from folder_watch import FolderWatcher, WatchIndex, has_watchdog
+from ollama_client import (
+    DEFAULT_HOST,
+    OllamaCancelled,
+    OllamaClient,
+    OllamaError,
+)
+from ollama_pool import OllamaPool
+from image_prep import prepare_images
+from metrics import MetricsRegistry, StageTrace
+from page_extract import default_workers, iter_pdf
+
+
+APP_TITLE = "Validador de Currículos"
+RESULTS_FILE = "results.jsonl"
+LEGACY_RESULTS_FILE = "results.json"
+HISTORY_DB = "history.db"
+BLOBS_DB = "blobs.db"  # compressed prompts and raw responses of the history
+BLOB_FIELDS = ("prompt", "raw_response", "document_text")
+WATCH_DB = "watch.db"
+WATCH_DEBOUNCE = 2.0  # seconds a file must stay unchanged before analysis
+WATCH_INTERVAL = 30.0  # s between folder listings when watchdog is missing
+HISTORY_PAGE_SIZE = 200
+CACHE_DIR = "cache"
+EXTRACT_CACHE_MAX_MB = 512
+EXTRACT_CACHE_VERSION = 2
+RESPONSE_CACHE_MAX_MB = 256
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+OCR_CACHE_MAX_MB = 128
+OCR_MIN_IMAGE_SIDE = 48  # px; smaller images are icons and bullets
+OCR_MIN_ENTROPY = 0.3  # bits; solid fills and rules score below, text scans above
+OCR_SKIP_PAGE_MIN_CHARS = 200  # pages with this much text are not OCRed
+OCR_MAX_IMAGE_SIDE = 1600  # px; larger images are downscaled
+OCR_JPEG_QUALITY = 80
+OCR_CONCURRENCY = 4
+PDF_PROCESS_WORKERS = default_workers()
+PDF_PARALLEL_MIN_PAGES = 50
+IMAGE_SPILL_DIR = None  # e.g. "tmp_images" to keep extracted images on disk
+IMAGE_SPILL_MAX_MB = 256
+DOCUMENT_TYPE = "CURRÍCULO"
+REQUIREMENTS = [
+    "Coerência geral",
+    "Introdução / Resumo profissional",
+    "Formação Acadêmica",
+    "Experiência Profissional",
+]
+JSON_REQUIREMENTS = [
+    {"item": "Coerência geral", "status": "", "detalhes": ""},
+    {"item": "Introdução / Resumo profissional", "status": "", "detalhes": ""},
+    {"item": "Formação Acadêmica", "status": "", "detalhes": ""},
+    {"item": "Experiência Profissional", "status": "", "detalhes": ""},
+]
+STRUCTURED_REPAIR_ATTEMPTS = 1
+MODEL_CONTEXT_TOKENS = {
+    "llama3.1:8b": 8192,
+    "deepseek-r1:8b": 8192,
+    "gpt-oss:20b": 8192,
+    "gemma3:12b": 8192,
+}
+DEFAULT_CONTEXT_TOKENS = 4096
+RESPONSE_TOKEN_RESERVE = 1024
+CHARS_PER_TOKEN = 3.5
+CHUNK_CONCURRENCY = 2
+CHUNK_MISSING_STATUS = "Não encontrado neste trecho"
+TEXT_MODELS = ["llama3.1:8b", "deepseek-r1:8b", "gpt-oss:20b", "gemma3:12b"]
+IMAGE_MODELS = ["deepseek-ocr", "moondream2", "qwen3-vl", "PaddleOCR-vl"]
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".webp"]
+SUPPORTED_EXTENSIONS = [".docx", ".pdf"] + IMAGE_EXTENSIONS
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", DEFAULT_HOST)
+# several inference servers, e.g. "http://box1:11434,http://box2:11434";
+# when set, requests are balanced over them instead of going to OLLAMA_HOST
+OLLAMA_HOSTS = [h for h in os.environ.get("OLLAMA_HOSTS", "").split(",") if h]
+OLLAMA_PIN_MODELS = False  # send each model only to the hosts that have it loaded
+OLLAMA_HEALTH_INTERVAL = 15
+OLLAMA_POOL_SIZE = 4
+OLLAMA_KEEP_ALIVE = "5m"
+TEXT_TIMEOUT = 300  # s; until enough calls were timed to derive one per model
+IMAGE_TIMEOUT = 120
+MODEL_CALL_RETRIES = 2  # extra attempts after a transient failure
+# e.g. 0.9: with several OLLAMA_HOSTS, a request slower than 90% of the
+# model's recent calls is also sent to a second server (first answer wins)
+HEDGE_QUANTILE = None
+METRICS_FILE = None  # e.g. "metrics.prom", rewritten after every analysis
+METRICS_PORT = None  # serve Prometheus metrics on http://<host>:<port>/metrics
+
+results_store = JsonlStore(RESULTS_FILE, legacy_path=LEGACY_RESULTS_FILE)
+history_index = HistoryIndex(
+    HISTORY_DB, results_store, text_loader=lambda e: entry_blob(e, "document_text")
+)
+blob_store = BlobStore(BLOBS_DB)
+extract_cache = DiskCache(
+    os.path.join(CACHE_DIR, "extract.db"), max_bytes=EXTRACT_CACHE_MAX_MB * 1024 * 1024
+)
+response_cache = DiskCache(
+    os.path.join(CACHE_DIR, "responses.db"),
+    max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+    ttl=RESPONSE_CACHE_TTL,
+)
+ocr_cache = DiskCache(
+    os.path.join(CACHE_DIR, "ocr.db"), max_bytes=OCR_CACHE_MAX_MB * 1024 * 1024
+)
+metrics_registry = MetricsRegistry()
+call_policy = CallPolicy(
+    retries=MODEL_CALL_RETRIES,
+    hedge_quantile=HEDGE_QUANTILE,
+    on_outcome=lambda kind, model, outcome, seconds: metrics_registry.inc(
+        "model_call_outcomes_total",
+        {"kind": kind, "model": model, "outcome": outcome},
+    ),
+)
+
+
+def make_ollama_client(hosts=None, pin_models=OLLAMA_PIN_MODELS):
+    """
+    An OllamaPool over `hosts` (load balanced, health checked) or, with a
+    single host or none, a plain OllamaClient for it (default OLLAMA_HOST).
+    """
+    hosts = [h.strip() for h in hosts or [] if h.strip()]
+    if len(hosts) > 1:
+        return OllamaPool(
+            hosts,
+            pool_size=OLLAMA_POOL_SIZE,
+            keep_alive=OLLAMA_KEEP_ALIVE,
+            pin_models=pin_models,
+            health_interval=OLLAMA_HEALTH_INTERVAL,
+        )
+    return OllamaClient(
+        hosts[0] if hosts else OLLAMA_HOST,
+        pool_size=OLLAMA_POOL_SIZE,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+    )
+
+
+ollama_client = make_ollama_client(OLLAMA_HOSTS)
+
+
+# --- Stage Timing --------------------------------------------------------------------
+
+# Objects with stage_started(stage) and stage_finished(stage, seconds), called
+# around each pipeline stage: extraction, ocr, prompt, model, parse, persist.
+stage_listeners = []
+
+
+@contextmanager
+def timed_stage(stage, trace=None):
+    """
+    Time one pipeline stage, adding it to `trace` (a StageTrace) if given.
+    """
+    if trace is not None:
+        trace.stage_started(stage)
+    for listener in stage_listeners:
+        listener.stage_started(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if trace is not None:
+            trace.add_stage(stage, elapsed)
+        for listener in stage_listeners:
+            listener.stage_finished(stage, elapsed)
+
+
+# --- Core Resume Processing Functions ------------------------------------------------
+
+
+def extract_text_from_file(path):
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == ".docx":
+        return extract_text_from_docx(path)
+    elif ext == ".pdf":
+        return extract_text_from_pdf(path)
+    elif ext in IMAGE_EXTENSIONS:
+        return ""
+    else:
+        return ""
+
+
+def extract_text_from_docx(path):
+    return extract_docx(path, with_images=False)[0]
+
+
+def extract_text_from_pdf(path):
+    return extract_pdf(path, with_images=False)[0]
+
+
+def extract_file(path, with_images=True):
+    """
+    Returns (text, images, page_chars) opening the document only once;
+    page_chars holds the text length of each PDF page and is empty for other
+    formats.
+    """
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == ".docx":
+        return extract_docx(path, with_images) + ([],)
+    if ext == ".pdf":
+        return extract_pdf(path, with_images)
+    if ext in IMAGE_EXTENSIONS:
+        return "", extract_images_from_file(path) if with_images else [], []
+    return "", [], []
+
+
+def extract_docx(path, with_images=True):
+    import docx
+
+    doc = docx.Document(path)
+    text = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
+    images = []
+    if with_images:
+        for rel in doc.part._rels.values():
+            if "image" in rel.target_ref:
+                img_name = os.path.basename(rel.target_ref)
+                images.append((img_name, rel.target_part.blob))
+    return text, images
+
+
+def extract_pdf(path, with_images=True):
+    """
+    Text and images of every page in a single pass over the PDF (page ranges
+    of large PDFs are extracted in parallel processes).
+    """
+    text = []
+    images = []
+    page_chars = []
+    for _, page_text, page_images in iter_pdf(
+        path, with_images, PDF_PROCESS_WORKERS, PDF_PARALLEL_MIN_PAGES
+    ):
+        text.append(page_text)
+        images.extend(page_images)
+        page_chars.append(len(page_text.strip()))
+    return "\n".join(text), images, page_chars
+
+
+def extract_images_from_file(path):
+    """
+    Returns the embedded images of `path` as [(name, bytes), ...], in memory.
+    """
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext in IMAGE_EXTENSIONS:
+        with open(path, "rb") as f:
+            return [(os.path.basename(path), f.read())]
+
+    if ext == ".docx":
+        return extract_images_from_docx(path)
+
+    if ext == ".pdf":
+        return extract_images_from_pdf(path)
+
+    return []
+
+
+def extract_images_from_docx(path):
+    return extract_docx(path)[1]
+
+
+def extract_images_from_pdf(path):
+    return extract_pdf(path)[1]
+
+
+def spill_images(path, images):
+    """
+    Optionally keep a copy of extracted images under IMAGE_SPILL_DIR for
+    inspection, pruning the oldest files once IMAGE_SPILL_MAX_MB is exceeded.
+    """
+    if not IMAGE_SPILL_DIR or not images:
+        return
+    out_dir = os.path.join(IMAGE_SPILL_DIR, os.path.basename(path))
+    os.makedirs(out_dir, exist_ok=True)
+    for name, data in images:
+        with open(os.path.join(out_dir, name), "wb") as f:
+            f.write(data)
+
+    files = []
+    for folder, _, names in os.walk(IMAGE_SPILL_DIR):
+        for name in names:
+            file_path = os.path.join(folder, name)
+            st = os.stat(file_path)
+            files.append((st.st_mtime, st.st_size, file_path))
+    total = sum(size for _, size, _ in files)
+    for _, size, file_path in sorted(files):
+        if total <= IMAGE_SPILL_MAX_MB * 1024 * 1024:
+            break
+        os.remove(file_path)
+        total -= size
+
+
+# --- Extraction Cache ----------------------------------------------------------------
+
+
+def pack_extraction(text, images, page_chars=None):
+    """
+    Serialize extracted text, per-page text lengths and [(name, bytes), ...]
+    images into one blob: 4-byte header length, JSON header, then the image
+    bytes back to back.
+    """
+    header = {"text": text, "page_chars": page_chars or []}
+    if images is not None:
+        header["images"] = [[name, len(data)] for name, data in images]
+    header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    parts = [len(header).to_bytes(4, "big"), header]
+    parts.extend(data for _, data in images or [])
+    return b"".join(parts)
+
+
+def unpack_extraction(blob):
+    size = int.from_bytes(blob[:4], "big")
+    header = json.loads(blob[4 : 4 + size].decode("utf-8"))
+    images = None
+    if "images" in header:
+        images = []
+        pos = 4 + size
+        for name, length in header["images"]:
+            images.append((name, blob[pos : pos + length]))
+            pos += length
+    return header["text"], images, header.get("page_chars", [])
+
+
+def extract_document(path, with_images=True):
+    """
+    Returns (text, images, page_chars) for `path`, images being
+    [(name, bytes), ...] and page_chars the text length of each PDF page.
+    Parsed text and image bytes are cached by a hash of the file contents, so
+    re-running a file (or the same CV under another name) skips DOCX/PDF
+    parsing entirely.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return "", extract_images_from_file(path) if with_images else [], []
+
+    key = f"v{EXTRACT_CACHE_VERSION}:{sha256_file(path)}"
+    cached = extract_cache.get(key)
+    extracted = False
+    if cached is not None:
+        text, images, page_chars = unpack_extraction(cached)
+        if with_images and images is None:
+            # cached without images: only the images are still needed
+            images = extract_images_from_file(path)
+            extracted = True
+    else:
+        text, images, page_chars = extract_file(path, with_images)
+        if not with_images:
+            images = None
+        extracted = with_images
+
+    if extracted:
+        spill_images(path, images)
+
+    if cached is None or extracted:
+        extract_cache.put(key, pack_extraction(text, images, page_chars))
+
+    return text, images if with_images else [], page_chars
+
+
+def build_prompt(text, requirements, part=None):
+    req_text = "\n".join([f"- {r}" for r in requirements])
+    part_text = ""
+    if part is not None:
+        index, total = part
+        part_text = f"""
+ATENÇÃO: este é o trecho {index} de {total} de um documento longo.
+Avalie cada requisito apenas com base neste trecho. Se o trecho não trouxer
+informação sobre um requisito, use o status "{CHUNK_MISSING_STATUS}".
+"""
+    return f"""
+Analise o {DOCUMENT_TYPE} abaixo segundo os requisitos a seguir:
+{part_text}
+REQUISITOS:
+{req_text}
+
+FORMATO OBRIGATÓRIO DA RESPOSTA:
+Retorne APENAS um JSON válido (RFC 8259).
+Use exclusivamente aspas duplas.
+NÃO use aspas simples.
+NÃO adicione texto antes ou depois
+
+{{
+  "validacao": {json.dumps(JSON_REQUIREMENTS, ensure_ascii=False)},
+  "pontuacao_final": <número inteiro de 0 a 100>,
+  "melhorias_recomendadas": ""
+}}
+
+{DOCUMENT_TYPE}:
+{text}
+"""
+
+
+def ollama_chat(
+    model, prompt, options=None, on_token=None, cancel=None, schema=None, trace=None
+):
+    """
+    Calls ollama through its REST API (falls back to `ollama run`), under
+    call_policy: timeout learned from the model's recent calls, transient
+    failures retried, slow requests hedged when several hosts are set.
+    With `on_token`, the response is streamed and each piece of text is passed
+    to it as it arrives (a stream that already produced text is not retried).
+    `schema` constrains the output to that JSON schema (the API's format
+    option). Raises OllamaCancelled if `cancel` is triggered.
+    Returns raw text output.
+    """
+    extra = {"format": schema} if schema else {}
+    started = time.perf_counter()
+    size = len(prompt.encode("utf-8"))
+    try:
+        if on_token is None:
+            response = call_policy.call(
+                "text",
+                model,
+                lambda timeout, hedge_after: ollama_client.generate(
+                    model,
+                    prompt,
+                    options=options,
+                    timeout=timeout,
+                    cancel=cancel,
+                    **hedge_kwargs(hedge_after),
+                    **extra,
+                ),
+                TEXT_TIMEOUT,
+                cancel,
+            )
+            text = response.get("response", "")
+            record_call(trace, "text", model, started, size, text, response)
+            return text
+
+        def stream(timeout, hedge_after):
+            parts = []
+            last = {}
+            try:
+                for chunk in ollama_client.generate_stream(
+                    model,
+                    prompt,
+                    options=options,
+                    timeout=timeout,
+                    cancel=cancel,
+                    **extra,
+                ):
+                    token = chunk.get("response", "")
+                    if token:
+                        parts.append(token)
+                        on_token(token)
+                    last = chunk
+            except OllamaCancelled:
+                raise
+            except Exception as e:
+                if not parts:
+                    raise
+                # the text was already shown: report it instead of starting over
+                raise OllamaError(
+                    f"stream interrupted: {e}", output="".join(parts)
+                ) from e
+            return "".join(parts), last
+
+        text, last = call_policy.call("text", model, stream, TEXT_TIMEOUT, cancel)
+        record_call(trace, "text", model, started, size, text, last)
+        return text
+    except OllamaCancelled:
+        raise
+    except FileNotFoundError:
+        return "[ERROR] 'ollama' executable not found. Ensure ollama is installed and in PATH."
+    except TimeoutError:
+        return "[ERROR] ollama run timed out."
+    except OllamaError as e:
+        # include server / stderr message for debugging
+        return e.output + "\n\n[OLLAMA STDERR]\n" + str(e)
+    except Exception as e:
+        return f"[ERROR] ollama run failed: {e}"
+
+
+def hedge_kwargs(hedge_after):
+    """
+    The hedge_after argument for ollama_client, which only a pool of several
+    servers takes.
+    """
+    if hedge_after is None or not isinstance(ollama_client, OllamaPool):
+        return {}
+    return {"hedge_after": hedge_after}
+
+
+def record_call(trace, kind, model, started, prompt_bytes, text, response):
+    """
+    Add one model call to `trace`, with the token counts Ollama reports in
+    its final response (absent when the CLI fallback was used).
+    """
+    if trace is None:
+        return
+    trace.add_call(
+        kind,
+        model,
+        time.perf_counter() - started,
+        prompt_tokens=response.get("prompt_eval_count"),
+        response_tokens=response.get("eval_count"),
+        prompt_bytes=prompt_bytes,
+        response_chars=len(text),
+    )
+
+
+def is_error_response(text):
+    return text.startswith("[ERROR") or "[OLLAMA STDERR]" in text
+
+
+def response_cache_key(model, prompt, options=None, schema=None):
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    raw = json.dumps([model, options or {}, prompt_hash, schema], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cached_ollama_chat(
+    model,
+    prompt,
+    options=None,
+    use_cache=True,
+    on_token=None,
+    cancel=None,
+    schema=None,
+    trace=None,
+):
+    """
+    ollama_chat behind the on-disk response cache. Returns (response, hit).
+    `use_cache=False` forces a new generation (the result still refreshes
+    the cache); error responses are never cached.
+    """
+    key = response_cache_key(model, prompt, options, schema)
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            if cancel is not None:
+                # a hit costs no model call, but the job may be cancelled
+                cancel.check()
+            response = cached.decode("utf-8")
+            if on_token is not None:
+                on_token(response)
+            return response, True
+
+    with timed_stage("model", trace):
+        response = ollama_chat(
+            model, prompt, options, on_token, cancel, schema, trace
+        )
+    if not is_error_response(response):
+        response_cache.put(key, response.encode("utf-8"))
+    return response, False
+
+
+def ollama_image_analyze(model, image, cancel=None, trace=None):
+    """
+    OCR one image (raw bytes), sent through the API's `images` field.
+    """
+    try:
+        prompt = f"""
+Analise a imagem anexada como um {DOCUMENT_TYPE}.
+Extraia TODO texto visível (OCR) e descreva o conteúdo visual.
+"""
+
+        started = time.perf_counter()
+        response = call_policy.call(
+            "image",
+            model,
+            lambda timeout, hedge_after: ollama_client.generate(
+                model,
+                prompt,
+                images=[image],
+                timeout=timeout,
+                cancel=cancel,
+                **hedge_kwargs(hedge_after),
+            ),
+            IMAGE_TIMEOUT,
+            cancel,
+        )
+        text = response.get("response", "")
+        size = len(prompt.encode("utf-8")) + len(image)
+        record_call(trace, "image", model, started, size, text, response)
+        return text
+
+    except OllamaCancelled:
+        raise
+    except TimeoutError:
+        return "[ERROR image analysis] OCR timeout"
+    except OllamaError as e:
+        return "[ERROR image analysis]\n" + str(e)
+    except Exception as e:
+        return f"[ERROR image analysis] {e}"
+
+
+def ocr_image(model, data, digest, use_cache=True, cancel=None, trace=None):
+    """
+    OCR one image through the persistent OCR cache keyed by (model, hash).
+    """
+    key = f"{model}:{digest}"
+    cached = ocr_cache.get(key) if use_cache else None
+    if cached is not None:
+        return cached.decode("utf-8")
+    result = ollama_image_analyze(model, data, cancel, trace)
+    if not result.startswith("[ERROR image analysis]"):
+        ocr_cache.put(key, result.encode("utf-8"))
+    return result
+
+
+def analyze_images(
+    model, images, use_cache=True, max_workers=None, cancel=None, trace=None
+):
+    """
+    OCR every distinct image once. Images repeated inside the document (same
+    bytes, e.g. a logo on every page) reuse the first result, and results are
+    kept in the persistent OCR cache keyed by (model, image hash) so the same
+    image in another CV is not sent to the vision model again.
+
+    Distinct images are OCRed concurrently (at most OCR_CONCURRENCY at a time)
+    and reassembled in page order; a failed image (after call_policy's
+    retries) is only noted as unreadable, its error text stays out of the
+    prompt. Returns the text block appended to the prompt.
+    """
+    order = []
+    unique = {}
+    for name, data in images:
+        digest = hashlib.sha256(data).hexdigest()
+        order.append((name, digest))
+        unique.setdefault(digest, (name, data))
+
+    results = {}
+    workers = max(1, min(max_workers or OCR_CONCURRENCY, len(unique) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                ocr_image, model, data, digest, use_cache, cancel, trace
+            ): digest
+            for digest, (_, data) in unique.items()
+        }
+        for future in as_completed(futures):
+            digest = futures[future]
+            try:
+                results[digest] = future.result()
+            except OllamaCancelled:
+                raise
+            except Exception as e:
+                results[digest] = f"[ERROR image analysis] {e}"
+
+    text = ""
+    for name, digest in order:
+        text += f"\n[Imagem: {name}]\n"
+        first_name = unique[digest][0]
+        if first_name != name:
+            text += f"(mesmo conteúdo de {first_name})\n"
+        elif results[digest].startswith("[ERROR image analysis]"):
+            text += "(não foi possível ler esta imagem)\n"
+        else:
+            text += results[digest] + "\n"
+    return text
+
+
+def extract_json(text):
+    """
+    Extract JSON object from the model output. Accepts code block or raw JSON.
+    """
+    match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", text, re.DOTALL)
+    if match:
+        return match.group(1)
+
+    start = text.find("{")
+    if start != -1:
+        potential_json = text[start:].strip()
+        # find matching closing brace for outermost object by scanning
+        depth = 0
+        for i, ch in enumerate(potential_json):
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return potential_json[: i + 1]
+    return None
+
+
+# --- Structured Output ---------------------------------------------------------------
+
+
+def result_schema(requirements, fields=None):
+    """
+    JSON schema of the analysis result, sent as the request's format option.
+    `fields` restricts it to some top-level fields and, for "validacao", to
+    the given requirement names (used by repair requests).
+    """
+    item_names = requirements
+    if fields is not None and isinstance(fields.get("validacao"), list):
+        item_names = fields["validacao"]
+    properties = {
+        "validacao": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "item": {"type": "string", "enum": list(item_names)},
+                    "status": {"type": "string"},
+                    "detalhes": {"type": "string"},
+                },
+                "required": ["item", "status", "detalhes"],
+            },
+        },
+        "pontuacao_final": {"type": "integer", "minimum": 0, "maximum": 100},
+        "melhorias_recomendadas": {"type": "string"},
+    }
+    if fields is not None:
+        properties = {k: v for k, v in properties.items() if k in fields}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+    }
+
+
+RESULT_SCHEMA = result_schema(REQUIREMENTS)
+
+
+def parse_result(response):
+    """
+    Parse a model response into a dict. Structured output is plain JSON, so
+    json.loads succeeds in one pass; free-form output (e.g. from the CLI
+    fallback) goes through extract_json / safe_json_loads.
+    """
+    try:
+        data = json.loads(response)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+    json_str = extract_json(response)
+    if not json_str:
+        raise ValueError("Nenhum JSON encontrado")
+    data = safe_json_loads(json_str)
+    if not isinstance(data, dict):
+        raise ValueError("JSON não é um objeto")
+    return data
+
+
+def validate_result(data, requirements):
+    """
+    Validate (and normalize) a parsed result against result_schema in one
+    pass. Returns the failed fields as {"validacao": [names], "field": True}
+    (empty when valid).
+    """
+    failed = {}
+
+    validacao = data.get("validacao")
+    items = {}
+    if isinstance(validacao, list):
+        for item in validacao:
+            if isinstance(item, dict) and item.get("item") in requirements:
+                items.setdefault(item["item"], item)
+    bad_items = [
+        name
+        for name in requirements
+        if name not in items
+        or not isinstance(items[name].get("status"), str)
+        or not items[name]["status"].strip()
+        or not isinstance(items[name].get("detalhes"), str)
+    ]
+    if bad_items:
+        failed["validacao"] = bad_items
+    data["validacao"] = [items[name] for name in requirements if name in items]
+
+    score = data.get("pontuacao_final")
+    try:
+        score = float(score)
+        if score.is_integer():
+            score = int(score)
+        if not 0 <= score <= 100:
+            raise ValueError(score)
+        data["pontuacao_final"] = score
+    except (TypeError, ValueError):
+        failed["pontuacao_final"] = True
+
+    if not isinstance(data.get("melhorias_recomendadas"), str):
+        failed["melhorias_recomendadas"] = True
+
+    return failed
+
+
+def merge_repair(data, repaired):
+    items = {item["item"]: item for item in data.get("validacao", [])}
+    for item in repaired.get("validacao") or []:
+        if isinstance(item, dict) and item.get("item"):
+            items[item["item"]] = item
+    data["validacao"] = [items[name] for name in REQUIREMENTS if name in items]
+    for key in ("pontuacao_final", "melhorias_recomendadas"):
+        if key in repaired:
+            data[key] = repaired[key]
+    return data
+
+
+def repair_instructions(failed):
+    fields = []
+    for key, value in failed.items():
+        if key == "validacao":
+            fields.extend(f"validacao: {name}" for name in value)
+        else:
+            fields.append(key)
+    fields_text = "\n".join(f"- {f}" for f in fields)
+    return f"""
+Os campos abaixo ficaram ausentes ou inválidos na sua resposta anterior.
+Retorne APENAS um JSON com esses campos, sem repetir os demais:
+{fields_text}
+"""
+
+
+def build_repair_prompt(prompt, failed):
+    """
+    The original prompt (instructions and document) plus the list of fields
+    to redo. The previous answer is not resent: merge_repair keeps its
+    valid fields, and resending it could push the document out of the
+    context window.
+    """
+    return prompt + "\n" + repair_instructions(failed)
+
+
+# every field failing: the longest repair_instructions()
+ALL_FIELDS_FAILED = {
+    "validacao": REQUIREMENTS,
+    "pontuacao_final": True,
+    "melhorias_recomendadas": True,
+}
+
+
+def analyze_with_schema(
+    model,
+    prompt,
+    use_cache=True,
+    on_token=None,
+    cancel=None,
+    repair_attempts=None,
+    options=None,
+    trace=None,
+):
+    """
+    Generate the analysis with schema-constrained output, validate it in one
+    pass and, if some fields fail, ask the model to redo only those fields.
+    A reply with no parseable JSON at all counts as every field failing; it
+    only becomes an error entry if the repairs do not produce a result.
+    Returns (data, response, cache_hit, repaired_fields).
+    """
+    response, cache_hit = cached_ollama_chat(
+        model,
+        prompt,
+        options,
+        use_cache=use_cache,
+        on_token=on_token,
+        cancel=cancel,
+        schema=RESULT_SCHEMA,
+        trace=trace,
+    )
+    with timed_stage("parse", trace):
+        error = None
+        try:
+            data = parse_result(response)
+        except Exception as e:
+            error = {"error": f"Falha ao converter JSON: {e}", "raw": response}
+            data = {}
+        failed = validate_result(data, REQUIREMENTS)
+
+    repaired = []
+    attempts = repair_attempts
+    if attempts is None:
+        attempts = STRUCTURED_REPAIR_ATTEMPTS
+    while failed and attempts > 0 and not is_error_response(response):
+        attempts -= 1
+        repair_response, _ = cached_ollama_chat(
+            model,
+            build_repair_prompt(prompt, failed),
+            options,
+            use_cache=use_cache,
+            cancel=cancel,
+            schema=result_schema(REQUIREMENTS, failed),
+            trace=trace,
+        )
+        with timed_stage("parse", trace):
+            try:
+                merge_repair(data, parse_result(repair_response))
+            except Exception:
+                break
+            repaired.append(failed)
+            failed = validate_result(data, REQUIREMENTS)
+
+    if error is not None and not repaired:
+        return error, response, cache_hit, []
+    if failed:
+        data["campos_invalidos"] = failed
+    return data, response, cache_hit, repaired
+
+
+# --- Long Documents ------------------------------------------------------------------
+
+
+def estimate_tokens(text):
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def context_tokens(model):
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+
+
+def text_token_budget(model):
+    """
+    Tokens left for document text once the prompt template, the longest
+    repair instructions and the reserved answer space are taken out of the
+    model's context window, so repair prompts fit as well.
+    """
+    template = build_prompt("", REQUIREMENTS, part=(1, 1))
+    overhead = estimate_tokens(build_repair_prompt(template, ALL_FIELDS_FAILED))
+    return context_tokens(model) - RESPONSE_TOKEN_RESERVE - overhead
+
+
+def split_sections(text, max_tokens):
+    """
+    Split text into chunks of at most `max_tokens` (estimated), cutting at
+    blank lines between sections, then at line breaks, and only as a last
+    resort inside a line.
+    """
+    max_chars = max(1, int(max_tokens * CHARS_PER_TOKEN))
+    pieces = []
+    for section in re.split(r"\n\s*\n", text):
+        section = section.strip()
+        if not section:
+            continue
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+        for line in section.splitlines():
+            while len(line) > max_chars:
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+            if line.strip():
+                pieces.append(line)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def merge_chunk_results(results, weights):
+    """
+    Reduce per-chunk results into one result in the usual format: per
+    requirement, the status most chunks gave it (weighted by chunk size,
+    ties going to the earliest chunk) and the details of every chunk that
+    covered it; the final score averaged by chunk size; recommendations
+    de-duplicated.
+    """
+    merged = {"validacao": [], "pontuacao_final": None, "melhorias_recomendadas": ""}
+    valid = [(r, w) for r, w in zip(results, weights) if "error" not in r]
+    if not valid:
+        return results[0]
+
+    for name in REQUIREMENTS:
+        found = []
+        votes = {}  # status -> weight, in order of first appearance
+        for index, (result, weight) in enumerate(valid, start=1):
+            for item in result.get("validacao", []):
+                if item.get("item") != name:
+                    continue
+                if item.get("status") != CHUNK_MISSING_STATUS:
+                    found.append((index, item))
+                    status = item.get("status", "")
+                    votes[status] = votes.get(status, 0) + weight
+        if not found:
+            merged["validacao"].append(
+                {"item": name, "status": CHUNK_MISSING_STATUS, "detalhes": ""}
+            )
+            continue
+        merged["validacao"].append(
+            {
+                "item": name,
+                "status": max(votes, key=votes.get),
+                "detalhes": "\n".join(
+                    f"[Parte {index}] {item.get('detalhes', '')}"
+                    for index, item in found
+                ),
+            }
+        )
+
+    scored = [
+        (r["pontuacao_final"], w)
+        for r, w in valid
+        if isinstance(r.get("pontuacao_final"), (int, float))
+    ]
+    if scored:
+        total_weight = sum(w for _, w in scored)
+        merged["pontuacao_final"] = round(sum(s * w for s, w in scored) / total_weight)
+
+    melhorias = []
+    for result, _ in valid:
+        for line in str(result.get("melhorias_recomendadas", "")).splitlines():
+            line = line.strip()
+            if line and line not in melhorias:
+                melhorias.append(line)
+    merged["melhorias_recomendadas"] = "\n".join(melhorias)
+    return merged
+
+
+def analyze_document(
+    model, text, use_cache=True, on_token=None, cancel=None, trace=None
+):
+    """
+    Analyze `text`, splitting it into section-aligned chunks when it does not
+    fit the model's context window. Chunks are analyzed concurrently (map)
+    and merged into a single result (reduce).
+    Returns (prompt, data, response, cache_hit, repaired, chunk_count).
+    """
+    options = {"num_ctx": context_tokens(model)}
+    budget = text_token_budget(model)
+    if estimate_tokens(text) <= budget:
+        with timed_stage("prompt", trace):
+            prompt = build_prompt(text, REQUIREMENTS)
+        data, response, cache_hit, repaired = analyze_with_schema(
+            model, prompt, use_cache, on_token, cancel, options=options, trace=trace
+        )
+        return prompt, data, response, cache_hit, repaired, 1
+
+    with timed_stage("prompt", trace):
+        chunks = split_sections(text, budget)
+        total = len(chunks)
+        prompts = [
+            build_prompt(chunk, REQUIREMENTS, part=(i, total))
+            for i, chunk in enumerate(chunks, start=1)
+        ]
+    if on_token is not None:
+        on_token(f"[Documento longo: analisando {total} trechos]\n")
+
+    with ThreadPoolExecutor(max_workers=max(1, CHUNK_CONCURRENCY)) as pool:
+        outcomes = list(
+            pool.map(
+                lambda prompt: analyze_with_schema(
+                    model,
+                    prompt,
+                    use_cache,
+                    cancel=cancel,
+                    options=options,
+                    trace=trace,
+                ),
+                prompts,
+            )
+        )
+
+    data = merge_chunk_results([o[0] for o in outcomes], [len(c) for c in chunks])
+    separator = "\n\n" + "=" * 40 + "\n\n"
+    return (
+        separator.join(prompts),
+        data,
+        separator.join(o[1] for o in outcomes),
+        all(o[2] for o in outcomes),
+        [r for o in outcomes for r in o[3]],
+        total,
+    )
+
+
+class ValidacaoStreamParser:
+    """
+    Picks complete items out of the "validacao" array while the model
+    response is still streaming. feed() returns the items finished by the
+    new chunk.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.item_start = None
+        self.done = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        items = []
+        if self.done:
+            return items
+        if self.pos is None:
+            match = re.search(r'"validacao"\s*:\s*\[', self.buffer)
+            if not match:
+                return items
+            self.pos = match.end()
+
+        buf = self.buffer
+        i = self.pos
+        while i < len(buf):
+            ch = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                if self.depth == 0 and ch == "{":
+                    self.item_start = i
+                self.depth += 1
+            elif ch in "}]":
+                if self.depth == 0:
+                    # closing bracket of the validacao array itself
+                    self.done = True
+                    break
+                self.depth -= 1
+                if self.depth == 0 and self.item_start is not None:
+                    try:
+                        items.append(safe_json_loads(buf[self.item_start : i + 1]))
+                    except ValueError:
+                        pass
+                    self.item_start = None
+            i += 1
+        self.pos = i
+        return items
+
+
+def save_result_entry(entry):
+    """
+    Append entry into RESULTS_FILE (one JSON line) and index it in HISTORY_DB.
+    The BLOB_FIELDS go to BLOBS_DB and the line keeps only their references
+    (entry["blobs"]); read them back with entry_blob. Returns the entry id.
+    """
+    stored = dict(entry)
+    refs = {}
+    for field in BLOB_FIELDS:
+        text = stored.pop(field, None)
+        if text:
+            refs[field] = blob_store.put(text)
+    if refs:
+        stored["blobs"] = refs
+    return history_index.add(stored)
+
+
+def entry_blob(entry, field):
+    """
+    A BLOB_FIELDS value of a history entry, loaded from BLOBS_DB (or inline,
+    for entries saved before the blob store). None when not available.
+    """
+    if entry.get(field):
+        return entry[field]
+    ref = entry.get("blobs", {}).get(field)
+    return blob_store.get(ref) if ref else None
+
+
+def resolve_entry_blobs(entry):
+    """
+    Copy of a history entry with its BLOB_FIELDS loaded back from BLOBS_DB
+    in place of the `blobs` references, as it was before being saved.
+    """
+    full = {k: v for k, v in entry.items() if k != "blobs"}
+    for field in BLOB_FIELDS:
+        text = entry_blob(entry, field)
+        if text is not None:
+            full[field] = text
+    return full
+
+
+def iter_history():
+    """
+    Stream full history entries without loading them all at once.
+    """
+    return iter(history_index)
+
+
+def load_history():
+    return list(iter_history())
+
+
+def load_history_page(page=0, page_size=None, **filters):
+    """
+    Returns (rows, total): lightweight rows of one history page, newest first,
+    narrowed by the HistoryIndex search filters (query, min_score,
+    max_score, text_model, item, status).
+    """
+    history_index.sync()
+    rows = history_index.page(page, page_size or HISTORY_PAGE_SIZE, **filters)
+    return rows, history_index.count(**filters)
+
+
+def load_history_entry(entry_id):
+    return history_index.load(entry_id)
+
+
+def history_report():
+    """
+    Text report comparing the text models over the whole history (score
+    distributions, status rates, latency, agreement between models).
+    """
+    return analytics.format_report(analytics.summary(history_index))
+
+
+def delete_history_entry(entry_id):
+    refs = history_index.load(entry_id).get("blobs", {})
+    history_index.delete(entry_id)
+    for ref in refs.values():
+        blob_store.release(ref)
+
+
+def clear_history_file():
+    history_index.clear()
+    blob_store.clear()
+
+
+def safe_json_loads(s):
+    """
+    Aceita JSON inválido (aspas simples, etc) e converte para dict usando ast.literal_eval.
+    """
+    try:
+        return json.loads(s)
+    except Exception:
+        try:
+            return ast.literal_eval(s)  # aceita aspas simples, sintaxe tipo Python
+        except Exception as e:
+            raise ValueError(f"JSON inválido: {e}")
+
+
+def validate_resume_local(
+    path,
+    text_model,
+    image_model=None,
+    use_cache=True,
+    on_token=None,
+    cancel=None,
+    trace=None,
+):
+    prepared = prepare_document(path, image_model, use_cache, cancel, trace)
+    return analyze_prepared(prepared, text_model, use_cache, on_token, cancel)
+
+
+def prepare_document(path, image_model=None, use_cache=True, cancel=None, trace=None):
+    """
+    First phase of an analysis: extraction and OCR with `image_model`. Only
+    the vision model is used, so a queue of documents can all be prepared
+    before the text model is loaded (see run_batch). Returns the dict that
+    analyze_prepared takes.
+    """
+    if trace is None:
+        trace = StageTrace()
+    started = time.perf_counter()
+    with timed_stage("extraction", trace):
+        text_content, images, page_chars = extract_document(
+            path, with_images=bool(image_model)
+        )
+    trace.set_size("text_chars", len(text_content))
+
+    image_analysis_text = ""
+    ocr_skipped = None
+    if image_model:
+        with timed_stage("ocr", trace):
+            images, ocr_skipped = prepare_images(
+                images,
+                page_chars,
+                min_side=OCR_MIN_IMAGE_SIDE,
+                min_entropy=OCR_MIN_ENTROPY,
+                skip_page_chars=OCR_SKIP_PAGE_MIN_CHARS,
+                max_side=OCR_MAX_IMAGE_SIDE,
+                quality=OCR_JPEG_QUALITY,
+            )
+            image_analysis_text = analyze_images(
+                image_model, images, use_cache, cancel=cancel, trace=trace
+            )
+        trace.set_size("images", len(images))
+        trace.set_size("image_bytes", sum(len(data) for _, data in images))
+    if cancel is not None:
+        cancel.check()
+
+    return {
+        "path": path,
+        "image_model": image_model,
+        "text": text_content,
+        "ocr_text": image_analysis_text,
+        "ocr_skipped": ocr_skipped,
+        "trace": trace,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def analyze_prepared(prepared, text_model, use_cache=True, on_token=None, cancel=None):
+    """
+    Second phase of an analysis: run `text_model` over a prepared document,
+    save the entry to the history and return it.
+    """
+    path = prepared["path"]
+    trace = prepared["trace"]
+    started = time.perf_counter()
+    full_text = f"""
+        {prepared["text"]}
+
+        [CONTEÚDO EXTRAÍDO VIA OCR DE IMAGEM]
+        {prepared["ocr_text"]}
+    """
+
+    prompt, data, response, cache_hit, repaired, chunks = analyze_document(
+        text_model, full_text, use_cache, on_token, cancel, trace
+    )
+    trace.set_size("prompt_chars", len(prompt))
+    trace.set_size("response_chars", len(response))
+
+    entry = {
+        "file": os.path.basename(path),
+        "path": os.path.abspath(path),
+        "timestamp": datetime.now().isoformat(),
+        "text_model": text_model,
+        "image_model": prepared["image_model"],
+        "prompt": prompt,
+        "raw_response": response,
+        "document_text": f"{prepared['text']}\n\n{prepared['ocr_text']}".strip(),
+        "response_cached": cache_hit,
+        "result": data,
+    }
+    if repaired:
+        entry["repaired_fields"] = repaired
+    if chunks > 1:
+        entry["chunks"] = chunks
+    ocr_skipped = prepared["ocr_skipped"]
+    if ocr_skipped and any(ocr_skipped.values()):
+        entry["ocr_skipped"] = ocr_skipped
+    # persist is timed after the entry is written, so only the exported
+    # metrics include it
+    entry["metrics"] = trace.as_dict()
+    elapsed = prepared["seconds"] + time.perf_counter() - started
+    entry["metrics"]["total_seconds"] = round(elapsed, 4)
+
+    if cancel is not None:
+        # never persist a job cancelled while (or before) it was analyzed
+        cancel.check()
+    with timed_stage("persist", trace):
+        entry["id"] = save_result_entry(entry)
+    record_metrics(trace, text_model, "error" not in data)
+    return entry
+
+
+def record_metrics(trace, text_model, ok):
+    """
+    Add a finished analysis to the Prometheus metrics and rewrite
+    METRICS_FILE if one is configured.
+    """
+    metrics_registry.record_analysis(trace.as_dict(), text_model, ok)
+    if METRICS_FILE:
+        try:
+            metrics_registry.write(METRICS_FILE)
+        except OSError:
+            pass
+
+
+# --- PDF Export Utility --------------------------------------------------------------
+
+
+def export_entry_to_txt(entry, outpath):
+    """
+    Write the full entry (prompt, raw response and document text included)
+    as indented JSON.
+    """
+    with open(outpath, "w", encoding="utf-8") as f:
+        f.write(json.dumps(resolve_entry_blobs(entry), indent=2, ensure_ascii=False))
+
+
+def export_entry_to_pdf(entry, outpath):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    doc = SimpleDocTemplate(outpath, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+
+    header = f"Análise de Currículo - {entry.get('file','')}"
+    story.append(Paragraph(header, styles["Title"]))
+    meta = f"Arquivo: {entry.get('path','') or entry.get('file','')}<br/>Data: {entry.get('timestamp','')}<br/>Modelo: {entry.get('model','')}"
+    story.append(Paragraph(meta, styles["Normal"]))
+    story.append(Spacer(1, 12))
+
+    # Add JSON prettified
+    json_text = json.dumps(entry.get("result", {}), indent=2, ensure_ascii=False)
+    for line in json_text.splitlines():
+        # small paragraphs for each line to keep layout simple
+        story.append(
+            Paragraph(
+                line.replace(" ", "&nbsp;"),
+                styles["Code"] if "Code" in styles else styles["Normal"],
+            )
+        )
+
+    doc.build(story)
+
+
+# --- Model Residency -----------------------------------------------------------------
+
+
+def warm_up_model(model, text=True):
+    """
+    Load `model` before its first request, with the num_ctx the text
+    analysis uses (a different one makes Ollama reload it). Returns False
+    when the server could not be reached; the first request loads it anyway.
+    """
+    options = {"num_ctx": context_tokens(model)} if text else None
+    try:
+        ollama_client.load(model, keep_alive=OLLAMA_KEEP_ALIVE, options=options)
+        return True
+    except (OllamaError, OSError):
+        return False
+
+
+def release_model(model):
+    """
+    Unload `model` from the server so the next one does not have to share
+    (or swap) its memory.
+    """
+    try:
+        ollama_client.unload(model)
+    except (OllamaError, OSError):
+        pass
+
+
+def resident_models():
+    """
+    Names of the models loaded in the Ollama server (with the host when
+    several are in use), or None when it cannot be asked (no server, or the
+    CLI fallback is in use).
+    """
+    try:
+        loaded = ollama_client.ps()
+    except (OllamaError, OSError):
+        return None
+    return [
+        f"{m.get('name', '?')} @ {m['host']}" if "host" in m else m.get("name", "?")
+        for m in loaded
+    ]
+
+
+# --- Threaded Worker -----------------------------------------------------------------
+
+
+def worker_prepare(path, image_model, result_queue, use_cache=True, cancel=None):
+    """
+    Run the extraction and OCR phase of worker_analyze on its own, so the
+    text phase can be scheduled later with the documents grouped by model.
+    Returns the prepared document, or None after reporting ("cancelled",
+    path) or ("error", message).
+    """
+    trace = StageTrace(on_stage=lambda stage: result_queue.put(("stage", stage)))
+    try:
+        return prepare_document(path, image_model, use_cache, cancel, trace)
+    except OllamaCancelled:
+        result_queue.put(("cancelled", path))
+    except Exception as e:
+        result_queue.put(("error", str(e)))
+    return None
+
+
+def worker_analyze(
+    path,
+    text_model,
+    image_model,
+    result_queue,
+    use_cache=True,
+    cancel=None,
+    stream=False,
+    prepared=None,
+):
+    """
+    Run one analysis in a worker thread, reporting through `result_queue`:
+    ("stage", name) as each stage starts, ("token", text) and ("item", dict)
+    while streaming, then one of ("ok", entry), ("cancelled", path) or
+    ("error", message). With `prepared` (from worker_prepare) only the text
+    phase runs.
+    """
+    on_token = None
+    if stream:
+        parser = ValidacaoStreamParser()
+
+        def on_token(token):
+            result_queue.put(("token", token))
+            for item in parser.feed(token):
+                result_queue.put(("item", item))
+
+    try:
+        if prepared is not None:
+            entry = analyze_prepared(
+                prepared, text_model, use_cache, on_token, cancel
+            )
+        else:
+            trace = StageTrace(
+                on_stage=lambda stage: result_queue.put(("stage", stage))
+            )
+            entry = validate_resume_local(
+                path, text_model, image_model, use_cache, on_token, cancel, trace
+            )
+        result_queue.put(("ok", entry))
+    except OllamaCancelled:
+        result_queue.put(("cancelled", path))
+    except Exception as e:
+        result_queue.put(("error", str(e)))
+
+
+# --- Batch CLI -----------------------------------------------------------------------
+
+
+def collect_batch_files(target):
+    """
+    Expand a directory or glob pattern into the list of supported documents.
+    """
+    if os.path.isdir(target):
+        paths = [os.path.join(target, name) for name in os.listdir(target)]
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(
+        p
+        for p in paths
+        if os.path.isfile(p)
+        and os.path.splitext(p)[1].lower() in SUPPORTED_EXTENSIONS
+    )
+
+
+def describe_batch_entry(entry):
+    """
+    (ok, progress text) for one finished analysis.
+    """
+    result = entry.get("result", {})
+    ok = "error" not in result
+    if ok:
+        detail = f"pontuação {result.get('pontuacao_final', '?')}"
+    else:
+        detail = f"ERRO {result['error']}"
+    if entry.get("response_cached"):
+        detail += " [cache]"
+    elapsed = entry.get("metrics", {}).get("total_seconds", 0.0)
+    return ok, f"{detail} ({elapsed:.1f}s)"
+
+
+def batch_root(paths):
+    """
+    The deepest folder holding every path of a batch.
+    """
+    folders = [os.path.dirname(os.path.abspath(p)) for p in paths]
+    return os.path.commonpath(folders) if folders else None
+
+
+def write_batch_result(entry, output_dir, root=None):
+    """
+    Write `entry` as <output_dir>/<path relative to root>.json, mirroring the
+    input subfolders so a/cv.pdf and b/cv.pdf do not overwrite each other.
+    """
+    name = entry.get("file", "result")
+    path = entry.get("path")
+    if root and path:
+        relative = os.path.relpath(path, root)
+        if not relative.startswith(os.pardir):
+            name = relative
+    out_path = os.path.join(output_dir, name + ".json")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, indent=2, ensure_ascii=False)
+    return out_path
+
+
+def run_batch(
+    paths, text_model, image_model=None, workers=2, output_dir=None, use_cache=True
+):
+    """
+    Runs the batch grouped by model so Ollama does not swap models between
+    documents: first extraction and OCR of every file with `image_model`,
+    then the text analysis of every file with `text_model`, each phase
+    with at most `workers` files in flight and its model warmed up first.
+    Prints one progress line per file in each phase and a final summary.
+    Returns the number of files that failed.
+    """
+    total = len(paths)
+    done = 0
+    failed = 0
+    started = time.monotonic()
+    prepared = []
+    root = batch_root(paths)
+
+    if image_model:
+        print(f"Extração e OCR com {image_model}...")
+        warm_up_model(image_model, text=False)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(prepare_document, path, image_model, use_cache): path
+            for path in paths
+        }
+        for seen, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            name = os.path.basename(path)
+            try:
+                document = future.result()
+            except Exception as e:
+                done += 1
+                failed += 1
+                print(f"[{seen}/{total}] ERRO {name}: {e}")
+                continue
+            prepared.append(document)
+            print(f"[{seen}/{total}] {name} — extraído ({document['seconds']:.1f}s)")
+    if image_model:
+        release_model(image_model)
+
+    def analyze(document):
+        entry = analyze_prepared(document, text_model, use_cache)
+        if output_dir:
+            write_batch_result(entry, output_dir, root)
+        return entry
+
+    print(f"Análise com {text_model}...")
+    warm_up_model(text_model)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(analyze, doc): doc["path"] for doc in prepared}
+        for future in as_completed(futures):
+            path = futures[future]
+            done += 1
+            try:
+                entry = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{total}] ERRO {os.path.basename(path)}: {e}")
+                continue
+
+            ok, detail = describe_batch_entry(entry)
+            failed += 0 if ok else 1
+            print(f"[{done}/{total}] {os.path.basename(path)} — {detail}")
+
+    elapsed = time.monotonic() - started
+    rate = total / elapsed * 60 if elapsed > 0 else 0.0
+    print(
+        f"Concluído: {total - failed} ok, {failed} com erro, "
+        f"{elapsed:.1f}s no total ({rate:.1f} arquivos/min)"
+    )
+    stats = response_cache.stats()
+    print(f"Cache de respostas: {stats['hits']} acertos, {stats['misses']} falhas")
+    models = resident_models()
+    if models is not None:
+        print(f"Modelos carregados: {', '.join(models) or 'nenhum'}")
+    return failed
+
+
+# --- Watch Mode ----------------------------------------------------------------------
+
+
+def run_watch(
+    folder,
+    text_model,
+    image_model=None,
+    workers=2,
+    output_dir=None,
+    use_cache=True,
+    stop=None,
+):
+    """
+    Analyze every supported document that appears or changes in `folder`
+    until `stop` (a threading.Event) is set, with at most `workers` files in
+    flight. Files are recorded in WATCH_DB once analyzed, so unchanged files
+    are not analyzed again after a restart; a failed analysis is not
+    recorded, so the file is retried when it changes or on the next start.
+    Without the watchdog package the folder is polled every WATCH_INTERVAL
+    seconds instead of watched.
+    """
+    stop = stop or threading.Event()
+    index = WatchIndex(WATCH_DB)
+    counts = {"ok": 0, "failed": 0}
+    counts_lock = threading.Lock()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    def analyze(path, stat, digest):
+        name = os.path.basename(path)
+        try:
+            entry = validate_resume_local(path, text_model, image_model, use_cache)
+        except Exception as e:
+            ok, detail = False, f"ERRO {e}"
+        else:
+            ok, detail = describe_batch_entry(entry)
+            if ok:
+                index.put(path, stat[0], stat[1], digest, entry.get("id"))
+                if output_dir:
+                    write_batch_result(entry, output_dir, watcher.folder)
+        with counts_lock:
+            counts["ok" if ok else "failed"] += 1
+        print(f"{datetime.now():%H:%M:%S} {name} — {detail}")
+
+    watcher = FolderWatcher(
+        folder,
+        index,
+        lambda path, stat, digest: pool.submit(analyze, path, stat, digest),
+        SUPPORTED_EXTENSIONS,
+        debounce=WATCH_DEBOUNCE,
+        interval=WATCH_INTERVAL,
+    )
+    print(f"Observando {watcher.folder} ({index.count()} arquivos já analisados)")
+    if not has_watchdog():
+        print(
+            f"Pacote watchdog não instalado: a pasta será listada a cada "
+            f"{WATCH_INTERVAL:.0f}s (instale watchdog para detectar arquivos na hora)"
+        )
+    try:
+        watcher.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    print(f"Encerrado: {counts['ok']} ok, {counts['failed']} com erro")
+    return counts["failed"]
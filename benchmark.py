@@ -0,0 +1,659 @@
+"""
+Offline benchmark of the analysis pipeline.
+
+Generates a corpus of DOCX, PDF and image CVs of several sizes, starts a
+local stand-in for the Ollama server (configurable latency and token rate)
+and runs validate_resume_local over the corpus, reporting throughput,
+p50/p95/p99 latency and peak traced memory for each pipeline stage.
+
+    python benchmark.py --documents 12 --latency 0.2 --token-rate 80
+    python benchmark.py --serve --port 11435   # only the stand-in server
+    python benchmark.py --check-imports        # cold-start import budget
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+STAGES = ["extraction", "ocr", "prompt", "model", "parse", "persist"]
+IMPORT_BUDGET_MS = 150
+# must only be imported when first used, never by `import main`
+LAZY_MODULES = ["docx", "pymupdf", "reportlab", "tkinter", "http.server", "gui"]
+SIZES = {"small": 8, "medium": 40, "large": 260}  # paragraphs per document
+
+WORDS = (
+    "experiência desenvolvimento projetos equipe gestão análise dados sistemas "
+    "clientes resultados liderança formação universidade engenharia software "
+    "python processos melhoria qualidade comunicação planejamento entregas"
+).split()
+
+
+# --- Stand-in Ollama server ----------------------------------------------------------
+
+
+class FakeOllama:
+    """
+    Minimal Ollama stand-in: /api/generate and /api/chat (streaming or not),
+    /api/tags and /api/ps. Each answer waits `latency` seconds before the
+    first token and then produces `token_rate` tokens per second. Text
+    requests get a valid analysis JSON, requests with images get OCR-like
+    text. At most `max_loaded` models stay resident; using another one costs
+    `load_time` seconds and evicts the least recently used. A `fail_rate`
+    share of generations is answered with HTTP 503 and a `slow_rate` share
+    waits `slow_factor` times longer (stragglers).
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.05,
+        token_rate=200.0,
+        load_time=0.0,
+        max_loaded=1,
+        fail_rate=0.0,
+        slow_rate=0.0,
+        slow_factor=10.0,
+    ):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.load_time = load_time
+        self.max_loaded = max(1, max_loaded)
+        self.fail_rate = fail_rate
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.requests = 0
+        self.failures = 0
+        self.loads = 0
+        self.loaded = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def use_model(self, model, keep_alive=None):
+        with self._lock:
+            if model in self.loaded:
+                self.loaded.remove(model)
+                if keep_alive != 0:
+                    self.loaded.append(model)
+                return
+            if keep_alive == 0:
+                return
+            self.loads += 1
+            self.loaded.append(model)
+            del self.loaded[: -self.max_loaded]
+        time.sleep(self.load_time)
+
+    def answer(self, payload):
+        with self._lock:
+            self.requests += 1
+        if payload.get("images"):
+            lines = [" ".join(random.choices(WORDS, k=10)) for _ in range(12)]
+            return "Texto extraído da imagem:\n" + "\n".join(lines)
+        from analyzer import REQUIREMENTS
+
+        return json.dumps(
+            {
+                "validacao": [
+                    {
+                        "item": name,
+                        "status": random.choice(["Atende", "Parcial", "Não atende"]),
+                        "detalhes": " ".join(random.choices(WORDS, k=25)),
+                    }
+                    for name in REQUIREMENTS
+                ],
+                "pontuacao_final": random.randint(30, 95),
+                "melhorias_recomendadas": " ".join(random.choices(WORDS, k=30)),
+            },
+            ensure_ascii=False,
+        )
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, data, status=200):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client gave up (timeout, cancel, lost hedge)
+                    self.close_connection = True
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    from analyzer import IMAGE_MODELS, TEXT_MODELS
+
+                    models = [{"name": m} for m in TEXT_MODELS + IMAGE_MODELS]
+                    self._send_json({"models": models})
+                elif self.path == "/api/ps":
+                    with fake._lock:
+                        models = [{"name": m, "model": m} for m in fake.loaded]
+                    self._send_json({"models": models})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path not in ("/api/generate", "/api/chat"):
+                    self._send_json({"error": "not found"}, 404)
+                    return
+                chat = self.path == "/api/chat"
+                model = payload.get("model")
+                fake.use_model(model, payload.get("keep_alive"))
+                if not chat and "prompt" not in payload:
+                    # load/unload request: no generation
+                    self._send_json({"model": model, "response": "", "done": True})
+                    return
+                if chat:
+                    prompt = "".join(
+                        m.get("content", "") for m in payload.get("messages", [])
+                    )
+                else:
+                    prompt = payload.get("prompt", "")
+                if random.random() < fake.fail_rate:
+                    with fake._lock:
+                        fake.failures += 1
+                    self._send_json({"error": "server overloaded"}, 503)
+                    return
+                text = fake.answer(payload)
+                tokens = [text[i : i + 4] for i in range(0, len(text), 4)]
+                started = time.perf_counter()
+                slow = random.random() < fake.slow_rate
+                time.sleep(fake.latency * (fake.slow_factor if slow else 1))
+
+                def chunk(piece, done):
+                    data = {"model": payload.get("model"), "done": done}
+                    if chat:
+                        data["message"] = {"role": "assistant", "content": piece}
+                    else:
+                        data["response"] = piece
+                    if done:
+                        data.update(
+                            prompt_eval_count=len(prompt) // 4,
+                            eval_count=len(tokens),
+                            total_duration=int(
+                                (time.perf_counter() - started) * 1e9
+                            ),
+                        )
+                    return data
+
+                if not payload.get("stream", True):
+                    time.sleep(len(tokens) / fake.token_rate)
+                    self._send_json(chunk(text, True))
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        time.sleep(1 / fake.token_rate)
+                        self._write_chunk(chunk(token, False))
+                    self._write_chunk(chunk("", True))
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def _write_chunk(self, data):
+                line = (json.dumps(data) + "\n").encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+
+        return Handler
+
+
+# --- Corpus --------------------------------------------------------------------------
+
+
+def paragraphs(count, rng):
+    sections = ["Resumo profissional", "Formação Acadêmica", "Experiência"]
+    out = []
+    for i in range(count):
+        if i % 8 == 0:
+            out.append(sections[(i // 8) % len(sections)])
+        out.append(" ".join(rng.choices(WORDS, k=rng.randint(12, 30))) + ".")
+    return out
+
+
+def render_text_image(lines, dpi=90):
+    """
+    PNG of a page of text, like a scanned or pasted CV section.
+    """
+    import pymupdf
+
+    pdf = pymupdf.open()
+    page = pdf.new_page()
+    page.insert_textbox(page.rect + (40, 40, -40, -40), "\n".join(lines))
+    png = page.get_pixmap(dpi=dpi).tobytes("png")
+    pdf.close()
+    return png
+
+
+def icon_image(side=24):
+    import pymupdf
+
+    pix = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, side, side), 0)
+    pix.clear_with(90)
+    return pix.tobytes("png")
+
+
+def write_docx(path, texts, image):
+    import docx
+
+    document = docx.Document()
+    for text in texts:
+        document.add_paragraph(text)
+    document.add_picture(io.BytesIO(image))
+    document.add_picture(io.BytesIO(icon_image()))
+    document.save(path)
+
+
+def write_pdf(path, texts, image):
+    import pymupdf
+
+    pdf = pymupdf.open()
+    per_page = 20
+    for start in range(0, len(texts), per_page):
+        page = pdf.new_page()
+        page.insert_textbox(
+            page.rect + (50, 50, -50, -50), "\n".join(texts[start : start + per_page])
+        )
+        page.insert_image(pymupdf.Rect(50, 20, 70, 40), stream=icon_image())
+    # a scanned page: text only available through OCR
+    page = pdf.new_page()
+    page.insert_image(page.rect, stream=image)
+    pdf.save(path)
+    pdf.close()
+
+
+def build_corpus(folder, count, seed=0):
+    """
+    Write `count` documents cycling through format (docx, pdf, png) and size
+    (small, medium, large). Returns their paths.
+    """
+    rng = random.Random(seed)
+    kinds = [(fmt, size) for size in SIZES for fmt in ("docx", "pdf", "png")]
+    paths = []
+    for i in range(count):
+        fmt, size = kinds[i % len(kinds)]
+        texts = paragraphs(SIZES[size], rng)
+        image = render_text_image(texts[:12])
+        path = os.path.join(folder, f"cv_{i:03d}_{size}.{fmt}")
+        if fmt == "docx":
+            write_docx(path, texts, image)
+        elif fmt == "pdf":
+            write_pdf(path, texts, image)
+        else:
+            with open(path, "wb") as f:
+                f.write(image)
+        paths.append(path)
+    return paths
+
+
+# --- Measurement ---------------------------------------------------------------------
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class StageRecorder:
+    """
+    Stage listener for analyzer.stage_listeners: keeps the duration of every
+    stage run and the peak memory traced while it ran. Peaks are exact when
+    stages do not overlap; with concurrent chunk analysis they are an upper
+    bound.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.peaks = defaultdict(int)
+        self._starts = {}
+        self._lock = threading.Lock()
+
+    def stage_started(self, stage):
+        if not tracemalloc.is_tracing():
+            return
+        with self._lock:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            self._starts[(threading.get_ident(), stage)] = current
+
+    def stage_finished(self, stage, seconds):
+        with self._lock:
+            self.durations[stage].append(seconds)
+            start = self._starts.pop((threading.get_ident(), stage), None)
+            if start is not None:
+                peak = tracemalloc.get_traced_memory()[1] - start
+                self.peaks[stage] = max(self.peaks[stage], peak)
+
+
+def isolate(analyzer, folder, fake_urls):
+    """
+    Point the pipeline's history, caches and Ollama client at `folder` and
+    the stand-in servers (one URL or a list, balanced with an OllamaPool),
+    leaving the real ones untouched.
+    """
+    from blob_store import BlobStore
+    from cache_store import DiskCache
+    from history_store import HistoryIndex, JsonlStore
+    from ollama_client import OllamaClient
+    from ollama_pool import OllamaPool
+
+    analyzer.results_store = JsonlStore(os.path.join(folder, "results.jsonl"))
+    analyzer.history_index = HistoryIndex(
+        os.path.join(folder, "history.db"),
+        analyzer.results_store,
+        text_loader=lambda e: analyzer.entry_blob(e, "document_text"),
+    )
+    analyzer.blob_store = BlobStore(os.path.join(folder, "blobs.db"))
+    analyzer.extract_cache = DiskCache(os.path.join(folder, "extract.db"))
+    analyzer.response_cache = DiskCache(os.path.join(folder, "responses.db"))
+    analyzer.ocr_cache = DiskCache(os.path.join(folder, "ocr.db"))
+    if isinstance(fake_urls, str):
+        fake_urls = [fake_urls]
+    if len(fake_urls) > 1:
+        analyzer.ollama_client = OllamaPool(
+            fake_urls, pool_size=analyzer.OLLAMA_POOL_SIZE, health_interval=1.0
+        )
+    else:
+        analyzer.ollama_client = OllamaClient(
+            fake_urls[0], pool_size=analyzer.OLLAMA_POOL_SIZE, cli_fallback=False
+        )
+
+
+def run_benchmark(args):
+    import analyzer
+
+    fakes = [
+        FakeOllama(
+            latency=args.latency,
+            token_rate=args.token_rate,
+            load_time=args.load_time,
+            fail_rate=args.fail_rate,
+            slow_rate=args.slow_rate,
+        ).start()
+        for _ in range(max(1, args.backends))
+    ]
+    analyzer.call_policy.hedge_quantile = args.hedge
+    recorder = StageRecorder()
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            corpus = os.path.join(folder, "corpus")
+            os.makedirs(corpus)
+            paths = build_corpus(corpus, args.documents, args.seed)
+            isolate(analyzer, folder, [fake.url for fake in fakes])
+            analyzer.stage_listeners.append(recorder)
+            image_model = None if args.no_ocr else args.image_model
+
+            def analyze(path):
+                t0 = time.perf_counter()
+                analyzer.validate_resume_local(
+                    path, args.text_model, image_model, use_cache=args.warm
+                )
+                return time.perf_counter() - t0
+
+            tracemalloc.start()
+            doc_times = []
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+                for _ in range(args.repeat):
+                    if not args.warm:
+                        analyzer.extract_cache.clear()
+                        analyzer.ocr_cache.clear()
+                    doc_times.extend(pool.map(analyze, paths))
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            analyzer.stage_listeners.remove(recorder)
+            analyzer.ollama_client.close()
+    finally:
+        for fake in fakes:
+            fake.stop()
+
+    report = {
+        "documents": len(doc_times),
+        "seconds": elapsed,
+        "documents_per_minute": len(doc_times) / elapsed * 60 if elapsed else 0.0,
+        "model_requests": sum(fake.requests for fake in fakes),
+        "model_loads": sum(fake.loads for fake in fakes),
+        "backend_requests": [fake.requests for fake in fakes],
+        "backend_failures": sum(fake.failures for fake in fakes),
+        "call_outcomes": analyzer.call_policy.stats(),
+        "peak_memory_bytes": peak,
+        "document": summarize(doc_times, peak),
+        "stages": {
+            stage: summarize(recorder.durations[stage], recorder.peaks[stage])
+            for stage in STAGES
+            if recorder.durations[stage]
+        },
+    }
+    return report
+
+
+def summarize(durations, peak):
+    total = sum(durations)
+    return {
+        "count": len(durations),
+        "total_s": total,
+        "per_second": len(durations) / total if total else 0.0,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p95_ms": percentile(durations, 95) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def print_report(report):
+    print(
+        f"{report['documents']} documentos em {report['seconds']:.1f}s "
+        f"({report['documents_per_minute']:.1f}/min), "
+        f"{report['model_requests']} chamadas ao modelo, "
+        f"{report['model_loads']} carregamentos de modelo, "
+        f"pico de memória {report['peak_memory_bytes'] / (1024 * 1024):.1f} MB"
+    )
+    if len(report["backend_requests"]) > 1:
+        counts = ", ".join(str(n) for n in report["backend_requests"])
+        print(f"chamadas por servidor: {counts}")
+    for call, s in report["call_outcomes"].items():
+        if set(s["outcomes"]) - {"ok"}:
+            outcomes = ", ".join(f"{o} {n}" for o, n in sorted(s["outcomes"].items()))
+            print(f"chamadas {call}: {outcomes}")
+    header = f"{'etapa':<12}{'n':>6}{'/s':>9}{'p50 ms':>10}{'p95 ms':>10}"
+    print(header + f"{'p99 ms':>10}{'pico MB':>10}")
+    rows = [("documento", report["document"])] + list(report["stages"].items())
+    for stage, s in rows:
+        print(
+            f"{stage:<12}{s['count']:>6}{s['per_second']:>9.1f}{s['p50_ms']:>10.1f}"
+            f"{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['peak_mb']:>10.2f}"
+        )
+
+
+# --- Import budget ------------------------------------------------------------------
+
+
+def measure_import(module="main", runs=5):
+    """
+    Import `module` in `runs` fresh interpreters. Returns the fastest import
+    in ms and the LAZY_MODULES that got loaded along with it.
+    """
+    code = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - t)\n"
+        "print(' '.join(sys.modules))\n"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    loaded = set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=here,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        elapsed = float(out[0]) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+        loaded.update(m for m in out[1].split() if m in LAZY_MODULES)
+    return best, sorted(loaded)
+
+
+def check_import_time(budget_ms=IMPORT_BUDGET_MS, module="main", runs=5):
+    """
+    Check measure_import() against `budget_ms` and LAZY_MODULES. Returns
+    (best_ms, problems). Also run by tests/test_import_time.py.
+    """
+    best, loaded = measure_import(module, runs)
+    problems = []
+    if best > budget_ms:
+        problems.append(f"import {module}: {best:.0f} ms > {budget_ms} ms")
+    for name in loaded:
+        problems.append(f"import {module} carregou {name}")
+    return best, problems
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de análise")
+    parser.add_argument("--documents", type=int, default=9)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="segundos até o primeiro token"
+    )
+    parser.add_argument(
+        "--token-rate", type=float, default=200.0, help="tokens gerados por segundo"
+    )
+    parser.add_argument(
+        "--load-time",
+        type=float,
+        default=0.0,
+        help="segundos para carregar um modelo que não está em memória",
+    )
+    parser.add_argument(
+        "--backends",
+        type=int,
+        default=1,
+        help="servidores falsos, balanceados com OllamaPool",
+    )
+    parser.add_argument(
+        "--parallel", type=int, default=1, help="documentos analisados ao mesmo tempo"
+    )
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.0,
+        help="fração das gerações respondidas com HTTP 503",
+    )
+    parser.add_argument(
+        "--slow-rate",
+        type=float,
+        default=0.0,
+        help="fração das gerações 10x mais lentas que --latency",
+    )
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        metavar="QUANTIL",
+        help="repete no próximo servidor as chamadas mais lentas que o quantil",
+    )
+    parser.add_argument("--text-model", default="llama3.1:8b")
+    parser.add_argument("--image-model", default="deepseek-ocr")
+    parser.add_argument("--no-ocr", action="store_true")
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="mantém os caches entre documentos (padrão: sempre a frio)",
+    )
+    parser.add_argument("--json", metavar="ARQUIVO", help="grava o relatório em JSON")
+    parser.add_argument(
+        "--serve", action="store_true", help="apenas sobe o servidor falso"
+    )
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument(
+        "--check-imports",
+        action="store_true",
+        help="verifica o tempo de `import main` e falha acima do orçamento",
+    )
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.check_imports:
+        best, problems = check_import_time(args.import_budget)
+        print(f"import main: {best:.0f} ms (orçamento {args.import_budget:.0f} ms)")
+        for problem in problems:
+            print(f"FALHA: {problem}")
+        return 1 if problems else 0
+
+    if args.serve:
+        fake = FakeOllama(
+            port=args.port,
+            latency=args.latency,
+            token_rate=args.token_rate,
+            load_time=args.load_time,
+        )
+        print(f"Servidor falso do Ollama em {fake.url}")
+        try:
+            fake.server.serve_forever()
+        except KeyboardInterrupt:
+            fake.server.server_close()
+        return 0
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import hashlib
+import zlib
+
+from sqlite_store import LocalConnection
+
+
+class BlobStore:
+    """
+    Content-addressed store of large texts (prompts, raw responses) kept
+    zlib-compressed in a SQLite file. A text is stored once however many
+    entries refer to it: put() returns its sha256 and counts a reference,
+    release() drops one and deletes the blob when none is left.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS blobs (
+        key TEXT PRIMARY KEY,
+        data BLOB,
+        size INTEGER,
+        refs INTEGER
+    );
+    """
+
+    def __init__(self, path, level=6):
+        self.path = path
+        self.level = level
+        self._db = LocalConnection(path, self.SCHEMA)
+
+    def _conn(self):
+        return self._db.get()
+
+    def put(self, text):
+        data = text.encode("utf-8")
+        key = hashlib.sha256(data).hexdigest()
+        conn = self._conn()
+        cur = conn.execute("UPDATE blobs SET refs = refs + 1 WHERE key = ?", (key,))
+        if cur.rowcount == 0:
+            conn.execute(
+                "INSERT INTO blobs VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET refs = refs + 1",
+                (key, zlib.compress(data, self.level), len(data)),
+            )
+        return key
+
+    def get(self, key):
+        row = (
+            self._conn()
+            .execute("SELECT data FROM blobs WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def release(self, key):
+        conn = self._conn()
+        conn.execute("UPDATE blobs SET refs = refs - 1 WHERE key = ?", (key,))
+        conn.execute("DELETE FROM blobs WHERE key = ? AND refs <= 0", (key,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM blobs")
+
+    def stats(self):
+        count, size, stored = (
+            self._conn()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), "
+                "COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+            )
+            .fetchone()
+        )
+        return {"blobs": count, "bytes": size, "stored_bytes": stored}
@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+
+from sqlite_store import LocalConnection
+
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Persistent key/value cache of bytes stored in a SQLite file.
+
+    Entries are evicted least-recently-used first once the total size exceeds
+    `max_bytes`, and expire `ttl` seconds after being stored (if set). Hit and
+    miss counters are kept per process.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB,
+        size INTEGER,
+        created REAL,
+        accessed REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed);
+    CREATE INDEX IF NOT EXISTS idx_cache_created ON cache(created);
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._db = LocalConnection(path, self.SCHEMA)
+        self._counter_lock = threading.Lock()
+
+    def _conn(self):
+        return self._db.get()
+
+    def _count(self, hit):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, created FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            self._count(False)
+            return None
+        conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return bytes(row[0])
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value), now, now),
+        )
+        self.evict()
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def evict(self):
+        """
+        Drop expired entries, then least recently used ones until the cache
+        fits in max_bytes.
+        """
+        conn = self._conn()
+        if self.ttl is not None:
+            expired = time.time() - self.ttl
+            conn.execute("DELETE FROM cache WHERE created < ?", (expired,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, size in conn.execute(
+                "SELECT key, size FROM cache ORDER BY accessed"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                total -= size
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def stats(self):
+        count, size = (
+            self._conn()
+            .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache")
+            .fetchone()
+        )
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": count,
+            "bytes": size,
+        }
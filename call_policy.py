@@ -0,0 +1,167 @@
+import random
+import threading
+import time
+from collections import deque
+
+from ollama_client import CancelToken, OllamaCancelled, OllamaError, OllamaUnavailable
+
+
+def is_transient(error):
+    """
+    Whether a failed model call is worth retrying: the server could not be
+    reached, the connection dropped or timed out, or it answered with an
+    overload/server error (429, 5xx). Bad requests and missing models are not.
+    """
+    if isinstance(error, OllamaCancelled):
+        return False
+    if isinstance(error, (OllamaUnavailable, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, OllamaError):
+        status = error.status
+        return status is not None and (status == 429 or status >= 500)
+    return False
+
+
+def outcome_of(error):
+    if isinstance(error, OllamaCancelled):
+        return "cancelled"
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    if isinstance(error, (OllamaUnavailable, ConnectionError)):
+        return "unavailable"
+    if isinstance(error, OllamaError) and is_transient(error):
+        return "server_error"
+    return "error"
+
+
+class CallPolicy:
+    """
+    Timeouts, retries and hedging for model calls, learned from how long the
+    calls of each (kind, model) actually take.
+
+    The timeout of a call is `timeout_factor` times the p95 of the last
+    `window` successful calls of that kind and model, within [min_timeout,
+    max_timeout]; until `min_samples` calls were seen the caller's default
+    is used. A call that failed transiently (see is_transient) is retried up
+    to `retries` times after a full-jitter exponential backoff (a random
+    wait of up to `backoff` * 2**attempt seconds, capped at `max_backoff`),
+    and the timeout is doubled after a timeout so a model that just got
+    slower is not cut off forever. With `hedge_quantile` (e.g. 0.9) calls
+    also get a hedge delay: the latency that quantile of calls finished
+    within, after which the request may be sent to a second backend.
+
+    Every attempt's outcome ("ok", "timeout", "unavailable", "server_error",
+    "error", "cancelled") is counted and passed to
+    `on_outcome(kind, model, outcome, seconds)`.
+    """
+
+    def __init__(
+        self,
+        min_timeout=30.0,
+        max_timeout=900.0,
+        timeout_factor=3.0,
+        min_samples=5,
+        window=100,
+        retries=2,
+        backoff=1.0,
+        max_backoff=20.0,
+        hedge_quantile=None,
+        on_outcome=None,
+    ):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.min_samples = min_samples
+        self.window = window
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_quantile = hedge_quantile
+        self.on_outcome = on_outcome
+        self._samples = {}  # (kind, model) -> deque of seconds
+        self._outcomes = {}  # (kind, model, outcome) -> count
+        self._lock = threading.Lock()
+
+    # Latency ----------------------------------------------------------------------
+    def _quantile(self, kind, model, q):
+        with self._lock:
+            samples = sorted(self._samples.get((kind, model), ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def observe(self, kind, model, seconds):
+        with self._lock:
+            samples = self._samples.get((kind, model))
+            if samples is None:
+                samples = self._samples[(kind, model)] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def timeout(self, kind, model, default):
+        p95 = self._quantile(kind, model, 0.95)
+        if p95 is None:
+            return default
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_factor))
+
+    def hedge_delay(self, kind, model):
+        if self.hedge_quantile is None:
+            return None
+        return self._quantile(kind, model, self.hedge_quantile)
+
+    # Calls ------------------------------------------------------------------------
+    def _record(self, kind, model, outcome, seconds):
+        with self._lock:
+            key = (kind, model, outcome)
+            self._outcomes[key] = self._outcomes.get(key, 0) + 1
+        if self.on_outcome is not None:
+            self.on_outcome(kind, model, outcome, seconds)
+
+    def call(self, kind, model, fn, default_timeout, cancel=None):
+        """
+        Run `fn(timeout, hedge_after)` under the policy and return its result.
+        The last error is raised once the retries are used up (or at once
+        when it is not transient); OllamaCancelled is never retried.
+        """
+        cancel = cancel or CancelToken()
+        timeout = self.timeout(kind, model, default_timeout)
+        hedge_after = self.hedge_delay(kind, model)
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                result = fn(timeout, hedge_after)
+            except Exception as e:
+                seconds = time.perf_counter() - started
+                self._record(kind, model, outcome_of(e), seconds)
+                if attempt >= self.retries or not is_transient(e):
+                    raise
+                if isinstance(e, TimeoutError):
+                    timeout = min(self.max_timeout, timeout * 2)
+                pause = random.uniform(
+                    0, min(self.max_backoff, self.backoff * 2**attempt)
+                )
+                if cancel.wait(pause):
+                    raise OllamaCancelled("cancelled") from e
+                attempt += 1
+                continue
+            seconds = time.perf_counter() - started
+            self.observe(kind, model, seconds)
+            self._record(kind, model, "ok", seconds)
+            return result
+
+    def stats(self):
+        """
+        Outcome counts and current timeout per (kind, model), for reports.
+        """
+        with self._lock:
+            keys = set(self._samples) | {k[:2] for k in self._outcomes}
+            outcomes = dict(self._outcomes)
+        return {
+            f"{kind}:{model}": {
+                "timeout": self.timeout(kind, model, None),
+                "outcomes": {
+                    o: n for (k, m, o), n in outcomes.items() if (k, m) == (kind, model)
+                },
+            }
+            for kind, model in sorted(keys)
+        }
@@ -0,0 +1,250 @@
+import importlib.util
+import os
+import threading
+import time
+
+from cache_store import sha256_file
+from sqlite_store import LocalConnection
+
+
+class WatchIndex:
+    """
+    SQLite record of the files a FolderWatcher has handed out: path, size,
+    mtime and content hash, plus the history entry of their analysis. A file
+    whose size and mtime match is skipped without being read; one whose
+    content hash matches (touched or copied again) is skipped without being
+    analyzed, also across restarts.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        size INTEGER,
+        mtime_ns INTEGER,
+        sha256 TEXT,
+        entry_id INTEGER,
+        analyzed TEXT
+    );
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._db = LocalConnection(db_path, self.SCHEMA)
+
+    def _conn(self):
+        return self._db.get()
+
+    def get(self, path):
+        row = (
+            self._conn()
+            .execute(
+                "SELECT size, mtime_ns, sha256, entry_id FROM files WHERE path = ?",
+                (path,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return dict(zip(("size", "mtime_ns", "sha256", "entry_id"), row))
+
+    def put(self, path, size, mtime_ns, sha256, entry_id=None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                size,
+                mtime_ns,
+                sha256,
+                entry_id,
+                time.strftime("%Y-%m-%dT%H:%M:%S"),
+            ),
+        )
+
+    def touch(self, path, size, mtime_ns):
+        """
+        Record a new size/mtime for a file whose content did not change.
+        """
+        self._conn().execute(
+            "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+            (size, mtime_ns, path),
+        )
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+
+def has_watchdog():
+    """
+    Whether the optional watchdog package (filesystem events) is installed.
+    """
+    return importlib.util.find_spec("watchdog") is not None
+
+
+class FolderWatcher:
+    """
+    Watches `folder` for new or changed files with one of `extensions` and
+    calls `on_ready(path, stat, sha256)` for each one whose content is not in
+    `index` yet, once its size and mtime have stayed the same for `debounce`
+    seconds (so a file still being copied is handed out once, complete).
+
+    Changes come from filesystem events when the optional watchdog package
+    is installed. Without it the watcher runs in a degraded polling mode:
+    the whole folder is listed (and every entry stat'ed) every `interval`
+    seconds, so new files are noticed up to `interval` seconds late; only
+    entries whose size or mtime changed are looked at further. Files are
+    only read (hashed) once they settle.
+    """
+
+    def __init__(
+        self,
+        folder,
+        index,
+        on_ready,
+        extensions,
+        debounce=2.0,
+        interval=30.0,
+        recursive=False,
+    ):
+        self.folder = os.path.abspath(folder)
+        self.index = index
+        self.on_ready = on_ready
+        self.extensions = {e.lower() for e in extensions}
+        self.debounce = debounce
+        self.interval = interval
+        self.recursive = recursive
+        self.seen = {}  # path -> (size, mtime_ns) already handled
+        self._pending = {}  # path -> (size, mtime_ns, settled_at)
+        self._lock = threading.Lock()
+
+    def _wanted(self, path):
+        return os.path.splitext(path)[1].lower() in self.extensions
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    # Change detection -------------------------------------------------------------
+    def notice(self, path):
+        """
+        Note that `path` may have changed; it is checked once it settles.
+        """
+        path = os.path.abspath(path)
+        if not self._wanted(path):
+            return
+        with self._lock:
+            if path not in self._pending:
+                self._pending[path] = (None, None, 0.0)
+
+    def scan(self):
+        """
+        Compare the folder listing with what was already handled and mark
+        new or changed entries as pending.
+        """
+        stack = [self.folder]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.recursive:
+                        stack.append(entry.path)
+                    continue
+                if not self._wanted(entry.name):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if self.seen.get(entry.path) != (st.st_size, st.st_mtime_ns):
+                    self.notice(entry.path)
+
+    def settle(self):
+        """
+        Hand out the pending files that stopped changing.
+        """
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, (size, mtime_ns, settled_at) in list(self._pending.items()):
+                stat = self._stat(path)
+                if stat is None:
+                    del self._pending[path]
+                    self.seen.pop(path, None)
+                elif stat != (size, mtime_ns):
+                    # still being written: restart the debounce window
+                    self._pending[path] = stat + (now + self.debounce,)
+                elif now >= settled_at:
+                    del self._pending[path]
+                    ready.append((path, stat))
+        for path, stat in ready:
+            self._ready(path, stat)
+
+    def _ready(self, path, stat):
+        self.seen[path] = stat
+        known = self.index.get(path)
+        if known and (known["size"], known["mtime_ns"]) == stat:
+            return
+        try:
+            digest = sha256_file(path)
+        except OSError:
+            self.seen.pop(path, None)
+            return
+        if known and known["sha256"] == digest:
+            self.index.touch(path, *stat)
+            return
+        self.on_ready(path, stat, digest)
+
+    # Running ----------------------------------------------------------------------
+    def _observe(self):
+        """
+        Start a watchdog observer feeding notice(), or return None when the
+        package is not installed.
+        """
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                for path in (event.src_path, getattr(event, "dest_path", "")):
+                    if path:
+                        watcher.notice(path)
+
+        observer = Observer()
+        observer.schedule(Handler(), self.folder, recursive=self.recursive)
+        observer.start()
+        return observer
+
+    def run(self, stop):
+        """
+        Watch until the `stop` event is set. The folder is listed once at
+        start to catch files that arrived while nothing was watching, and
+        again every `interval` seconds only when polling.
+        """
+        self.scan()
+        observer = self._observe()
+        # pending files are checked often; the folder is only listed rarely
+        tick = max(0.05, min(1.0, self.debounce / 2))
+        next_scan = time.monotonic() + self.interval
+        try:
+            while not stop.wait(tick):
+                if observer is None and time.monotonic() >= next_scan:
+                    self.scan()
+                    next_scan = time.monotonic() + self.interval
+                self.settle()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
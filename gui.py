@@ -0,0 +1,950 @@
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog, scrolledtext, messagebox
+from analyzer import (
+    APP_TITLE,
+    HISTORY_PAGE_SIZE,
+    IMAGE_MODELS,
+    REQUIREMENTS,
+    RESULTS_FILE,
+    TEXT_MODELS,
+    clear_history_file,
+    delete_history_entry,
+    entry_blob,
+    history_report,
+    export_entry_to_pdf,
+    export_entry_to_txt,
+    load_history_entry,
+    load_history_page,
+    resident_models,
+    response_cache,
+    worker_analyze,
+    worker_prepare,
+)
+from history_store import HistoryIndex
+from job_queue import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobScheduler
+
+
+JOB_SLOTS = 2  # analyses running at the same time
+RESIDENT_POLL_MS = 10000  # how often the loaded-models label is refreshed
+STAGE_LABELS = {
+    "extraction": "Extraindo texto",
+    "ocr": "OCR das imagens",
+    "prompt": "Montando prompt",
+    "model": "Analisando",
+    "parse": "Validando resposta",
+    "persist": "Salvando",
+}
+
+
+class ResumeAnalyzerApp:
+    def __init__(self, root):
+        self.root = root
+        self.root.title(APP_TITLE)
+        self.root.geometry("1200x780")
+        self.queue = queue.Queue()
+
+        # Top frame: controls
+        top_frame = ttk.Frame(root)
+        top_frame.pack(side=tk.TOP, fill=tk.X, padx=8, pady=8)
+
+        # Text model selector
+        ttk.Label(top_frame, text="Modelo de texto:").pack(side=tk.LEFT, padx=(0, 6))
+        self.text_model_var = tk.StringVar(value=TEXT_MODELS[0])
+        models = TEXT_MODELS
+        self.model_combo = ttk.Combobox(
+            top_frame, values=models, textvariable=self.text_model_var, width=22
+        )
+        self.model_combo.pack(side=tk.LEFT, padx=(0, 10))
+
+        # Image model selector
+        ttk.Label(top_frame, text="Modelo de imagem:").pack(side=tk.LEFT, padx=(0, 6))
+        self.image_model_var = tk.StringVar(value=IMAGE_MODELS[0])
+        models = IMAGE_MODELS
+        self.model_combo = ttk.Combobox(
+            top_frame, values=models, textvariable=self.image_model_var, width=22
+        )
+        self.model_combo.pack(side=tk.LEFT, padx=(0, 10))
+
+        # Bypass the response cache (forced re-run)
+        self.no_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            top_frame, text="Ignorar cache", variable=self.no_cache_var
+        ).pack(side=tk.LEFT, padx=(0, 10))
+
+        # Select file button
+        self.btn_select = ttk.Button(
+            top_frame, text="Selecionar Arquivos", command=self.select_file
+        )
+        self.btn_select.pack(side=tk.LEFT, padx=(0, 10))
+
+        # Delete selected
+        self.delete_button = ttk.Button(
+            top_frame, text="Excluir Selecionado", command=self.delete_selected
+        )
+        self.delete_button.pack(side=tk.LEFT, padx=(0, 10))
+
+        # Re-run selected
+        self.btn_rerun = ttk.Button(
+            top_frame, text="Rodar novamente", command=self.rerun_selected
+        )
+        self.btn_rerun.pack(side=tk.LEFT, padx=(0, 10))
+
+        # Export
+        self.btn_export = ttk.Button(
+            top_frame,
+            text="Exportar selecionado (PDF/TXT)",
+            command=self.export_selected,
+        )
+        self.btn_export.pack(side=tk.LEFT, padx=(0, 10))
+
+        # Clear history
+        self.btn_clear = ttk.Button(
+            top_frame, text="Limpar histórico", command=self.clear_history_confirm
+        )
+        self.btn_clear.pack(side=tk.LEFT, padx=(0, 10))
+
+        # Progress bar
+        self.progress = ttk.Progressbar(root, mode="indeterminate")
+        self.progress.pack(fill=tk.X, padx=8, pady=(0, 8))
+
+        # Job queue: queued and running analyses
+        jobs_frame = ttk.Frame(root)
+        jobs_frame.pack(fill=tk.X, padx=8)
+        self.job_tree = ttk.Treeview(
+            jobs_frame,
+            columns=("file", "models", "priority", "state"),
+            show="headings",
+            height=5,
+        )
+        for col, title, width in (
+            ("file", "Arquivo", 260),
+            ("models", "Modelos", 260),
+            ("priority", "Prioridade", 80),
+            ("state", "Estado", 300),
+        ):
+            self.job_tree.heading(col, text=title)
+            self.job_tree.column(col, width=width, anchor=tk.W)
+        self.job_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.job_tree.bind("<<TreeviewSelect>>", self.on_job_select)
+
+        jb = ttk.Frame(jobs_frame)
+        jb.pack(side=tk.LEFT, fill=tk.Y, padx=(8, 0))
+        self.btn_cancel = ttk.Button(
+            jb, text="Cancelar", command=self.cancel_analysis
+        )
+        self.btn_cancel.pack(fill=tk.X)
+        ttk.Button(jb, text="Cancelar todos", command=self.cancel_all_jobs).pack(
+            fill=tk.X
+        )
+        ttk.Button(jb, text="▲ Prioridade", command=self.raise_priority).pack(
+            fill=tk.X
+        )
+        ttk.Button(jb, text="▼ Prioridade", command=self.lower_priority).pack(
+            fill=tk.X
+        )
+        ttk.Button(
+            jb, text="Limpar concluídos", command=self.clear_finished_jobs
+        ).pack(fill=tk.X)
+        slots = ttk.Frame(jb)
+        slots.pack(fill=tk.X, pady=(4, 0))
+        ttk.Label(slots, text="Simultâneas:").pack(side=tk.LEFT)
+        self.slots_var = tk.IntVar(value=JOB_SLOTS)
+        ttk.Spinbox(
+            slots,
+            from_=1,
+            to=8,
+            width=3,
+            textvariable=self.slots_var,
+            command=self.update_slots,
+        ).pack(side=tk.LEFT)
+        self.resident_var = tk.StringVar(value="Modelos carregados: ?")
+        ttk.Label(jb, textvariable=self.resident_var, wraplength=160).pack(
+            fill=tk.X, pady=(4, 0)
+        )
+
+        # History search: words in the CV text, detalhes and melhorias, plus
+        # field filters, answered by the history index
+        search_frame = ttk.Frame(root)
+        search_frame.pack(fill=tk.X, padx=8, pady=(8, 0))
+        ttk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30)
+        search_entry.pack(side=tk.LEFT, padx=(4, 10))
+        search_entry.bind("<KeyRelease>", self.schedule_search)
+        ttk.Label(search_frame, text="Nota de").pack(side=tk.LEFT)
+        self.min_score_var = tk.StringVar()
+        self.max_score_var = tk.StringVar()
+        for var, label in ((self.min_score_var, "a"), (self.max_score_var, None)):
+            entry = ttk.Entry(search_frame, textvariable=var, width=5)
+            entry.pack(side=tk.LEFT, padx=4)
+            entry.bind("<KeyRelease>", self.schedule_search)
+            if label:
+                ttk.Label(search_frame, text=label).pack(side=tk.LEFT)
+        self.filter_model_var = tk.StringVar()
+        self.filter_item_var = tk.StringVar()
+        self.filter_status_var = tk.StringVar()
+        statuses = ["Atende", "Parcial", "Não atende"]
+        for label, var, values, width in (
+            ("Modelo:", self.filter_model_var, TEXT_MODELS, 16),
+            ("Requisito:", self.filter_item_var, REQUIREMENTS, 28),
+            ("Status:", self.filter_status_var, statuses, 12),
+        ):
+            ttk.Label(search_frame, text=label).pack(side=tk.LEFT, padx=(6, 0))
+            combo = ttk.Combobox(
+                search_frame, textvariable=var, values=[""] + values, width=width
+            )
+            combo.pack(side=tk.LEFT, padx=4)
+            combo.bind("<<ComboboxSelected>>", self.apply_search)
+            combo.bind("<KeyRelease>", self.schedule_search)
+        ttk.Button(search_frame, text="Limpar", command=self.clear_search).pack(
+            side=tk.LEFT, padx=(6, 0)
+        )
+        self.search_after = None
+
+        # Main frames: left history, right details
+        main_frame = ttk.Frame(root)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+
+        left = ttk.Frame(main_frame, width=280)
+        left.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 8))
+
+        ttk.Label(left, text=f"Histórico ({RESULTS_FILE}):").pack(anchor=tk.W)
+        self.history_list = tk.Listbox(left, width=40, activestyle="dotbox")
+        self.history_list.pack(fill=tk.Y, expand=True)
+        self.history_list.bind("<<ListboxSelect>>", self.on_history_select)
+        self.history_list.bind("<Double-1>", self.open_selected_file)
+
+        # Pager
+        pager = ttk.Frame(left)
+        pager.pack(fill=tk.X, pady=(6, 0))
+        ttk.Button(pager, text="◀", width=3, command=self.prev_page).pack(
+            side=tk.LEFT
+        )
+        ttk.Button(pager, text="▶", width=3, command=self.next_page).pack(
+            side=tk.RIGHT
+        )
+        self.page_var = tk.StringVar(value="")
+        ttk.Label(pager, textvariable=self.page_var, anchor=tk.CENTER).pack(
+            fill=tk.X, expand=True
+        )
+
+        # Buttons under list
+        hb = ttk.Frame(left)
+        hb.pack(fill=tk.X, pady=(6, 0))
+        ttk.Button(hb, text="Atualizar", command=self.reload_history).pack(
+            side=tk.LEFT, padx=(0, 6)
+        )
+        ttk.Button(hb, text="Abrir pasta", command=self.open_results_folder).pack(
+            side=tk.LEFT
+        )
+
+        # Right side: result display
+        right = ttk.Frame(main_frame)
+        right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        meta_frame = ttk.Frame(right)
+        meta_frame.pack(fill=tk.X)
+        self.meta_label = ttk.Label(
+            meta_frame,
+            text="Selecione um item do histórico ou faça uma nova análise",
+            anchor=tk.W,
+        )
+        self.meta_label.pack(fill=tk.X, padx=2, pady=2)
+
+        self.tabs = ttk.Notebook(right)
+        self.tabs.pack(fill=tk.BOTH, expand=True)
+
+        # --- Result tab
+        result_frame = ttk.Frame(self.tabs)
+        self.result_text = scrolledtext.ScrolledText(
+            result_frame, font=("Consolas", 11), wrap=tk.WORD
+        )
+        self.result_text.pack(fill=tk.BOTH, expand=True)
+        self.tabs.add(result_frame, text="Resultado")
+
+        # --- Prompt tab (filled from the blob store when first shown)
+        self.prompt_frame = ttk.Frame(self.tabs)
+        self.prompt_text = scrolledtext.ScrolledText(
+            self.prompt_frame, font=("Consolas", 10), wrap=tk.WORD
+        )
+        self.prompt_text.pack(fill=tk.BOTH, expand=True)
+        self.tabs.add(self.prompt_frame, text="Prompt")
+        self.prompt_entry = None
+        self.tabs.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+        # --- Metrics tab
+        metrics_frame = ttk.Frame(self.tabs)
+        self.metrics_text = scrolledtext.ScrolledText(
+            metrics_frame, font=("Consolas", 10), wrap=tk.NONE
+        )
+        self.metrics_text.pack(fill=tk.BOTH, expand=True)
+        self.tabs.add(metrics_frame, text="Métricas")
+
+        # --- Summary tab: model comparison over the whole history
+        self.summary_frame = ttk.Frame(self.tabs)
+        self.summary_text = scrolledtext.ScrolledText(
+            self.summary_frame, font=("Consolas", 10), wrap=tk.NONE
+        )
+        self.summary_text.pack(fill=tk.BOTH, expand=True)
+        self.tabs.add(self.summary_frame, text="Resumo")
+
+        self.result_text.tag_configure("title", font=("Consolas", 14, "bold"))
+        self.result_text.tag_configure("bold", font=("Consolas", 11, "bold"))
+        self.result_text.tag_configure("stream", foreground="gray40")
+
+        # Last row: status
+        self.status_var = tk.StringVar(value="Pronto")
+        status_bar = ttk.Label(
+            root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W
+        )
+        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+
+        # Load first history page initially
+        self.history = []
+        self.history_total = 0
+        self.page = 0
+        self.reload_history()
+
+        # Job scheduler; worker events are polled from self.queue
+        self.scheduler = JobScheduler(
+            self.run_job,
+            slots=JOB_SLOTS,
+            on_event=lambda job, status, payload: self.queue.put(
+                (job, status, payload)
+            ),
+            affinity=self.job_model,
+        )
+        self.focus_job = None
+        self.job_output = {}
+        self.progress_running = False
+        self.root.after(200, self.check_queue)
+        self.poll_resident_models()
+
+    # History management -----------------------------------------------------------
+    def reload_history(self):
+        # only the visible page of lightweight rows is loaded
+        filters = self.history_filters()
+        started = time.perf_counter()
+        self.history, self.history_total = load_history_page(self.page, **filters)
+        if not self.history and self.page > 0:
+            self.page = max(0, (self.history_total - 1) // HISTORY_PAGE_SIZE)
+            self.history, self.history_total = load_history_page(
+                self.page, **filters
+            )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.history_list.delete(0, tk.END)
+        self.history_list.insert(tk.END, *map(self.history_label, self.history))
+        self.update_page_label()
+        if filters:
+            self.status_var.set(
+                f"Busca: {self.history_total} resultados ({elapsed_ms:.0f} ms)"
+            )
+        else:
+            self.status_var.set(f"Histórico carregado: {self.history_total} itens")
+
+    def history_filters(self):
+        """
+        Search filters from the search bar, for load_history_page.
+        """
+        filters = {}
+        text = self.search_var.get().strip()
+        if text:
+            filters["query"] = text
+        for key, var in (
+            ("min_score", self.min_score_var),
+            ("max_score", self.max_score_var),
+        ):
+            try:
+                filters[key] = float(var.get().replace(",", "."))
+            except ValueError:
+                pass
+        for key, var in (
+            ("text_model", self.filter_model_var),
+            ("item", self.filter_item_var),
+            ("status", self.filter_status_var),
+        ):
+            if var.get().strip():
+                filters[key] = var.get().strip()
+        return filters
+
+    def schedule_search(self, event=None):
+        # search as the user types, once typing pauses
+        if self.search_after is not None:
+            self.root.after_cancel(self.search_after)
+        self.search_after = self.root.after(300, self.apply_search)
+
+    def apply_search(self, event=None):
+        self.search_after = None
+        self.page = 0
+        self.reload_history()
+
+    def clear_search(self):
+        for var in (
+            self.search_var,
+            self.min_score_var,
+            self.max_score_var,
+            self.filter_model_var,
+            self.filter_item_var,
+            self.filter_status_var,
+        ):
+            var.set("")
+        self.apply_search()
+
+    @staticmethod
+    def history_label(row):
+        ts = row.get("timestamp") or ""
+        fname = row.get("file") or "unknown"
+        model = row.get("text_model") or ""
+        return f"{fname} — {ts.split('T')[0]} — {model}"
+
+    def update_page_label(self):
+        pages = max(1, -(-self.history_total // HISTORY_PAGE_SIZE))
+        self.page_var.set(f"Página {self.page + 1}/{pages}")
+
+    def prev_page(self):
+        if self.page > 0:
+            self.page -= 1
+            self.reload_history()
+
+    def next_page(self):
+        if (self.page + 1) * HISTORY_PAGE_SIZE < self.history_total:
+            self.page += 1
+            self.reload_history()
+
+    def add_history_row(self, entry):
+        """
+        Show a freshly saved entry without reloading the whole page.
+        """
+        if self.history_filters():
+            # whether it matches the search is up to the index
+            self.reload_history()
+            return False
+        self.history_total += 1
+        self.update_page_label()
+        if self.page != 0:
+            return False
+        row = {col: entry.get(col) for col in HistoryIndex.ROW_COLUMNS}
+        self.history.insert(0, row)
+        self.history_list.insert(0, self.history_label(row))
+        if len(self.history) > HISTORY_PAGE_SIZE:
+            self.history.pop()
+            self.history_list.delete(tk.END)
+        return True
+
+    def selected_entry(self):
+        """
+        Full entry (including prompt and raw response) for the selected row.
+        """
+        sel = self.history_list.curselection()
+        if not sel:
+            return None
+        return load_history_entry(self.history[sel[0]]["id"])
+
+    def open_results_folder(self):
+        folder = os.getcwd()
+        try:
+            if os.name == "nt":
+                os.startfile(folder)
+            elif os.name == "posix":
+                subprocess.Popen(["xdg-open", folder])
+            else:
+                messagebox.showinfo("Pasta", f"Pasta atual: {folder}")
+        except Exception as e:
+            messagebox.showerror("Erro", f"Não foi possível abrir a pasta: {e}")
+
+    def clear_history_confirm(self):
+        if messagebox.askyesno(
+            "Confirmar",
+            f"Deseja limpar completamente o histórico ({RESULTS_FILE})?",
+        ):
+            try:
+                clear_history_file()
+                self.reload_history()
+                self.result_text.delete(1.0, tk.END)
+                self.result_text.tag_configure("bold", font=("Arial", 10, "bold"))
+                self.meta_label.config(text="Histórico limpo")
+                self.status_var.set("Histórico limpo")
+            except Exception as e:
+                messagebox.showerror("Erro", f"Não foi possível limpar: {e}")
+
+    def open_selected_file(self, event=None):
+        selection = self.history_list.curselection()
+        if not selection:
+            return
+
+        index = selection[0]
+        row = self.history[index]
+        file_path = row.get("path") or row.get("file")
+
+        if file_path and os.path.exists(file_path):
+            os.startfile(file_path)  # Windows
+        else:
+            messagebox.showerror("Erro", "Arquivo não encontrado.")
+
+    # Selection / display ---------------------------------------------------------
+    def on_history_select(self, event=None):
+        entry = self.selected_entry()
+        if entry is None:
+            return
+        self.display_entry(entry)
+
+    def display_entry(self, entry):
+        self.meta_label.config(
+            text=f"{entry.get('file','')} — {entry.get('timestamp','')} — {entry.get('text_model') or entry.get('model','')}"
+        )
+
+        result = entry.get("result", {})
+        self.result_text.delete(1.0, tk.END)
+
+        # --- Prompt tab content, loaded only when the tab is shown
+        self.prompt_text.delete(1.0, tk.END)
+        self.prompt_entry = entry
+        if self.tabs.select() == str(self.prompt_frame):
+            self.load_prompt_tab()
+
+        # --- Metrics tab content
+        self.metrics_text.delete(1.0, tk.END)
+        self.metrics_text.insert(tk.END, self.metrics_report(entry.get("metrics")))
+
+        if "error" in result:
+            self.result_text.insert(
+                tk.END, json.dumps(result, indent=2, ensure_ascii=False)
+            )
+            return
+
+        lines = []
+
+        validacao = result.get("validacao", [])
+        for item in validacao:
+            lines.extend(self.item_lines(item))
+
+        lines.append(("Pontuação Final:\n", "title"))
+        lines.append((f"{result.get('pontuacao_final', '')}\n\n", None))
+
+        melhorias = result.get("melhorias_recomendadas", "")
+        if melhorias:
+            lines.append(("Melhorias Recomendadas:\n", "title"))
+            lines.append((f"{melhorias}\n", None))
+
+        # Send to text box
+        for text, tag in lines:
+            if tag:
+                self.result_text.insert(tk.END, text, tag)
+            else:
+                self.result_text.insert(tk.END, text)
+
+        self.status_var.set(f"Exibindo item: {entry.get('file','')}")
+
+    def on_tab_changed(self, event=None):
+        if self.tabs.select() == str(self.prompt_frame):
+            self.load_prompt_tab()
+        elif self.tabs.select() == str(self.summary_frame):
+            self.load_summary_tab()
+
+    def load_summary_tab(self):
+        # recomputed each time the tab is shown; the index does the work
+        self.summary_text.delete(1.0, tk.END)
+        self.summary_text.insert(tk.END, history_report())
+
+    def load_prompt_tab(self):
+        entry, self.prompt_entry = self.prompt_entry, None
+        if entry is None:
+            return
+        prompt = entry_blob(entry, "prompt")
+        self.prompt_text.insert(tk.END, prompt or "[Prompt não disponível]")
+
+    @staticmethod
+    def metrics_report(metrics):
+        if not metrics:
+            return "[Métricas não disponíveis]"
+        lines = [f"Tempo total: {metrics.get('total_seconds', 0):.2f}s", ""]
+        lines.append(f"{'Etapa':<14}{'Tempo (s)':>10}{'Vezes':>7}")
+        for stage, value in metrics.get("stages", {}).items():
+            lines.append(f"{stage:<14}{value['seconds']:>10.2f}{value['count']:>7}")
+        lines.append("")
+        lines.append(
+            f"Tokens: {metrics.get('prompt_tokens', 0)} no prompt, "
+            f"{metrics.get('response_tokens', 0)} na resposta"
+        )
+        for name, value in metrics.get("sizes", {}).items():
+            lines.append(f"{name}: {value}")
+        calls = metrics.get("calls", [])
+        if calls:
+            lines.append("")
+            lines.append(
+                f"{'Chamada':<8}{'Modelo':<18}{'Tempo (s)':>10}"
+                f"{'Tok. prompt':>12}{'Tok. resp.':>11}{'Bytes env.':>12}"
+            )
+            for call in calls:
+                lines.append(
+                    f"{call['kind']:<8}{call['model']:<18}{call['seconds']:>10.2f}"
+                    f"{call['prompt_tokens'] or '-':>12}"
+                    f"{call['response_tokens'] or '-':>11}"
+                    f"{call['prompt_bytes']:>12}"
+                )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def item_lines(item):
+        titulo = item.get("item", "Item")
+        status = item.get("status", "")
+        detalhes = item.get("detalhes", "")
+        return [
+            (f"{titulo}\n", "title"),
+            ("Status: ", "bold"),
+            (f"{status}\n", None),
+            ("Detalhes: ", "bold"),
+            (f"{detalhes}\n\n", None),
+        ]
+
+    # Streaming output -------------------------------------------------------------
+    def begin_stream(self, path):
+        self.tabs.select(0)
+        self.meta_label.config(text=f"{os.path.basename(path)} — em andamento")
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, "\n[Resposta em andamento]\n", "bold")
+        # completed validacao items go above the raw token stream
+        self.result_text.mark_set("items_end", "1.0")
+        self.result_text.mark_gravity("items_end", tk.RIGHT)
+
+    def append_stream_token(self, token):
+        self.result_text.insert(tk.END, token, "stream")
+        self.result_text.see(tk.END)
+
+    def append_stream_item(self, item):
+        if not isinstance(item, dict):
+            return
+        for text, tag in self.item_lines(item):
+            self.result_text.insert("items_end", text, tag or ())
+
+    # File selection and analysis -----------------------------------------------
+    def select_file(self):
+        paths = filedialog.askopenfilenames(
+            title="Selecione os arquivos",
+            filetypes=[
+                ("Documentos", "*.docx;*.pdf;*.png;*.jpg;*.jpeg;*.webp"),
+                ("Imagens", "*.png;*.jpg;*.jpeg;*.webp"),
+            ],
+        )
+        for path in paths:
+            self.run_analysis(path)
+
+    def delete_selected(self):
+        selection = self.history_list.curselection()
+        if not selection:
+            messagebox.showerror("Erro", "Nenhum item selecionado.")
+            return
+
+        index = selection[0]
+
+        confirm = messagebox.askyesno("Confirmar", "Deseja excluir este resultado?")
+        if not confirm:
+            return
+
+        # remove from history store and memory
+        row = self.history.pop(index)
+        delete_history_entry(row["id"])
+        self.history_total -= 1
+        self.update_page_label()
+
+        # update listbox
+        self.history_list.delete(index)
+
+        # clear the display panel
+        self.result_text.delete(1.0, tk.END)
+        self.meta_label.config(text="")
+
+    def rerun_selected(self):
+        sel = self.history_list.curselection()
+        if not sel:
+            messagebox.showinfo("Re-run", "Nenhum item selecionado no histórico.")
+            return
+        idx = sel[0]
+        row = self.history[idx]
+        path = row.get("path") or row.get("file")
+        if not path or not os.path.exists(path):
+            # allow user to locate file
+            messagebox.showinfo(
+                "Arquivo não encontrado",
+                "O arquivo original não foi encontrado. Selecione um arquivo para reexecutar.",
+            )
+            self.select_file()
+            return
+        self.run_analysis(path)
+
+    def run_analysis(self, path):
+        text_model = self.text_model_var.get().strip() or TEXT_MODELS[0]
+        image_model = self.image_model_var.get().strip() or IMAGE_MODELS[0]
+        job = self.scheduler.submit(
+            path,
+            text_model=text_model,
+            image_model=image_model,
+            use_cache=not self.no_cache_var.get(),
+        )
+        self.refresh_jobs()
+        self.status_var.set(
+            f"{os.path.basename(path)} adicionado à fila ({text_model} e {image_model})"
+        )
+        return job
+
+    @staticmethod
+    def job_model(job):
+        # step 0 extracts and OCRs with the image model, step 1 analyzes
+        return job.params["image_model" if job.step == 0 else "text_model"]
+
+    @staticmethod
+    def run_job(job, events):
+        # runs in the job's worker thread; True requeues the job for step 1
+        params = job.params
+        if job.step == 0:
+            job.state = worker_prepare(
+                job.path,
+                params["image_model"],
+                events,
+                params["use_cache"],
+                job.cancel_token,
+            )
+            return job.state is not None
+        worker_analyze(
+            job.path,
+            params["text_model"],
+            params["image_model"],
+            events,
+            params["use_cache"],
+            job.cancel_token,
+            True,
+            prepared=job.state,
+        )
+        job.state = None
+        return False
+
+    def poll_resident_models(self):
+        # ask Ollama off the Tk thread; the answer comes back through self.queue
+        def poll():
+            self.queue.put((None, "resident", resident_models()))
+
+        threading.Thread(target=poll, daemon=True).start()
+        self.root.after(RESIDENT_POLL_MS, self.poll_resident_models)
+
+    # Job queue ------------------------------------------------------------------
+    def selected_jobs(self):
+        return [
+            self.scheduler.jobs[int(iid)]
+            for iid in self.job_tree.selection()
+            if int(iid) in self.scheduler.jobs
+        ]
+
+    def cancel_analysis(self):
+        jobs = self.selected_jobs()
+        if not jobs and self.focus_job is not None:
+            jobs = [self.focus_job]
+        for job in jobs:
+            self.scheduler.cancel(job.id)
+        if jobs:
+            self.status_var.set("Cancelando análise ...")
+
+    def cancel_all_jobs(self):
+        self.scheduler.cancel_all()
+        self.status_var.set("Cancelando todas as análises ...")
+
+    def raise_priority(self):
+        self.change_priority(1)
+
+    def lower_priority(self):
+        self.change_priority(-1)
+
+    def change_priority(self, delta):
+        for job in self.selected_jobs():
+            self.scheduler.set_priority(job.id, job.priority + delta)
+        self.refresh_jobs()
+
+    def update_slots(self):
+        try:
+            self.scheduler.set_slots(int(self.slots_var.get()))
+        except (tk.TclError, ValueError):
+            pass
+
+    def clear_finished_jobs(self):
+        self.scheduler.forget_finished()
+        self.refresh_jobs()
+
+    @staticmethod
+    def job_state(job):
+        if job.status == QUEUED:
+            return "Na fila" if job.step == 0 else "Aguardando análise"
+        if job.status == RUNNING:
+            state = STAGE_LABELS.get(job.stage, "Iniciando")
+            if job.tokens:
+                state += f" — {job.tokens} tokens"
+            return state
+        if job.status == DONE:
+            result = (job.result or {}).get("result", {})
+            if "error" in result:
+                return "Concluído com erro de JSON"
+            return f"Concluído — pontuação {result.get('pontuacao_final', '?')}"
+        if job.status == CANCELLED:
+            return "Cancelado"
+        return f"Erro: {job.result}"
+
+    def refresh_jobs(self):
+        """
+        Sync the queue view with the scheduler, in run order.
+        """
+        jobs = self.scheduler.ordered()
+        known = set(self.job_tree.get_children())
+        for index, job in enumerate(jobs):
+            iid = str(job.id)
+            params = job.params
+            values = (
+                os.path.basename(job.path),
+                f"{params['text_model']} / {params['image_model']}",
+                job.priority,
+                self.job_state(job),
+            )
+            if iid in known:
+                self.job_tree.item(iid, values=values)
+                known.discard(iid)
+            else:
+                self.job_tree.insert("", tk.END, iid=iid, values=values)
+            self.job_tree.move(iid, "", index)
+        if known:
+            self.job_tree.delete(*known)
+
+        running = self.scheduler.running_count()
+        if running and not self.progress_running:
+            self.progress.start(10)
+        elif not running and self.progress_running:
+            self.progress.stop()
+        self.progress_running = bool(running)
+
+    def on_job_select(self, event=None):
+        jobs = self.selected_jobs()
+        if len(jobs) == 1:
+            self.show_job(jobs[0])
+
+    def show_job(self, job):
+        """
+        Follow `job` in the result pane: its streamed output so far while it
+        runs, its entry once it is done.
+        """
+        self.focus_job = job
+        if job.status == DONE:
+            self.display_entry(job.result)
+            return
+        self.begin_stream(job.path)
+        output = self.job_output.get(job.id)
+        if output:
+            for item in output["items"]:
+                self.append_stream_item(item)
+            self.append_stream_token("".join(output["tokens"]))
+        if job.status == QUEUED:
+            self.meta_label.config(text=f"{os.path.basename(job.path)} — na fila")
+        elif job.status == CANCELLED:
+            self.meta_label.config(text=f"{os.path.basename(job.path)} — cancelada")
+        elif job.status == FAILED:
+            self.result_text.insert(tk.END, f"\n[Erro] {job.result}\n", "bold")
+
+    def check_queue(self):
+        # drain everything the workers produced since the last poll
+        changed = False
+        try:
+            while True:
+                job, status, payload = self.queue.get_nowait()
+                self.handle_worker_message(job, status, payload)
+                changed = True
+        except queue.Empty:
+            pass
+        if changed:
+            self.refresh_jobs()
+        self.root.after(200, self.check_queue)
+
+    def handle_worker_message(self, job, status, payload):
+        if status == "resident":
+            models = "indisponível" if payload is None else ", ".join(payload)
+            self.resident_var.set(f"Modelos carregados: {models or 'nenhum'}")
+            return
+        focused = self.focus_job is job
+        if status == "started":
+            self.job_output[job.id] = {"tokens": [], "items": []}
+            if self.focus_job is None or self.focus_job.status != RUNNING:
+                self.show_job(job)
+            return
+        if status == "token":
+            self.job_output[job.id]["tokens"].append(payload)
+            if focused:
+                self.append_stream_token(payload)
+            return
+        if status == "item":
+            self.job_output[job.id]["items"].append(payload)
+            if focused:
+                self.append_stream_item(payload)
+            return
+        if status in ("stage", "requeued"):
+            return
+
+        self.job_output.pop(job.id, None)
+        name = os.path.basename(job.path)
+        pending = self.scheduler.running_count() + self.scheduler.queued_count()
+        if status == "ok":
+            entry = payload
+            # add the new row on top of the first page
+            shown = self.add_history_row(entry)
+            if focused:
+                if shown:
+                    self.history_list.select_clear(0, tk.END)
+                    self.history_list.select_set(0)
+                self.display_entry(entry)
+            stats = response_cache.stats()
+            self.status_var.set(
+                f"Análise concluída: {name} ({pending} pendentes; cache de "
+                f"respostas: {stats['hits']} acertos, {stats['misses']} falhas)"
+            )
+        elif status == "cancelled":
+            if focused:
+                self.meta_label.config(text=f"{name} — cancelada")
+            self.status_var.set(f"Análise cancelada: {name} ({pending} pendentes)")
+        else:
+            if focused:
+                self.result_text.insert(tk.END, f"\n[Erro] {payload}\n", "bold")
+            self.status_var.set(f"Erro na análise de {name}: {payload}")
+
+    # Exporting ------------------------------------------------------------------
+    def export_selected(self):
+        entry = self.selected_entry()
+        if entry is None:
+            messagebox.showinfo("Exportar", "Nenhum item selecionado no histórico.")
+            return
+        # ask where to save
+        default_name = os.path.splitext(entry.get("file", "result"))[0] + "_analise.pdf"
+        out_path = filedialog.asksaveasfilename(
+            title="Salvar como...",
+            defaultextension=".pdf",
+            initialfile=default_name,
+            filetypes=[("PDF", "*.pdf"), ("Text", "*.txt")],
+        )
+        if not out_path:
+            return
+        try:
+            if out_path.lower().endswith(".pdf"):
+                try:
+                    export_entry_to_pdf(entry, out_path)
+                    messagebox.showinfo("Exportado", f"Exportado para PDF: {out_path}")
+                except ImportError:
+                    # fallback: save as txt
+                    txt_path = out_path[:-4] + ".txt"
+                    export_entry_to_txt(entry, txt_path)
+                    messagebox.showinfo(
+                        "Fallback TXT",
+                        f"reportlab não encontrado. Resultado salvo como TXT: {txt_path}",
+                    )
+            else:
+                export_entry_to_txt(entry, out_path)
+                messagebox.showinfo("Exportado", f"Exportado como texto: {out_path}")
+        except Exception as e:
+            messagebox.showerror("Erro exportar", f"Erro ao exportar: {e}")
@@ -0,0 +1,475 @@
+import json
+import os
+import threading
+import unicodedata
+from contextlib import contextmanager
+
+from sqlite_store import LocalConnection
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_fd(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+    def _unlock_fd(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class JsonlStore:
+    """
+    Append-only history file with one JSON entry per line.
+
+    Writers take an exclusive lock on a sidecar `<path>.lock` file (shared by
+    threads and processes) and append each entry with a single write, so the
+    cost of saving does not depend on the size of the history. A legacy
+    results.json array at `legacy_path` is migrated on first use.
+    """
+
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.lock_path = path + ".lock"
+        self._thread_lock = threading.Lock()
+        self._migrated = False
+
+    @contextmanager
+    def locked(self):
+        with self._thread_lock:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                _lock_fd(fd)
+                try:
+                    yield
+                finally:
+                    _unlock_fd(fd)
+            finally:
+                os.close(fd)
+
+    # Migration --------------------------------------------------------------------
+    def migrate(self):
+        """
+        Convert the legacy JSON array file into JSONL (once) and keep the
+        original as `<legacy_path>.bak`.
+        """
+        if self._migrated:
+            return
+        self._migrated = True
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        with self.locked():
+            if os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+                return
+            try:
+                with open(self.legacy_path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+            except Exception:
+                entries = []
+            self._write_all(entries)
+            os.replace(self.legacy_path, self.legacy_path + ".bak")
+
+    # Writing ----------------------------------------------------------------------
+    def append(self, entry):
+        """
+        Append one entry and return the byte offset where its line starts.
+        """
+        self.migrate()
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self.locked():
+            flags = os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+            fd = os.open(self.path, flags, 0o644)
+            try:
+                # a crash mid-write leaves a partial last line; start a new one
+                size = os.fstat(fd).st_size
+                if size:
+                    os.lseek(fd, size - 1, os.SEEK_SET)
+                    if os.read(fd, 1) != b"\n":
+                        line = b"\n" + line
+                        size += 1
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        return size
+
+    def _write_all(self, entries):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.migrate()
+        with self.locked():
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    # Reading ----------------------------------------------------------------------
+    def __iter__(self):
+        """
+        Stream entries one line at a time, skipping corrupt lines.
+        """
+        for _, _, entry in self.iter_from(0):
+            if entry is not None:
+                yield entry
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def iter_from(self, start):
+        """
+        Yield (offset, end, entry) for every complete line starting at `start`;
+        entry is None for blank or corrupt lines. A trailing line without its
+        newline is still being written and is left for the next call.
+        """
+        self.migrate()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                line_offset = offset
+                offset += len(line)
+                try:
+                    entry = json.loads(line) if line.strip() else None
+                except ValueError:
+                    entry = None
+                yield line_offset, offset, entry
+
+    def read_at(self, offset):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+
+class HistoryIndex:
+    """
+    SQLite index over a JsonlStore journal.
+
+    Each entry is identified by the byte offset of its journal line. The index
+    keeps only the lightweight columns needed to list and filter history
+    (timestamp, file, models, score) with indexes on timestamp, file and
+    model; full entries, including prompt and raw_response, are read from the
+    journal on demand. Deletions are appended to the journal as
+    {"deleted": <offset>} tombstones so the index can always be rebuilt.
+
+    For search, an FTS5 table indexes the file name, the document text
+    (returned by `text_loader(entry)`, if given), the items' detalhes and
+    melhorias_recomendadas, and an items table holds the status of every
+    requirement; page() and count() accept the same filters over them.
+    """
+
+    VERSION = 3  # bump to rebuild the index after a schema change
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT,
+        file TEXT,
+        path TEXT,
+        text_model TEXT,
+        image_model TEXT,
+        score REAL,
+        error INTEGER,
+        seconds REAL,
+        response_tokens INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries(timestamp);
+    CREATE INDEX IF NOT EXISTS idx_entries_file ON entries(file);
+    CREATE INDEX IF NOT EXISTS idx_entries_model ON entries(text_model, image_model);
+    CREATE INDEX IF NOT EXISTS idx_entries_score ON entries(score);
+    CREATE INDEX IF NOT EXISTS idx_entries_path ON entries(path, text_model);
+    CREATE TABLE IF NOT EXISTS items (
+        id INTEGER,
+        item TEXT,
+        status TEXT,
+        label TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_items_item ON items(item, status, id);
+    CREATE INDEX IF NOT EXISTS idx_items_id ON items(id);
+    CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+        file, text, detalhes, melhorias,
+        tokenize = "unicode61 remove_diacritics 2"
+    );
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+    """
+
+    ROW_COLUMNS = (
+        "id",
+        "timestamp",
+        "file",
+        "path",
+        "text_model",
+        "image_model",
+        "score",
+    )
+
+    def __init__(self, db_path, journal, text_loader=None):
+        self.db_path = db_path
+        self.journal = journal
+        self.text_loader = text_loader
+        self._db = LocalConnection(db_path, self.SCHEMA)
+        self._sync_lock = threading.Lock()
+
+    def _conn(self):
+        return self._db.get()
+
+    @staticmethod
+    def _score(result):
+        try:
+            return float(result.get("pontuacao_final"))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def _index_entry(self, conn, offset, entry):
+        result = entry.get("result") or {}
+        metrics = entry.get("metrics") or {}
+        self._unindex(conn, offset)
+        conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                offset,
+                entry.get("timestamp", ""),
+                entry.get("file", ""),
+                entry.get("path", ""),
+                entry.get("text_model") or entry.get("model", ""),
+                entry.get("image_model"),
+                self._score(result),
+                1 if isinstance(result, dict) and "error" in result else 0,
+                metrics.get("total_seconds"),
+                metrics.get("response_tokens"),
+            ),
+        )
+        if not isinstance(result, dict):
+            return
+        items = [i for i in result.get("validacao") or [] if isinstance(i, dict)]
+        conn.executemany(
+            "INSERT INTO items VALUES (?, ?, ?, ?)",
+            [
+                (
+                    offset,
+                    fold(i.get("item", "")),
+                    fold(i.get("status", "")),
+                    str(i.get("item", "")),
+                )
+                for i in items
+            ],
+        )
+        text = self.text_loader(entry) if self.text_loader else None
+        conn.execute(
+            "INSERT INTO entries_fts (rowid, file, text, detalhes, melhorias) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                offset,
+                entry.get("file", ""),
+                text or "",
+                "\n".join(str(i.get("detalhes", "")) for i in items),
+                str(result.get("melhorias_recomendadas") or ""),
+            ),
+        )
+
+    @staticmethod
+    def _unindex(conn, offset):
+        for table, column in (
+            ("entries", "id"),
+            ("items", "id"),
+            ("entries_fts", "rowid"),
+        ):
+            conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (offset,))
+
+    @staticmethod
+    def _clear_tables(conn):
+        for table in ("entries", "items", "entries_fts"):
+            conn.execute(f"DELETE FROM {table}")
+
+    def _rebuild_tables(self, conn):
+        """
+        Recreate the tables of an index written by another VERSION.
+        """
+        for table in ("entries", "items", "entries_fts"):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        for statement in self.SCHEMA.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+
+    # Syncing ----------------------------------------------------------------------
+    def sync(self):
+        """
+        Index journal lines written since the last sync (by this or any other
+        process). Rebuilds from scratch if the journal was replaced.
+        """
+        with self._sync_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value FROM meta WHERE key = 'journal_end'"
+                ).fetchone()
+                start = row[0] if row else 0
+                version = conn.execute(
+                    "SELECT value FROM meta WHERE key = 'version'"
+                ).fetchone()
+                size = self.journal.size()
+                if (version and version[0]) != self.VERSION:
+                    self._rebuild_tables(conn)
+                    start = 0
+                elif size < start:
+                    self._clear_tables(conn)
+                    start = 0
+                end = start
+                for offset, end, entry in self.journal.iter_from(start):
+                    if entry is None:
+                        continue
+                    if "deleted" in entry and len(entry) == 1:
+                        self._unindex(conn, entry["deleted"])
+                    else:
+                        self._index_entry(conn, offset, entry)
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('journal_end', ?)", (end,)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                    (self.VERSION,),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    # Writing ----------------------------------------------------------------------
+    def add(self, entry):
+        """
+        Append entry to the journal, index it and return its id.
+        """
+        entry_id = self.journal.append(entry)
+        self.sync()
+        return entry_id
+
+    def delete(self, entry_id):
+        self.journal.append({"deleted": entry_id})
+        self.sync()
+
+    def clear(self):
+        with self._sync_lock:
+            self.journal.clear()
+            conn = self._conn()
+            self._clear_tables(conn)
+            conn.execute("DELETE FROM meta")
+
+    # Reading ----------------------------------------------------------------------
+    def query(self, sql, params=()):
+        """
+        Rows of a read-only SQL query over the index tables (see analytics).
+        """
+        return self._conn().execute(sql, params).fetchall()
+
+    @staticmethod
+    def _where(
+        query=None,
+        min_score=None,
+        max_score=None,
+        text_model=None,
+        item=None,
+        status=None,
+    ):
+        """
+        SQL condition and parameters for the search filters: `query` words
+        (prefix match, all required) in the full-text index, a score range,
+        the text model, and the status (prefix) of a requirement (`item`).
+        """
+        clauses = []
+        params = []
+        words = [w.replace('"', "") for w in (query or "").split()]
+        words = [f'"{w}"*' for w in words if w]
+        if words:
+            clauses.append(
+                "id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)"
+            )
+            params.append(" ".join(words))
+        if min_score is not None:
+            clauses.append("score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append("score <= ?")
+            params.append(max_score)
+        if text_model:
+            clauses.append("text_model = ?")
+            params.append(text_model)
+        if item or status:
+            sub = "SELECT id FROM items WHERE 1"
+            if item:
+                sub += " AND item = ?"
+                params.append(fold(item))
+            if status:
+                # statuses are free text from the model: match the start
+                sub += " AND status LIKE ?"
+                params.append(fold(status) + "%")
+            clauses.append(f"id IN ({sub})")
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        return (
+            self._conn()
+            .execute(f"SELECT COUNT(*) FROM entries{where}", params)
+            .fetchone()[0]
+        )
+
+    def page(self, page=0, page_size=200, **filters):
+        """
+        Lightweight rows of one page of history, newest first, optionally
+        filtered (see _where).
+        """
+        where, params = self._where(**filters)
+        cur = self._conn().execute(
+            f"SELECT {', '.join(self.ROW_COLUMNS)} FROM entries{where} "
+            "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            params + [page_size, page * page_size],
+        )
+        return [dict(zip(self.ROW_COLUMNS, row)) for row in cur]
+
+    def load(self, entry_id):
+        """
+        Full entry (with prompt and raw_response) read from the journal.
+        """
+        entry = self.journal.read_at(entry_id)
+        entry["id"] = entry_id
+        return entry
+
+    def __iter__(self):
+        """
+        Stream full live entries in journal order.
+        """
+        self.sync()
+        live = {row[0] for row in self._conn().execute("SELECT id FROM entries")}
+        for offset, _, entry in self.journal.iter_from(0):
+            if offset in live and entry is not None:
+                entry["id"] = offset
+                yield entry
+
+
+def fold(text):
+    """
+    Case- and accent-insensitive form of `text` for exact matching.
+    """
+    text = unicodedata.normalize("NFKD", str(text).strip().casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
@@ -0,0 +1,96 @@
+import math
+import re
+
+
+PAGE_NAME = re.compile(r"^page(\d+)_")
+
+
+def image_entropy(pix):
+    """
+    Shannon entropy (bits) of the grayscale histogram of a small thumbnail.
+    Solid fills, rules and simple icons score close to zero.
+    """
+    import pymupdf
+
+    if pix.alpha:
+        pix = pymupdf.Pixmap(pix, 0)
+    gray = pymupdf.Pixmap(pymupdf.csGRAY, pix)
+    while gray.width * gray.height > 128 * 128:
+        gray.shrink(1)
+    samples = gray.samples
+    if not samples:
+        return 0.0
+    total = len(samples)
+    entropy = 0.0
+    for value in range(256):
+        count = samples.count(value)
+        if count:
+            p = count / total
+            entropy -= p * math.log2(p)
+    return entropy
+
+
+def recompress(pix, data, max_side, quality):
+    """
+    Downscale to `max_side` and re-encode as JPEG when that makes the
+    image smaller; otherwise keep the original bytes.
+    """
+    import pymupdf
+
+    scale = max_side / max(pix.width, pix.height)
+    resized = scale < 1
+    if resized:
+        width, height = int(pix.width * scale), int(pix.height * scale)
+        pix = pymupdf.Pixmap(pix, width, height, None)
+    if pix.alpha:
+        pix = pymupdf.Pixmap(pix, 0)
+    if pix.colorspace is not None and pix.colorspace.n > 3:
+        pix = pymupdf.Pixmap(pymupdf.csRGB, pix)
+    encoded = pix.tobytes("jpeg", jpg_quality=quality)
+    if resized or len(encoded) < len(data):
+        return encoded
+    return data
+
+
+def prepare_images(
+    images,
+    page_chars=None,
+    min_side=48,
+    min_entropy=0.3,
+    skip_page_chars=200,
+    max_side=1600,
+    quality=80,
+):
+    """
+    Preprocess images before they are sent to the vision model: drop images
+    from pages whose text layer already has `skip_page_chars` characters,
+    drop tiny or near-uniform images (icons, bullets, rules) and shrink and
+    recompress the rest. Returns (images, skipped) where skipped counts the
+    dropped images by reason.
+    """
+    import pymupdf
+
+    kept = []
+    skipped = {"text_page": 0, "small": 0, "low_entropy": 0}
+    for name, data in images:
+        match = PAGE_NAME.match(name)
+        if page_chars and match:
+            page = int(match.group(1))
+            if page < len(page_chars) and page_chars[page] >= skip_page_chars:
+                skipped["text_page"] += 1
+                continue
+
+        try:
+            pix = pymupdf.Pixmap(data)
+            if min(pix.width, pix.height) < min_side:
+                skipped["small"] += 1
+                continue
+            if image_entropy(pix) < min_entropy:
+                skipped["low_entropy"] += 1
+                continue
+            data = recompress(pix, data, max_side, quality)
+        except Exception:
+            # pixmap pymupdf cannot decode or convert: send it unchanged
+            pass
+        kept.append((name, data))
+    return kept, skipped
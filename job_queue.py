@@ -0,0 +1,242 @@
+import itertools
+import threading
+
+from ollama_client import CancelToken
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "error"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+MAX_AFFINITY_SKIPS = 8
+
+
+class Job:
+    """
+    One queued analysis. `stage` and `tokens` track the progress of a running
+    job; `result` holds the entry (or error message) once it finishes. Jobs
+    may run in several steps (`step` counts from 0); `state` carries what a
+    step hands to the next one.
+    """
+
+    def __init__(self, job_id, path, priority, seq, params):
+        self.id = job_id
+        self.path = path
+        self.priority = priority
+        self.seq = seq
+        self.params = params
+        self.status = QUEUED
+        self.stage = None
+        self.tokens = 0
+        self.result = None
+        self.step = 0
+        self.state = None
+        self.skipped = 0
+        self.cancel_token = CancelToken()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+
+class JobEvents:
+    """
+    Queue-like adapter handed to worker functions that report through
+    result_queue.put((status, payload)), e.g. analyzer.worker_analyze.
+    """
+
+    def __init__(self, scheduler, job):
+        self.scheduler = scheduler
+        self.job = job
+
+    def put(self, message):
+        self.scheduler._emit(self.job, *message)
+
+
+class JobScheduler:
+    """
+    Runs queued jobs with at most `slots` of them in parallel, highest
+    priority first (then in submission order). Each running job gets its own
+    thread; `run(job, events)` does the work and reports through
+    events.put((status, payload)), ending with "ok", "error" or "cancelled".
+    Every event is forwarded to `on_event(job, status, payload)`, which is
+    called from the worker threads.
+
+    When `run` returns True without finishing the job, the job goes back to
+    the queue (same priority and position) for its next step. `affinity(job)`
+    names the model the next step of a job needs: while jobs are running,
+    queued jobs that need one of their models start first, so steps that
+    share a model run together instead of making Ollama swap models. A job
+    passed over MAX_AFFINITY_SKIPS times blocks that reordering until it
+    starts.
+    """
+
+    def __init__(self, run, slots=2, on_event=None, affinity=None):
+        self.run = run
+        self.slots = max(1, slots)
+        self.on_event = on_event
+        self.affinity = affinity
+        self.jobs = {}
+        self._running = 0
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    # Submitting and reordering ----------------------------------------------------
+    def submit(self, path, priority=0, **params):
+        with self._lock:
+            job = Job(next(self._ids), path, priority, next(self._seq), params)
+            self.jobs[job.id] = job
+        self._dispatch()
+        return job
+
+    def set_priority(self, job_id, priority):
+        """
+        Change the priority of a queued job; running jobs are not affected.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            job.priority = priority
+        return True
+
+    def set_slots(self, slots):
+        with self._lock:
+            self.slots = max(1, slots)
+        self._dispatch()
+
+    def cancel(self, job_id):
+        """
+        Drop a queued job or abort a running one through its CancelToken.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            queued = job.status == QUEUED
+            if queued:
+                job.status = CANCELLED
+        if queued:
+            self._notify(job, CANCELLED, job.path)
+        else:
+            job.cancel_token.cancel()
+        return True
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    def forget_finished(self):
+        with self._lock:
+            for job_id in [j.id for j in self.jobs.values() if j.finished]:
+                del self.jobs[job_id]
+
+    # State ------------------------------------------------------------------------
+    def ordered(self):
+        """
+        Jobs in display order: running, then queued by priority, then finished.
+        """
+        with self._lock:
+            jobs = list(self.jobs.values())
+        rank = {RUNNING: 0, QUEUED: 1}
+        return sorted(
+            jobs, key=lambda j: (rank.get(j.status, 2), -j.priority, j.seq)
+        )
+
+    def running_count(self):
+        with self._lock:
+            return self._running
+
+    def queued_count(self):
+        with self._lock:
+            return sum(1 for j in self.jobs.values() if j.status == QUEUED)
+
+    # Execution --------------------------------------------------------------------
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            while self._running < self.slots:
+                job = self._next_job()
+                if job is None:
+                    break
+                job.status = RUNNING
+                self._running += 1
+                started.append(job)
+        for job in started:
+            self._notify(job, "started", job.path)
+            threading.Thread(target=self._work, args=(job,), daemon=True).start()
+
+    def _next_job(self):
+        """
+        Pick the next queued job (called with the lock held), or None.
+        """
+        queued = sorted(
+            (j for j in self.jobs.values() if j.status == QUEUED),
+            key=lambda j: (-j.priority, j.seq),
+        )
+        if not queued:
+            return None
+        head = queued[0]
+        if self.affinity is None:
+            return head
+        active = {
+            self.affinity(j) for j in self.jobs.values() if j.status == RUNNING
+        }
+        active.discard(None)
+        for job in queued:
+            model = self.affinity(job)
+            if not active or model is None or model in active:
+                if job is not head:
+                    head.skipped += 1
+                return job
+            if head.skipped >= MAX_AFFINITY_SKIPS:
+                break
+        # nothing shares a loaded model: let the running jobs drain first,
+        # unless a slot would otherwise stay idle with no job running
+        return head if self._running == 0 else None
+
+    def _work(self, job):
+        requeue = False
+        try:
+            requeue = self.run(job, JobEvents(self, job))
+        except Exception as e:
+            self._emit(job, FAILED, str(e))
+        finally:
+            cancelled = False
+            with self._lock:
+                self._running -= 1
+                requeue = requeue is True and job.status == RUNNING
+                if requeue and job.cancel_token.cancelled:
+                    # cancelled between steps: the next one is not started
+                    requeue, cancelled = False, True
+                    job.status = CANCELLED
+                    job.result = job.path
+                    job.state = None
+                if requeue:
+                    job.status = QUEUED
+                    job.step += 1
+                    job.stage = None
+            if requeue:
+                self._notify(job, "requeued", job.step)
+            elif cancelled:
+                self._notify(job, CANCELLED, job.path)
+            elif not job.finished:
+                self._emit(job, FAILED, "a análise terminou sem resultado")
+            self._dispatch()
+
+    def _emit(self, job, status, payload):
+        if status == "stage":
+            job.stage = payload
+        elif status == "token":
+            job.tokens += 1
+        elif status in ("ok", FAILED, CANCELLED):
+            job.result = payload
+            job.status = DONE if status == "ok" else status
+        self._notify(job, status, payload)
+
+    def _notify(self, job, status, payload):
+        if self.on_event is not None:
+            self.on_event(job, status, payload)
@@ -1,796 +1,167 @@
-import subprocess
-import json
-import docx
-import re
+import argparse
 import os
-from datetime import datetime
-import threading
-import queue
-import tkinter as tk
-from tkinter import ttk, filedialog, scrolledtext, messagebox
-import pymupdf
-import ast
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-import base64
+import sys
+import analyzer
+from analyzer import (
+    APP_TITLE,
+    IMAGE_MODELS,
+    TEXT_MODELS,
+    collect_batch_files,
+    history_report,
+    run_batch,
+    run_watch,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=APP_TITLE)
+    parser.add_argument(
+        "--batch",
+        metavar="ALVO",
+        help="pasta ou glob de arquivos para analisar sem interface gráfica",
+    )
+    parser.add_argument(
+        "--watch",
+        metavar="PASTA",
+        help="observa a pasta e analisa cada documento novo ou alterado",
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="mostra o resumo comparativo dos modelos no histórico e sai",
+    )
+    parser.add_argument("--workers", type=int, default=2, help="análises simultâneas")
+    parser.add_argument("--text-model", default=TEXT_MODELS[0])
+    parser.add_argument("--image-model", default=IMAGE_MODELS[0])
+    parser.add_argument(
+        "--no-ocr", action="store_true", help="não analisar imagens dos documentos"
+    )
+    parser.add_argument(
+        "--output", metavar="PASTA", help="grava um <arquivo>.json por documento"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="ignora o cache de respostas e gera novamente",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="ARQUIVO",
+        help="grava métricas no formato Prometheus após cada análise",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORTA",
+        help="expõe métricas Prometheus em http://0.0.0.0:PORTA/metrics",
+    )
+    parser.add_argument(
+        "--ollama-hosts",
+        metavar="URLS",
+        help="servidores Ollama separados por vírgula; as requisições são "
+        "distribuídas entre eles",
+    )
+    parser.add_argument(
+        "--pin-models",
+        action="store_true",
+        help="envia cada modelo só aos servidores que já o têm carregado",
+    )
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        metavar="QUANTIL",
+        help="com vários servidores, repete no próximo servidor a requisição "
+        "mais lenta que esse quantil das recentes do modelo (ex.: 0.9)",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        metavar="N",
+        help="novas tentativas após falha transitória do modelo",
+    )
+    return parser.parse_args(argv)
+
+
+def setup_metrics(args):
+    analyzer.METRICS_FILE = args.metrics_file or analyzer.METRICS_FILE
+    analyzer.METRICS_PORT = args.metrics_port or analyzer.METRICS_PORT
+    if analyzer.METRICS_PORT:
+        analyzer.metrics_registry.serve(analyzer.METRICS_PORT)
+
+
+def setup_backends(args):
+    if args.ollama_hosts or args.pin_models:
+        hosts = (
+            args.ollama_hosts.split(",")
+            if args.ollama_hosts
+            else analyzer.OLLAMA_HOSTS
+        )
+        analyzer.ollama_client = analyzer.make_ollama_client(
+            hosts, pin_models=args.pin_models or analyzer.OLLAMA_PIN_MODELS
+        )
+    if args.hedge is not None:
+        analyzer.call_policy.hedge_quantile = args.hedge
+    if args.retries is not None:
+        analyzer.call_policy.retries = args.retries
+
+
+def run_batch_cli(args):
+    paths = collect_batch_files(args.batch)
+    if not paths:
+        print(f"Nenhum arquivo suportado encontrado em: {args.batch}")
+        return 1
+    image_model = None if args.no_ocr else args.image_model
+    print(
+        f"Analisando {len(paths)} arquivos com {args.text_model} "
+        f"({args.workers} simultâneos) ..."
+    )
+    failed = run_batch(
+        paths,
+        args.text_model,
+        image_model,
+        args.workers,
+        args.output,
+        use_cache=not args.no_cache,
+    )
+    return 1 if failed else 0
+
+
+def run_watch_cli(args):
+    if not os.path.isdir(args.watch):
+        print(f"Pasta não encontrada: {args.watch}")
+        return 1
+    image_model = None if args.no_ocr else args.image_model
+    failed = run_watch(
+        args.watch,
+        args.text_model,
+        image_model,
+        args.workers,
+        args.output,
+        use_cache=not args.no_cache,
+    )
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_metrics(args)
+    setup_backends(args)
+    if args.report:
+        print(history_report(), end="")
+        return 0
+    if args.batch:
+        return run_batch_cli(args)
+    if args.watch:
+        return run_watch_cli(args)
+
+    # the GUI (and tkinter) is only loaded when there is a window to show
+    import tkinter as tk
+    from gui import ResumeAnalyzerApp
 
-
-APP_TITLE = "Validador de Currículos"
-RESULTS_FILE = "results.json"
-DOCUMENT_TYPE = "CURRÍCULO"
-REQUIREMENTS = [
-    "Coerência geral",
-    "Introdução / Resumo profissional",
-    "Formação Acadêmica",
-    "Experiência Profissional",
-]
-JSON_REQUIREMENTS = [
-    {"item": "Coerência geral", "status": "", "detalhes": ""},
-    {"item": "Introdução / Resumo profissional", "status": "", "detalhes": ""},
-    {"item": "Formação Acadêmica", "status": "", "detalhes": ""},
-    {"item": "Experiência Profissional", "status": "", "detalhes": ""},
-]
-TEXT_MODELS = ["llama3.1:8b", "deepseek-r1:8b", "gpt-oss:20b", "gemma3:12b"]
-IMAGE_MODELS = ["deepseek-ocr", "moondream2", "qwen3-vl", "PaddleOCR-vl"]
-IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".webp"]
-
-
-# --- Core Resume Processing Functions ------------------------------------------------
-
-
-def extract_text_from_file(path):
-    ext = os.path.splitext(path)[1].lower()
-
-    if ext == ".docx":
-        return extract_text_from_docx(path)
-    elif ext == ".pdf":
-        return extract_text_from_pdf(path)
-    elif ext in IMAGE_EXTENSIONS:
-        return ""
-    else:
-        return ""
-
-
-def extract_text_from_docx(path):
-    doc = docx.Document(path)
-    return "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-
-
-def extract_text_from_pdf(path):
-    text = []
-    with pymupdf.open(path) as pdf:
-        for page in pdf:
-            text.append(page.get_text())
-    return "\n".join(text)
-
-
-def extract_images_from_file(path):
-    ext = os.path.splitext(path)[1].lower()
-    img_dir = os.path.join("tmp_images", os.path.basename(path))
-
-    if ext in IMAGE_EXTENSIONS:
-        return [path]
-
-    if ext == ".docx":
-        return extract_images_from_docx(path, img_dir)
-
-    if ext == ".pdf":
-        return extract_images_from_pdf(path, img_dir)
-
-    return []
-
-
-def extract_images_from_docx(path, out_dir):
-    doc = docx.Document(path)
-    images = []
-
-    os.makedirs(out_dir, exist_ok=True)
-
-    for rel in doc.part._rels.values():
-        if "image" in rel.target_ref:
-            image = rel.target_part.blob
-            img_name = os.path.basename(rel.target_ref)
-            img_path = os.path.join(out_dir, img_name)
-            with open(img_path, "wb") as f:
-                f.write(image)
-            images.append(img_path)
-
-    return images
-
-
-def extract_images_from_pdf(path, out_dir):
-    images = []
-    os.makedirs(out_dir, exist_ok=True)
-
-    with pymupdf.open(path) as pdf:
-        for page_index, page in enumerate(pdf):
-            for img_index, img in enumerate(page.get_images(full=True)):
-                xref = img[0]
-                base = pdf.extract_image(xref)
-                img_bytes = base["image"]
-                ext = base["ext"]
-                img_path = os.path.join(out_dir, f"page{page_index}_{img_index}.{ext}")
-                with open(img_path, "wb") as f:
-                    f.write(img_bytes)
-                images.append(img_path)
-
-    return images
-
-
-def build_prompt(text, requirements):
-    req_text = "\n".join([f"- {r}" for r in requirements])
-    return f"""
-Analise o {DOCUMENT_TYPE} abaixo segundo os requisitos a seguir:
-
-REQUISITOS:
-{req_text}
-
-FORMATO OBRIGATÓRIO DA RESPOSTA:
-Retorne APENAS um JSON válido (RFC 8259).
-Use exclusivamente aspas duplas.
-NÃO use aspas simples.
-NÃO adicione texto antes ou depois
-
-{{
-  "validacao":{JSON_REQUIREMENTS},
-  "pontuacao_final": "0-100",
-  "melhorias_recomendadas": ""
-}}
-
-{DOCUMENT_TYPE}:
-{text}
-"""
-
-
-def ollama_chat(model, prompt):
-    """
-    Calls ollama locally.
-    Returns raw text output.
-    """
-    try:
-        result = subprocess.run(
-            ["ollama", "run", model, "--think=false"],
-            input=prompt.encode("utf-8"),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=300,
-        )
-        if result.returncode != 0:
-            # include stderr for debugging
-            err = result.stderr.decode("utf-8", errors="ignore")
-            out = result.stdout.decode("utf-8", errors="ignore")
-            return out + "\n\n[OLLAMA STDERR]\n" + err
-        return result.stdout.decode("utf-8", errors="ignore")
-    except FileNotFoundError:
-        return "[ERROR] 'ollama' executable not found. Ensure ollama is installed and in PATH."
-    except subprocess.TimeoutExpired:
-        return "[ERROR] ollama run timed out."
-    except Exception as e:
-        return f"[ERROR] ollama run failed: {e}"
-
-
-def image_to_base64(path):
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
-
-
-def ollama_image_analyze(model, image_path):
-    try:
-        img_b64 = image_to_base64(image_path)
-
-        prompt = f"""
-Analise a imagem abaixo como um {DOCUMENT_TYPE}.
-Extraia TODO texto visível (OCR) e descreva o conteúdo visual.
-
-[IMAGEM_BASE64]
-{img_b64}
-"""
-
-        result = subprocess.run(
-            ["ollama", "run", model, "--think=false"],
-            input=prompt.encode("utf-8"),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=120,
-        )
-
-        if result.returncode != 0:
-            return "[ERROR image analysis]\n" + result.stderr.decode(
-                "utf-8", errors="ignore"
-            )
-
-        return result.stdout.decode("utf-8", errors="ignore")
-
-    except subprocess.TimeoutExpired:
-        return "[ERROR image analysis] OCR timeout"
-    except Exception as e:
-        return f"[ERROR image analysis] {e}"
-
-
-def extract_json(text):
-    """
-    Extract JSON object from the model output. Accepts code block or raw JSON.
-    """
-    match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", text, re.DOTALL)
-    if match:
-        return match.group(1)
-
-    start = text.find("{")
-    if start != -1:
-        potential_json = text[start:].strip()
-        # find matching closing brace for outermost object by scanning
-        depth = 0
-        for i, ch in enumerate(potential_json):
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    return potential_json[: i + 1]
-    return None
-
-
-def save_result_entry(entry):
-    """
-    Append entry into RESULTS_FILE (create if missing).
-    """
-    if not os.path.exists(RESULTS_FILE):
-        with open(RESULTS_FILE, "w", encoding="utf-8") as f:
-            json.dump([entry], f, indent=2, ensure_ascii=False)
-    else:
-        try:
-            with open(RESULTS_FILE, "r", encoding="utf-8") as f:
-                content = json.load(f)
-        except Exception:
-            content = []
-        content.append(entry)
-        with open(RESULTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(content, f, indent=2, ensure_ascii=False)
-
-
-def load_history():
-    if not os.path.exists(RESULTS_FILE):
-        return []
-    try:
-        with open(RESULTS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return []
-
-
-def clear_history_file():
-    if os.path.exists(RESULTS_FILE):
-        os.remove(RESULTS_FILE)
-    selection = self.history_list.curselection()
-    if not selection:
-        return
-
-    index = selection[0]
-    entry = self.history[index]
-    file_path = entry.get("file")
-
-    if file_path and os.path.exists(file_path):
-        os.startfile(file_path)  # Windows
-    else:
-        messagebox.showerror("Erro", "Arquivo não encontrado.")
-
-
-def safe_json_loads(s):
-    """
-    Aceita JSON inválido (aspas simples, etc) e converte para dict usando ast.literal_eval.
-    """
-    try:
-        return json.loads(s)
-    except Exception:
-        try:
-            return ast.literal_eval(s)  # aceita aspas simples, sintaxe tipo Python
-        except Exception as e:
-            raise ValueError(f"JSON inválido: {e}")
-
-
-def validate_resume_local(path, text_model, image_model=None):
-    text_content = extract_text_from_file(path)
-
-    image_analysis_text = ""
-    if image_model:
-        images = extract_images_from_file(path)
-        for img in images:
-            image_analysis_text += f"\n[Imagem: {os.path.basename(img)}]\n"
-            image_analysis_text += ollama_image_analyze(image_model, img) + "\n"
-
-    full_text = f"""
-        {text_content}
-
-        [CONTEÚDO EXTRAÍDO VIA OCR DE IMAGEM]
-        {image_analysis_text}
-    """
-
-    prompt = build_prompt(full_text, REQUIREMENTS)
-    response = ollama_chat(text_model, prompt)
-    json_str = extract_json(response)
-
-    if not json_str:
-        data = {"error": "Nenhum JSON encontrado", "raw": response}
-    else:
-        try:
-            data = safe_json_loads(json_str)
-        except Exception as e:
-            data = {
-                "error": f"Falha ao converter JSON: {e}",
-                "json_extraido": json_str,
-                "raw": response,
-            }
-
-    entry = {
-        "file": os.path.basename(path),
-        "path": os.path.abspath(path),
-        "timestamp": datetime.now().isoformat(),
-        "text_model": text_model,
-        "image_model": image_model,
-        "prompt": prompt,
-        "raw_response": response,
-        "result": data,
-    }
-
-    save_result_entry(entry)
-    return entry
-
-
-# --- PDF Export Utility --------------------------------------------------------------
-
-
-def export_entry_to_pdf(entry, outpath):
-    doc = SimpleDocTemplate(outpath, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-
-    header = f"Análise de Currículo - {entry.get('file','')}"
-    story.append(Paragraph(header, styles["Title"]))
-    meta = f"Arquivo: {entry.get('path','') or entry.get('file','')}<br/>Data: {entry.get('timestamp','')}<br/>Modelo: {entry.get('model','')}"
-    story.append(Paragraph(meta, styles["Normal"]))
-    story.append(Spacer(1, 12))
-
-    # Add JSON prettified
-    json_text = json.dumps(entry.get("result", {}), indent=2, ensure_ascii=False)
-    for line in json_text.splitlines():
-        # small paragraphs for each line to keep layout simple
-        story.append(
-            Paragraph(
-                line.replace(" ", "&nbsp;"),
-                styles["Code"] if "Code" in styles else styles["Normal"],
-            )
-        )
-
-    doc.build(story)
-
-
-# --- Threaded Worker -----------------------------------------------------------------
-
-
-def worker_analyze(path, text_model, image_model, result_queue):
-    try:
-        entry = validate_resume_local(path, text_model, image_model)
-        result_queue.put(("ok", entry))
-    except Exception as e:
-        result_queue.put(("error", str(e)))
-
-
-# --- GUI ------------------------------------------------------------------------------
-
-
-class ResumeAnalyzerApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title(APP_TITLE)
-        self.root.geometry("1200x650")
-        self.queue = queue.Queue()
-
-        # Top frame: controls
-        top_frame = ttk.Frame(root)
-        top_frame.pack(side=tk.TOP, fill=tk.X, padx=8, pady=8)
-
-        # Text model selector
-        ttk.Label(top_frame, text="Modelo de texto:").pack(side=tk.LEFT, padx=(0, 6))
-        self.text_model_var = tk.StringVar(value=TEXT_MODELS[0])
-        models = TEXT_MODELS
-        self.model_combo = ttk.Combobox(
-            top_frame, values=models, textvariable=self.text_model_var, width=22
-        )
-        self.model_combo.pack(side=tk.LEFT, padx=(0, 10))
-
-        # Image model selector
-        ttk.Label(top_frame, text="Modelo de imagem:").pack(side=tk.LEFT, padx=(0, 6))
-        self.image_model_var = tk.StringVar(value=IMAGE_MODELS[0])
-        models = IMAGE_MODELS
-        self.model_combo = ttk.Combobox(
-            top_frame, values=models, textvariable=self.image_model_var, width=22
-        )
-        self.model_combo.pack(side=tk.LEFT, padx=(0, 10))
-
-        # Select file button
-        self.btn_select = ttk.Button(
-            top_frame, text="Selecionar Arquivo", command=self.select_file
-        )
-        self.btn_select.pack(side=tk.LEFT, padx=(0, 10))
-
-        # Delete selected
-        self.delete_button = ttk.Button(
-            top_frame, text="Excluir Selecionado", command=self.delete_selected
-        )
-        self.delete_button.pack(side=tk.LEFT, padx=(0, 10))
-
-        # Re-run selected
-        self.btn_rerun = ttk.Button(
-            top_frame, text="Rodar novamente", command=self.rerun_selected
-        )
-        self.btn_rerun.pack(side=tk.LEFT, padx=(0, 10))
-
-        # Export
-        self.btn_export = ttk.Button(
-            top_frame,
-            text="Exportar selecionado (PDF/TXT)",
-            command=self.export_selected,
-        )
-        self.btn_export.pack(side=tk.LEFT, padx=(0, 10))
-
-        # Clear history
-        self.btn_clear = ttk.Button(
-            top_frame, text="Limpar histórico", command=self.clear_history_confirm
-        )
-        self.btn_clear.pack(side=tk.LEFT, padx=(0, 10))
-
-        # Progress bar
-        self.progress = ttk.Progressbar(root, mode="indeterminate")
-        self.progress.pack(fill=tk.X, padx=8, pady=(0, 8))
-
-        # Main frames: left history, right details
-        main_frame = ttk.Frame(root)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
-
-        left = ttk.Frame(main_frame, width=280)
-        left.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 8))
-
-        ttk.Label(left, text="Histórico (results.json):").pack(anchor=tk.W)
-        self.history_list = tk.Listbox(left, width=40, activestyle="dotbox")
-        self.history_list.pack(fill=tk.Y, expand=True)
-        self.history_list.bind("<<ListboxSelect>>", self.on_history_select)
-        self.history_list.bind("<Double-1>", self.open_selected_file)
-
-        # Buttons under list
-        hb = ttk.Frame(left)
-        hb.pack(fill=tk.X, pady=(6, 0))
-        ttk.Button(hb, text="Atualizar", command=self.reload_history).pack(
-            side=tk.LEFT, padx=(0, 6)
-        )
-        ttk.Button(hb, text="Abrir pasta", command=self.open_results_folder).pack(
-            side=tk.LEFT
-        )
-
-        # Right side: result display
-        right = ttk.Frame(main_frame)
-        right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        meta_frame = ttk.Frame(right)
-        meta_frame.pack(fill=tk.X)
-        self.meta_label = ttk.Label(
-            meta_frame,
-            text="Selecione um item do histórico ou faça uma nova análise",
-            anchor=tk.W,
-        )
-        self.meta_label.pack(fill=tk.X, padx=2, pady=2)
-
-        self.tabs = ttk.Notebook(right)
-        self.tabs.pack(fill=tk.BOTH, expand=True)
-
-        # --- Result tab
-        result_frame = ttk.Frame(self.tabs)
-        self.result_text = scrolledtext.ScrolledText(
-            result_frame, font=("Consolas", 11), wrap=tk.WORD
-        )
-        self.result_text.pack(fill=tk.BOTH, expand=True)
-        self.tabs.add(result_frame, text="Resultado")
-
-        # --- Prompt tab
-        prompt_frame = ttk.Frame(self.tabs)
-        self.prompt_text = scrolledtext.ScrolledText(
-            prompt_frame, font=("Consolas", 10), wrap=tk.WORD
-        )
-        self.prompt_text.pack(fill=tk.BOTH, expand=True)
-        self.tabs.add(prompt_frame, text="Prompt")
-
-        self.result_text.tag_configure("title", font=("Consolas", 14, "bold"))
-        self.result_text.tag_configure("bold", font=("Consolas", 11, "bold"))
-
-        # Last row: status
-        self.status_var = tk.StringVar(value="Pronto")
-        status_bar = ttk.Label(
-            root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W
-        )
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
-
-        # Load history initially
-        self.history = []
-        self.reload_history()
-
-        # Poll queue for worker results
-        self.root.after(200, self.check_queue)
-
-    # History management -----------------------------------------------------------
-    def reload_history(self):
-        self.history = load_history()
-        self.history_list.delete(0, tk.END)
-        for i, item in enumerate(self.history):
-            ts = item.get("timestamp", "")
-            fname = item.get("file", "unknown")
-            model = item.get("model", "")
-            label = f"{i+1}. {fname} — {ts.split('T')[0]} — {model}"
-            self.history_list.insert(tk.END, label)
-        self.status_var.set(f"Histórico carregado: {len(self.history)} itens")
-
-    def open_results_folder(self):
-        folder = os.getcwd()
-        try:
-            if os.name == "nt":
-                os.startfile(folder)
-            elif os.name == "posix":
-                subprocess.Popen(["xdg-open", folder])
-            else:
-                messagebox.showinfo("Pasta", f"Pasta atual: {folder}")
-        except Exception as e:
-            messagebox.showerror("Erro", f"Não foi possível abrir a pasta: {e}")
-
-    def clear_history_confirm(self):
-        if messagebox.askyesno(
-            "Confirmar", "Deseja limpar completamente o histórico (results.json)?"
-        ):
-            try:
-                clear_history_file()
-                self.reload_history()
-                self.result_text.delete(1.0, tk.END)
-                self.result_text.tag_configure("bold", font=("Arial", 10, "bold"))
-                self.meta_label.config(text="Histórico limpo")
-                self.status_var.set("Histórico limpo")
-            except Exception as e:
-                messagebox.showerror("Erro", f"Não foi possível limpar: {e}")
-
-    def open_selected_file(self, event=None):
-        selection = self.history_list.curselection()
-        if not selection:
-            return
-
-        index = selection[0]
-        entry = self.history[index]
-        file_path = entry.get("file")
-
-        if file_path and os.path.exists(file_path):
-            os.startfile(file_path)  # Windows
-        else:
-            messagebox.showerror("Erro", "Arquivo não encontrado.")
-
-    # Selection / display ---------------------------------------------------------
-    def on_history_select(self, event=None):
-        sel = self.history_list.curselection()
-        if not sel:
-            return
-        idx = sel[0]
-        entry = self.history[idx]
-        self.display_entry(entry)
-
-    def display_entry(self, entry):
-        self.meta_label.config(
-            text=f"{entry.get('file','')} — {entry.get('timestamp','')} — {entry.get('model','')}"
-        )
-
-        result = entry.get("result", {})
-        self.result_text.delete(1.0, tk.END)
-
-        # --- Prompt tab content
-        self.prompt_text.delete(1.0, tk.END)
-        prompt = entry.get("prompt", "")
-        if prompt:
-            self.prompt_text.insert(tk.END, prompt)
-        else:
-            self.prompt_text.insert(tk.END, "[Prompt não disponível]")
-
-        if "error" in result:
-            self.result_text.insert(
-                tk.END, json.dumps(result, indent=2, ensure_ascii=False)
-            )
-            return
-
-        lines = []
-
-        validacao = result.get("validacao", [])
-        for item in validacao:
-            titulo = item.get("item", "Item")
-            status = item.get("status", "")
-            detalhes = item.get("detalhes", "")
-
-            lines.append((f"{titulo}\n", "title"))
-
-            lines.append(("Status: ", "bold"))
-            lines.append((status + "\n", None))
-
-            lines.append(("Detalhes: ", "bold"))
-            lines.append((detalhes + "\n\n", None))
-
-        lines.append(("Pontuação Final:\n", "title"))
-        lines.append((f"{result.get('pontuacao_final', '')}\n\n", None))
-
-        melhorias = result.get("melhorias_recomendadas", "")
-        if melhorias:
-            lines.append(("Melhorias Recomendadas:\n", "title"))
-            lines.append((f"{melhorias}\n", None))
-
-        # Send to text box
-        for text, tag in lines:
-            if tag:
-                self.result_text.insert(tk.END, text, tag)
-            else:
-                self.result_text.insert(tk.END, text)
-
-        self.status_var.set(f"Exibindo item: {entry.get('file','')}")
-
-    # File selection and analysis -----------------------------------------------
-    def select_file(self):
-        path = filedialog.askopenfilename(
-            title="Selecione o arquivo",
-            filetypes=[
-                ("Documentos", "*.docx;*.pdf;*.png;*.jpg;*.jpeg;*.webp"),
-                ("Imagens", "*.png;*.jpg;*.jpeg;*.webp"),
-            ],
-        )
-        if not path:
-            return
-        self.run_analysis(path)
-
-    def delete_selected(self):
-        selection = self.history_list.curselection()
-        if not selection:
-            messagebox.showerror("Erro", "Nenhum item selecionado.")
-            return
-
-        index = selection[0]
-
-        confirm = messagebox.askyesno("Confirmar", "Deseja excluir este resultado?")
-        if not confirm:
-            return
-
-        # remove from memory
-        self.history.pop(index)
-
-        # save results.json
-        with open(RESULTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.history, f, indent=2, ensure_ascii=False)
-
-        # update listbox
-        self.history_list.delete(index)
-
-        # clear the display panel
-        self.result_text.delete(1.0, tk.END)
-        self.meta_label.config(text="")
-
-    def rerun_selected(self):
-        sel = self.history_list.curselection()
-        if not sel:
-            messagebox.showinfo("Re-run", "Nenhum item selecionado no histórico.")
-            return
-        idx = sel[0]
-        entry = self.history[idx]
-        path = entry.get("path") or entry.get("file")
-        if not path or not os.path.exists(path):
-            # allow user to locate file
-            messagebox.showinfo(
-                "Arquivo não encontrado",
-                "O arquivo original não foi encontrado. Selecione um arquivo para reexecutar.",
-            )
-            self.select_file()
-            return
-        self.run_analysis(path)
-
-    def run_analysis(self, path):
-        text_model = self.text_model_var.get().strip() or TEXT_MODELS[0]
-        image_model = self.image_model_var.get().strip() or IMAGE_MODELS[0]
-
-        # start progress and thread
-        self.progress.start(10)
-        self.status_var.set(
-            f"Analisando {os.path.basename(path)} com {text_model} e {image_model} ..."
-        )
-        self.btn_select.config(state=tk.DISABLED)
-        self.delete_button.config(state=tk.DISABLED)
-        self.btn_rerun.config(state=tk.DISABLED)
-        self.btn_export.config(state=tk.DISABLED)
-        self.btn_clear.config(state=tk.DISABLED)
-
-        t = threading.Thread(
-            target=worker_analyze,
-            args=(path, text_model, image_model, self.queue),
-            daemon=True,
-        )
-        t.start()
-
-    def check_queue(self):
-        try:
-            item = self.queue.get_nowait()
-        except queue.Empty:
-            self.root.after(200, self.check_queue)
-            return
-
-        status, payload = item
-        self.progress.stop()
-        self.btn_select.config(state=tk.NORMAL)
-        self.delete_button.config(state=tk.NORMAL)
-        self.btn_rerun.config(state=tk.NORMAL)
-        self.btn_export.config(state=tk.NORMAL)
-        self.btn_clear.config(state=tk.NORMAL)
-
-        if status == "ok":
-            entry = payload
-            # reload history and auto-select last item
-            self.reload_history()
-            # select last item
-            last_index = len(self.history) - 1
-            if last_index >= 0:
-                self.history_list.select_clear(0, tk.END)
-                self.history_list.select_set(last_index)
-                self.history_list.event_generate("<<ListboxSelect>>")
-            messagebox.showinfo(
-                "Concluído", f"Análise concluída e salva: {entry.get('file')}"
-            )
-            self.status_var.set("Análise concluída")
-        else:
-            err = payload
-            messagebox.showerror("Erro na análise", f"Ocorreu um erro: {err}")
-            self.status_var.set("Erro na análise")
-
-        self.root.after(200, self.check_queue)
-
-    # Exporting ------------------------------------------------------------------
-    def export_selected(self):
-        sel = self.history_list.curselection()
-        if not sel:
-            messagebox.showinfo("Exportar", "Nenhum item selecionado no histórico.")
-            return
-        entry = self.history[sel[0]]
-        # ask where to save
-        default_name = os.path.splitext(entry.get("file", "result"))[0] + "_analise.pdf"
-        out_path = filedialog.asksaveasfilename(
-            title="Salvar como...",
-            defaultextension=".pdf",
-            initialfile=default_name,
-            filetypes=[("PDF", "*.pdf"), ("Text", "*.txt")],
-        )
-        if not out_path:
-            return
-        try:
-            if out_path.lower().endswith(".pdf"):
-                try:
-                    export_entry_to_pdf(entry, out_path)
-                    messagebox.showinfo("Exportado", f"Exportado para PDF: {out_path}")
-                except ImportError:
-                    # fallback: save as txt
-                    txt_path = out_path[:-4] + ".txt"
-                    with open(txt_path, "w", encoding="utf-8") as f:
-                        f.write(json.dumps(entry, indent=2, ensure_ascii=False))
-                    messagebox.showinfo(
-                        "Fallback TXT",
-                        f"reportlab não encontrado. Resultado salvo como TXT: {txt_path}",
-                    )
-            else:
-                with open(out_path, "w", encoding="utf-8") as f:
-                    f.write(json.dumps(entry, indent=2, ensure_ascii=False))
-                messagebox.showinfo("Exportado", f"Exportado como texto: {out_path}")
-        except Exception as e:
-            messagebox.showerror("Erro exportar", f"Erro ao exportar: {e}")
-
-
-def main():
     root = tk.Tk()
     app = ResumeAnalyzerApp(root)
     root.mainloop()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
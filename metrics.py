@@ -0,0 +1,205 @@
+import os
+import threading
+
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class StageTrace:
+    """
+    Timings and sizes of one analysis: total seconds per pipeline stage and
+    one record per model call (model, seconds, prompt/response tokens and
+    sizes). Shared by the worker threads of that analysis. `on_stage` is
+    called with the name of each stage as it starts (progress reporting).
+    """
+
+    def __init__(self, on_stage=None):
+        self.stages = {}
+        self.calls = []
+        self.sizes = {}
+        self.on_stage = on_stage
+        self._lock = threading.Lock()
+
+    def stage_started(self, stage):
+        if self.on_stage is not None:
+            self.on_stage(stage)
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            total = self.stages.setdefault(stage, {"seconds": 0.0, "count": 0})
+            total["seconds"] += seconds
+            total["count"] += 1
+
+    def add_call(
+        self,
+        kind,
+        model,
+        seconds,
+        prompt_tokens=None,
+        response_tokens=None,
+        prompt_bytes=0,
+        response_chars=0,
+    ):
+        with self._lock:
+            self.calls.append(
+                {
+                    "kind": kind,
+                    "model": model,
+                    "seconds": round(seconds, 4),
+                    "prompt_tokens": prompt_tokens,
+                    "response_tokens": response_tokens,
+                    "prompt_bytes": prompt_bytes,
+                    "response_chars": response_chars,
+                }
+            )
+
+    def set_size(self, name, value):
+        with self._lock:
+            self.sizes[name] = value
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {"seconds": round(v["seconds"], 4), "count": v["count"]}
+                    for stage, v in self.stages.items()
+                },
+                "calls": list(self.calls),
+                "sizes": dict(self.sizes),
+                "prompt_tokens": sum(c["prompt_tokens"] or 0 for c in self.calls),
+                "response_tokens": sum(c["response_tokens"] or 0 for c in self.calls),
+            }
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and stage histograms rendered in the Prometheus
+    text exposition format, fed with the metrics of every finished analysis.
+    """
+
+    def __init__(self, prefix="resume_analyzer"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=STAGE_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {
+                    "buckets": buckets,
+                    "counts": [0] * len(buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(hist["buckets"]):
+                if value <= bound:
+                    hist["counts"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def record_analysis(self, metrics, text_model, ok):
+        """
+        Add the metrics dict of one analysis (StageTrace.as_dict()).
+        """
+        status = "ok" if ok else "error"
+        self.inc("analyses_total", {"model": text_model, "status": status})
+        for stage, value in metrics.get("stages", {}).items():
+            self.observe("stage_seconds", {"stage": stage}, value["seconds"])
+        for call in metrics.get("calls", []):
+            labels = {"kind": call["kind"], "model": call["model"] or ""}
+            self.inc("model_requests_total", labels)
+            self.observe("model_request_seconds", labels, call["seconds"])
+            for direction in ("prompt", "response"):
+                tokens = call.get(f"{direction}_tokens")
+                if tokens:
+                    self.inc(
+                        "tokens_total", dict(labels, direction=direction), tokens
+                    )
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, dict(h, counts=list(h["counts"])))
+                for key, h in self._histograms.items()
+            )
+        typed = set()
+        for (name, labels), value in counters:
+            full = f"{self.prefix}_{name}"
+            if full not in typed:
+                typed.add(full)
+                lines.append(f"# TYPE {full} counter")
+            lines.append(f"{full}{_labels(labels)} {value}")
+        for (name, labels), hist in histograms:
+            full = f"{self.prefix}_{name}"
+            if full not in typed:
+                typed.add(full)
+                lines.append(f"# TYPE {full} histogram")
+            for bound, count in zip(hist["buckets"], hist["counts"]):
+                le = labels + (("le", f"{bound:g}"),)
+                lines.append(f"{full}_bucket{_labels(le)} {count}")
+            le = labels + (("le", "+Inf"),)
+            lines.append(f"{full}_bucket{_labels(le)} {hist['count']}")
+            lines.append(f"{full}_sum{_labels(labels)} {hist['sum']:.6f}")
+            lines.append(f"{full}_count{_labels(labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Write the metrics to `path` atomically (e.g. for node_exporter's
+        textfile collector).
+        """
+        text = self.render()
+        with self._write_lock:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+
+    def serve(self, port, host="0.0.0.0"):
+        """
+        Serve GET /metrics on `port` from a daemon thread.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
@@ -0,0 +1,447 @@
+import base64
+import json
+import os
+import queue
+import socket
+import threading
+import weakref
+from urllib.parse import urlsplit
+
+
+DEFAULT_HOST = "http://127.0.0.1:11434"
+
+
+class OllamaError(Exception):
+    """
+    Raised when ollama answers with an error (HTTP status or CLI exit code).
+    `output` holds whatever the model produced before failing and `status`
+    the HTTP status, if any.
+    """
+
+    def __init__(self, message, output="", status=None):
+        super().__init__(message)
+        self.output = output
+        self.status = status
+
+
+class OllamaUnavailable(OllamaError):
+    """
+    Raised when the Ollama server cannot be reached at all.
+    """
+
+
+class OllamaCancelled(OllamaError):
+    """
+    Raised when a request is aborted through its CancelToken.
+    """
+
+
+class OllamaClient:
+    """
+    Client for the Ollama REST API (/api/generate and /api/chat).
+
+    Keeps a pool of persistent HTTP connections so consecutive calls reuse the
+    same socket instead of spawning an `ollama run` process each time. When the
+    server is unreachable and `cli_fallback` is set, calls go through the
+    `ollama run` CLI instead, raising the same exceptions.
+    """
+
+    def __init__(
+        self, host=DEFAULT_HOST, pool_size=4, keep_alive=None, cli_fallback=True
+    ):
+        if "://" not in host:
+            host = "http://" + host
+        parts = urlsplit(host)
+        self.host = host
+        self.scheme = parts.scheme
+        self.hostname = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if parts.scheme == "https" else 11434)
+        self.keep_alive = keep_alive
+        self.cli_fallback = cli_fallback
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    # Connection pool --------------------------------------------------------------
+    def _new_connection(self, timeout):
+        import http.client
+
+        cls = (
+            http.client.HTTPSConnection
+            if self.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        conn = cls(self.hostname, self.port, timeout=timeout)
+        try:
+            conn.connect()
+        except OSError as e:
+            conn.close()
+            if isinstance(e, TimeoutError):
+                raise
+            raise OllamaUnavailable(f"Ollama server not reachable at {self.host}: {e}")
+        return conn
+
+    def _acquire(self, timeout):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            return self._new_connection(timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # Requests ---------------------------------------------------------------------
+    def _send(self, path, payload, timeout, cancel=None, method="POST"):
+        """
+        Send `payload` as JSON (no body when None) and return (conn, response)
+        with the body unread.
+        """
+        import http.client
+
+        body = None
+        headers = {}
+        if payload is not None:
+            body = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        conn, reused = self._acquire(timeout)
+        if cancel is not None:
+            cancel.attach(conn)
+        try:
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return conn, conn.getresponse()
+            except (
+                http.client.RemoteDisconnected,
+                ConnectionResetError,
+                BrokenPipeError,
+            ):
+                # the server dropped an idle keep-alive socket; retry once fresh
+                if not reused or (cancel is not None and cancel.cancelled):
+                    raise
+                if cancel is not None:
+                    cancel.detach(conn)
+                conn.close()
+                conn = self._new_connection(timeout)
+                if cancel is not None:
+                    cancel.attach(conn)
+                conn.request(method, path, body=body, headers=headers)
+                return conn, conn.getresponse()
+        except BaseException as e:
+            self._finish(conn, None, cancel)
+            _raise_if_cancelled(cancel, e)
+            raise
+
+    def _finish(self, conn, resp, cancel):
+        """
+        Return the connection to the pool if the response was fully read and
+        can be reused, close it otherwise.
+        """
+        if cancel is not None:
+            cancel.detach(conn)
+        if resp is not None and resp.isclosed() and not resp.will_close:
+            self._release(conn)
+        else:
+            conn.close()
+
+    @staticmethod
+    def _check_status(resp, data):
+        if resp.status == 200:
+            return
+        text = data.decode("utf-8", errors="ignore")
+        try:
+            message = json.loads(text).get("error", text)
+        except ValueError:
+            message = text
+        raise OllamaError(f"HTTP {resp.status}: {message}", status=resp.status)
+
+    def request(self, path, payload, timeout=300, cancel=None, method="POST"):
+        """
+        Send `payload` as JSON to `path` and return the decoded JSON answer.
+        """
+        conn, resp = self._send(path, payload, timeout, cancel, method)
+        try:
+            data = resp.read()
+        except BaseException as e:
+            self._finish(conn, None, cancel)
+            _raise_if_cancelled(cancel, e)
+            raise
+        self._finish(conn, resp, cancel)
+        self._check_status(resp, data)
+        return json.loads(data)
+
+    def stream(self, path, payload, timeout=300, cancel=None):
+        """
+        POST `payload` with streaming enabled and yield each decoded chunk as
+        it arrives. Closing the generator early drops the connection, which
+        makes the server stop generating.
+        """
+        payload = dict(payload, stream=True)
+        conn, resp = self._send(path, payload, timeout, cancel)
+        if resp.status != 200:
+            data = resp.read()
+            self._finish(conn, resp, cancel)
+            self._check_status(resp, data)
+
+        completed = False
+        try:
+            while not completed:
+                line = resp.readline()
+                if not line:
+                    if cancel is not None:
+                        cancel.check()
+                    raise OllamaError("stream ended before the response was done")
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise OllamaError(chunk["error"])
+                yield chunk
+                if chunk.get("done"):
+                    resp.read()
+                    completed = True
+        except Exception as e:
+            _raise_if_cancelled(cancel, e)
+            raise
+        finally:
+            self._finish(conn, resp if completed else None, cancel)
+
+    def _payload(self, model, options, extra):
+        payload = {"model": model, "stream": False, "think": False}
+        if options:
+            payload["options"] = options
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        payload.update(extra)
+        return payload
+
+    def _generate_payload(self, model, prompt, options, images, extra):
+        payload = self._payload(model, options, extra)
+        payload["prompt"] = prompt
+        if images:
+            payload["images"] = [
+                base64.b64encode(img).decode("ascii") for img in images
+            ]
+        return payload
+
+    def generate(
+        self,
+        model,
+        prompt,
+        options=None,
+        timeout=300,
+        images=None,
+        cancel=None,
+        **extra,
+    ):
+        """
+        Calls /api/generate. `images` is a list of raw image bytes sent in the
+        API's images field. Returns the response dict (text in "response").
+        """
+        payload = self._generate_payload(model, prompt, options, images, extra)
+        try:
+            return self.request("/api/generate", payload, timeout, cancel)
+        except OllamaUnavailable:
+            if not self.cli_fallback:
+                raise
+        return {"model": model, "response": run_cli(model, prompt, timeout, images)}
+
+    def generate_stream(
+        self,
+        model,
+        prompt,
+        options=None,
+        timeout=300,
+        images=None,
+        cancel=None,
+        **extra,
+    ):
+        """
+        Streaming /api/generate: yields chunk dicts, each with a piece of the
+        text in "response". `timeout` applies to the wait for each chunk.
+        """
+        payload = self._generate_payload(model, prompt, options, images, extra)
+        try:
+            chunks = self.stream("/api/generate", payload, timeout, cancel)
+            first = next(chunks, None)
+        except OllamaUnavailable:
+            if not self.cli_fallback:
+                raise
+            text = run_cli(model, prompt, timeout, images)
+            yield {"model": model, "response": text, "done": True}
+            return
+        if first is not None:
+            yield first
+            yield from chunks
+
+    def chat(self, model, messages, options=None, timeout=300, cancel=None, **extra):
+        """
+        Calls /api/chat. Returns the response dict (text in "message.content").
+        """
+        payload = self._payload(model, options, extra)
+        payload["messages"] = messages
+        try:
+            return self.request("/api/chat", payload, timeout, cancel)
+        except OllamaUnavailable:
+            if not self.cli_fallback:
+                raise
+        prompt = "\n\n".join(m.get("content", "") for m in messages)
+        content = run_cli(model, prompt, timeout)
+        return {"model": model, "message": {"role": "assistant", "content": content}}
+
+    # Model residency --------------------------------------------------------------
+    def ps(self, timeout=10):
+        """
+        Models currently loaded in the server's memory (/api/ps), as a list
+        of dicts with at least "name", "size_vram" and "expires_at".
+        """
+        return self.request("/api/ps", None, timeout, method="GET").get("models", [])
+
+    def load(self, model, keep_alive=None, options=None, timeout=300):
+        """
+        Load `model` without generating anything (a generate request with no
+        prompt), keeping it resident for `keep_alive`. `options` must match
+        the ones later requests use (e.g. num_ctx) or Ollama reloads it.
+        """
+        payload = self._payload(model, options, {})
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self.request("/api/generate", payload, timeout)
+
+    def unload(self, model, timeout=60):
+        return self.load(model, keep_alive=0, timeout=timeout)
+
+
+class CancelToken:
+    """
+    Lets another thread abort the requests made with it. Cancelling shuts down
+    the sockets in flight, so a blocked read returns at once and Ollama stops
+    generating; the call then raises OllamaCancelled.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._conns = set()
+        self._children = weakref.WeakSet()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+        with self._lock:
+            conns = list(self._conns)
+            children = list(self._children)
+        for conn in conns:
+            _abort_connection(conn)
+        for child in children:
+            child.cancel()
+
+    def check(self):
+        if self.cancelled:
+            raise OllamaCancelled("cancelled")
+
+    def wait(self, seconds):
+        """
+        Sleep up to `seconds`; returns True (early) if cancelled meanwhile.
+        """
+        return self._event.wait(seconds)
+
+    def child(self):
+        """
+        A token that is cancelled along with this one but can also be
+        cancelled on its own (e.g. the losing copy of a hedged request).
+        """
+        token = CancelToken()
+        with self._lock:
+            self._children.add(token)
+        if self.cancelled:
+            token.cancel()
+        return token
+
+    def attach(self, conn):
+        with self._lock:
+            self._conns.add(conn)
+        if self.cancelled:
+            _abort_connection(conn)
+
+    def detach(self, conn):
+        with self._lock:
+            self._conns.discard(conn)
+
+
+def _abort_connection(conn):
+    sock = conn.sock
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _raise_if_cancelled(cancel, error):
+    if cancel is not None and cancel.cancelled:
+        raise OllamaCancelled("cancelled") from error
+
+
+def _image_suffix(data):
+    if data.startswith(b"\xff\xd8"):
+        return ".jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    return ".png"
+
+
+def run_cli(model, prompt, timeout, images=None):
+    """
+    Runs the prompt through `ollama run`. Images are written to temporary
+    files whose paths are appended to the prompt, as the CLI expects.
+    Raises OllamaError on a non-zero exit, TimeoutError on timeout and
+    FileNotFoundError if ollama is not installed.
+    """
+    import subprocess
+    import tempfile
+
+    image_files = []
+    try:
+        for data in images or []:
+            fd, img_path = tempfile.mkstemp(suffix=_image_suffix(data))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            image_files.append(img_path)
+        if image_files:
+            prompt = prompt.rstrip() + "\n" + " ".join(image_files) + "\n"
+
+        result = subprocess.run(
+            ["ollama", "run", model, "--think=false"],
+            input=prompt.encode("utf-8"),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        raise TimeoutError(f"ollama run timed out after {timeout}s")
+    finally:
+        for img_path in image_files:
+            os.remove(img_path)
+
+    out = result.stdout.decode("utf-8", errors="ignore")
+    if result.returncode != 0:
+        err = result.stderr.decode("utf-8", errors="ignore")
+        raise OllamaError(err, output=out)
+    return out
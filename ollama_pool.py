@@ -0,0 +1,347 @@
+import itertools
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from ollama_client import CancelToken, OllamaClient, OllamaError, OllamaUnavailable
+
+# what a probe (/api/ps) of a broken endpoint can raise: no connection, an
+# HTTP error status or a body that is not the expected JSON
+PROBE_ERRORS = (OllamaError, OSError, ValueError, AttributeError, TypeError)
+
+
+class Endpoint:
+    """
+    One Ollama server of an OllamaPool and its routing state: requests in
+    flight, consecutive failures, when it may be used again after being
+    ejected, and the models it had loaded at the last health check.
+    """
+
+    def __init__(self, host, pool_size, keep_alive):
+        self.client = OllamaClient(
+            host, pool_size=pool_size, keep_alive=keep_alive, cli_fallback=False
+        )
+        self.host = self.client.host
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.models = set()
+        self.hedges = 0  # hedged copies of a straggling request sent here
+        self.hedge_wins = 0  # ... that answered before the original
+
+    def available(self, now):
+        return self.ejected_until <= now
+
+
+class OllamaPool:
+    """
+    Spreads requests over several Ollama servers, with the same interface as
+    OllamaClient. Each request goes to the available endpoint with the fewest
+    requests in flight (least outstanding requests). An endpoint that fails
+    to connect `max_failures` times in a row is ejected for `eject_seconds`;
+    a background thread probes every endpoint (/api/ps) each
+    `health_interval` seconds, ejecting dead ones, bringing recovered ones
+    back and noting which models each one has loaded. With `pin_models`,
+    requests for a model only go to the endpoints that have it loaded (when
+    any of them is available), so models are not loaded on every box.
+    Requests that could not connect are retried on the next endpoint.
+
+    generate() and chat() take an optional `hedge_after`: when the first
+    endpoint has not answered after that many seconds, the same request is
+    also sent to the next one, the first answer is used and the other request
+    is cancelled (streams are never hedged).
+    """
+
+    def __init__(
+        self,
+        hosts,
+        pool_size=4,
+        keep_alive=None,
+        pin_models=False,
+        health_interval=15.0,
+        health_timeout=5.0,
+        max_failures=2,
+        eject_seconds=30.0,
+    ):
+        if not hosts:
+            raise ValueError("OllamaPool needs at least one host")
+        self.endpoints = [Endpoint(h, pool_size, keep_alive) for h in hosts]
+        self.keep_alive = keep_alive
+        self.pin_models = pin_models
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.host = ", ".join(e.host for e in self.endpoints)
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+
+    # Routing ----------------------------------------------------------------------
+    def _candidates(self, model):
+        """
+        Endpoints to try for `model`, best first.
+        """
+        self._start_health_checks()
+        now = time.monotonic()
+        with self._lock:
+            up = [e for e in self.endpoints if e.available(now)]
+            if self.pin_models and model:
+                pinned = [e for e in up if model in e.models]
+                if pinned:
+                    up = pinned
+            # rotate first so ties between idle endpoints take turns
+            shift = next(self._turn) % len(up) if up else 0
+            up = up[shift:] + up[:shift]
+            ranked = sorted(up, key=lambda e: e.outstanding)
+            # ejected endpoints are the last resort, soonest back first
+            down = sorted(
+                (e for e in self.endpoints if not e.available(now)),
+                key=lambda e: e.ejected_until,
+            )
+        return ranked + down
+
+    @contextmanager
+    def _track(self, endpoint):
+        with self._lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+    def _failed(self, endpoint):
+        with self._lock:
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures:
+                endpoint.ejected_until = time.monotonic() + self.eject_seconds
+                endpoint.models.clear()
+
+    def _succeeded(self, endpoint, model=None):
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.ejected_until = 0.0
+            if model:
+                # the server loads the model to answer
+                endpoint.models.add(model)
+
+    def _call(self, model, method, *args, **kwargs):
+        error = None
+        for endpoint in self._candidates(model):
+            with self._track(endpoint):
+                try:
+                    result = getattr(endpoint.client, method)(*args, **kwargs)
+                except (OllamaUnavailable, ConnectionError) as e:
+                    # nothing reached the server: safe to try the next one
+                    self._failed(endpoint)
+                    error = e
+                    continue
+            self._succeeded(endpoint, model)
+            return result
+        raise OllamaUnavailable(f"no Ollama endpoint reachable ({error})")
+
+    def _hedged(self, model, method, args, kwargs, delay):
+        """
+        _call() that also sends the request to the next endpoint if the first
+        one has not answered after `delay` seconds, and returns whichever
+        answer comes first. Each copy runs in its own thread with a child of
+        the caller's cancel token, so the loser can be cancelled alone.
+        """
+        parent = kwargs.pop("cancel", None) or CancelToken()
+        candidates = self._candidates(model)
+        answers = queue.Queue()
+        started = []
+
+        def attempt(endpoint, token):
+            with self._track(endpoint):
+                try:
+                    result = getattr(endpoint.client, method)(
+                        *args, cancel=token, **kwargs
+                    )
+                except BaseException as e:
+                    answers.put((endpoint, None, e))
+                    return
+            answers.put((endpoint, result, None))
+
+        def start():
+            endpoint = candidates.pop(0)
+            token = parent.child()
+            started.append((endpoint, token))
+            threading.Thread(
+                target=attempt, args=(endpoint, token), daemon=True
+            ).start()
+            return endpoint
+
+        start()
+        running = 1
+        hedge = None
+        error = None
+        try:
+            while running:
+                wait = delay if hedge is None and candidates else None
+                try:
+                    endpoint, result, exc = answers.get(timeout=wait)
+                except queue.Empty:
+                    hedge = start()
+                    running += 1
+                    with self._lock:
+                        hedge.hedges += 1
+                    continue
+                running -= 1
+                if exc is None:
+                    self._succeeded(endpoint, model)
+                    if endpoint is hedge:
+                        with self._lock:
+                            hedge.hedge_wins += 1
+                    return result
+                if isinstance(exc, (OllamaUnavailable, ConnectionError)):
+                    # nothing reached the server: fail over right away
+                    self._failed(endpoint)
+                    error = error or exc
+                    if candidates and running == 0:
+                        start()
+                        running += 1
+                    continue
+                # a real answer (HTTP error, timeout, cancel): keep it unless
+                # the other copy still comes back with something better
+                error = exc
+        finally:
+            for _, token in started:
+                token.cancel()
+        if isinstance(error, (OllamaUnavailable, ConnectionError)):
+            raise OllamaUnavailable(f"no Ollama endpoint reachable ({error})")
+        raise error
+
+    # Requests ---------------------------------------------------------------------
+    def generate(self, model, prompt, hedge_after=None, **kwargs):
+        if hedge_after is not None and len(self.endpoints) > 1:
+            return self._hedged(
+                model, "generate", (model, prompt), kwargs, hedge_after
+            )
+        return self._call(model, "generate", model, prompt, **kwargs)
+
+    def chat(self, model, messages, hedge_after=None, **kwargs):
+        if hedge_after is not None and len(self.endpoints) > 1:
+            return self._hedged(model, "chat", (model, messages), kwargs, hedge_after)
+        return self._call(model, "chat", model, messages, **kwargs)
+
+    def generate_stream(self, model, prompt, **kwargs):
+        error = None
+        for endpoint in self._candidates(model):
+            with self._track(endpoint):
+                chunks = endpoint.client.generate_stream(model, prompt, **kwargs)
+                try:
+                    first = next(chunks, None)
+                except (OllamaUnavailable, ConnectionError) as e:
+                    self._failed(endpoint)
+                    error = e
+                    continue
+                self._succeeded(endpoint, model)
+                if first is not None:
+                    yield first
+                    yield from chunks
+                return
+        raise OllamaUnavailable(f"no Ollama endpoint reachable ({error})")
+
+    # Model residency --------------------------------------------------------------
+    def ps(self, timeout=10):
+        """
+        Models loaded on every available endpoint, each dict tagged with the
+        endpoint's "host".
+        """
+        models = []
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if not endpoint.available(now):
+                continue
+            try:
+                loaded = endpoint.client.ps(timeout)
+                loaded = [dict(m, host=endpoint.host) for m in loaded]
+            except PROBE_ERRORS:
+                self._failed(endpoint)
+                continue
+            models.extend(loaded)
+        return models
+
+    def load(self, model, keep_alive=None, options=None, timeout=300):
+        return self._call(
+            model, "load", model, keep_alive, options=options, timeout=timeout
+        )
+
+    def unload(self, model, timeout=60):
+        for endpoint in self.endpoints:
+            if model not in endpoint.models:
+                continue
+            try:
+                endpoint.client.unload(model, timeout)
+            except (OllamaError, OSError, ValueError):
+                self._failed(endpoint)
+            with self._lock:
+                endpoint.models.discard(model)
+
+    # Health checks ----------------------------------------------------------------
+    def check_health(self):
+        """
+        Probe every endpoint once: endpoints that answer with the list of
+        loaded models are (re)admitted and their models refreshed; the rest
+        (unreachable, HTTP error, unexpected body) count a failure.
+        """
+        for endpoint in self.endpoints:
+            try:
+                loaded = endpoint.client.ps(self.health_timeout)
+                models = {m.get("name") for m in loaded}
+            except PROBE_ERRORS:
+                self._failed(endpoint)
+                continue
+            with self._lock:
+                endpoint.models = models
+            self._succeeded(endpoint)
+
+    def _start_health_checks(self):
+        if not self.health_interval or self._health_thread is not None:
+            return
+        with self._lock:
+            if self._health_thread is not None:
+                return
+            self._health_thread = threading.Thread(
+                target=self._health_loop, daemon=True
+            )
+        self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception:
+                # a probe bug must not stop the checks for every endpoint
+                pass
+
+    def stats(self):
+        """
+        Routing state of each endpoint, for reports and debugging.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "host": e.host,
+                    "available": e.available(now),
+                    "outstanding": e.outstanding,
+                    "requests": e.requests,
+                    "failures": e.failures,
+                    "hedges": e.hedges,
+                    "hedge_wins": e.hedge_wins,
+                    "models": sorted(e.models),
+                }
+                for e in self.endpoints
+            ]
+
+    def close(self):
+        self._stop.set()
+        for endpoint in self.endpoints:
+            endpoint.client.close()
@@ -0,0 +1,103 @@
+import atexit
+import os
+import threading
+
+
+_pools = {}  # workers -> ProcessPoolExecutor
+_pool_lock = threading.Lock()
+
+
+def read_pages(pdf, start=0, stop=None, with_images=True):
+    """
+    Yield (page_index, text, images) page by page from an open PDF, images
+    being [(name, bytes), ...].
+    """
+    stop = pdf.page_count if stop is None else min(stop, pdf.page_count)
+    for page_index in range(start, stop):
+        page = pdf[page_index]
+        images = []
+        if with_images:
+            for img_index, img in enumerate(page.get_images(full=True)):
+                base = pdf.extract_image(img[0])
+                img_name = f"page{page_index}_{img_index}.{base['ext']}"
+                images.append((img_name, base["image"]))
+        yield page_index, page.get_text(), images
+
+
+def iter_pdf_pages(path, start=0, stop=None, with_images=True):
+    """
+    Open the PDF once and yield read_pages() of it.
+    """
+    import pymupdf
+
+    with pymupdf.open(path) as pdf:
+        yield from read_pages(pdf, start, stop, with_images)
+
+
+def extract_pdf_range(path, start, stop, with_images=True):
+    """
+    Process pool task: extract pages [start, stop) of one PDF.
+    """
+    return list(iter_pdf_pages(path, start, stop, with_images))
+
+
+def _get_pool(workers):
+    """
+    The shared process pool with `workers` processes, created on first use.
+    Workers are spawned rather than forked: the pool is created lazily from
+    a process that already runs threads (GUI, job scheduler, Ollama health
+    checks), and forking one can deadlock on a lock held by another thread.
+    """
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            if not _pools:
+                atexit.register(shutdown_pools)
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return pool
+
+
+def shutdown_pools():
+    """
+    Stop the process pools (registered with atexit on first use).
+    """
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pdf(path, with_images=True, workers=1, min_pages=50):
+    """
+    Yield (page_index, text, images) for every page in order. PDFs with at
+    least `min_pages` pages are split into page ranges extracted in parallel
+    by a shared process pool of `workers` processes; smaller ones are read
+    from the same open document whose page count was checked, so a typical
+    CV is opened once.
+    """
+    import pymupdf
+
+    with pymupdf.open(path) as pdf:
+        count = pdf.page_count
+        if workers <= 1 or count < min_pages:
+            yield from read_pages(pdf, with_images=with_images)
+            return
+
+    pool = _get_pool(workers)
+    step = -(-count // workers)
+    futures = [
+        pool.submit(extract_pdf_range, path, start, start + step, with_images)
+        for start in range(0, count, step)
+    ]
+    for future in futures:
+        yield from future.result()
+
+
+def default_workers():
+    return min(4, os.cpu_count() or 1)
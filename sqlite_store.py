@@ -0,0 +1,30 @@
+import os
+import sqlite3
+import threading
+
+
+class LocalConnection:
+    """
+    The SQLite connection of the calling thread to `path`, opened on first
+    use in autocommit mode with the WAL journal (readers never wait for the
+    writer) and `schema` applied; the folder is created if needed. Shared
+    by the stores (DiskCache, HistoryIndex, BlobStore, WatchIndex), which
+    are all used from several threads.
+    """
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.schema)
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,67 @@
+import json
+import os
+
+import analyzer
+
+
+def entry_for(path):
+    return {"file": os.path.basename(path), "path": str(path), "result": {}}
+
+
+def test_same_name_in_subfolders_does_not_collide(tmp_path):
+    paths = [tmp_path / "in" / "a" / "cv.pdf", tmp_path / "in" / "b" / "cv.pdf"]
+    root = analyzer.batch_root(paths)
+    out = tmp_path / "out"
+
+    written = [analyzer.write_batch_result(entry_for(p), out, root) for p in paths]
+
+    assert root == str(tmp_path / "in")
+    assert len(set(written)) == 2
+    assert sorted(os.path.relpath(p, out) for p in written) == [
+        os.path.join("a", "cv.pdf.json"),
+        os.path.join("b", "cv.pdf.json"),
+    ]
+    with open(written[0], encoding="utf-8") as f:
+        assert json.load(f)["path"] == str(paths[0])
+
+
+def test_flat_batch_keeps_plain_names(tmp_path):
+    paths = [tmp_path / "cv1.pdf", tmp_path / "cv2.pdf"]
+    root = analyzer.batch_root(paths)
+
+    written = analyzer.write_batch_result(entry_for(paths[0]), tmp_path / "o", root)
+
+    assert written == str(tmp_path / "o" / "cv1.pdf.json")
+
+
+def test_run_batch_reports_progress_in_both_phases(monkeypatch, capsys):
+    def prepare(path, image_model, use_cache):
+        if path.endswith("bad.pdf"):
+            raise ValueError("arquivo corrompido")
+        return {"path": path, "seconds": 0.1}
+
+    def analyze(document, text_model, use_cache):
+        return {"result": {"pontuacao_final": 70}, "metrics": {}}
+
+    stats = {"hits": 0, "misses": 0}
+    monkeypatch.setattr(analyzer, "prepare_document", prepare)
+    monkeypatch.setattr(analyzer, "analyze_prepared", analyze)
+    monkeypatch.setattr(analyzer, "warm_up_model", lambda *a, **k: None)
+    monkeypatch.setattr(analyzer, "release_model", lambda *a, **k: None)
+    monkeypatch.setattr(analyzer, "resident_models", lambda: None)
+    monkeypatch.setattr(analyzer.response_cache, "stats", lambda: stats)
+    paths = [f"/cvs/cv{i}.pdf" for i in range(3)] + ["/cvs/bad.pdf"]
+
+    failed = analyzer.run_batch(paths, "m", "ocr", workers=2)
+
+    out = capsys.readouterr().out.splitlines()
+    phase1 = [line for line in out if "extraído" in line or "ERRO bad.pdf" in line]
+    analyzed = [line for line in out if "pontuação 70" in line]
+    assert failed == 1
+    assert len(phase1) == 4 and len(analyzed) == 3
+    assert sorted(line.split("]")[0] for line in phase1) == [
+        "[1/4",
+        "[2/4",
+        "[3/4",
+        "[4/4",
+    ]
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+import analyzer
+from blob_store import BlobStore
+from history_store import HistoryIndex, JsonlStore
+
+
+def test_blob_is_removed_when_the_last_reference_is_released(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs.db"))
+
+    key = store.put("prompt " * 100)
+    assert store.put("prompt " * 100) == key
+    assert store.stats()["blobs"] == 1
+
+    store.release(key)
+    assert store.get(key) == "prompt " * 100
+    store.release(key)
+    assert store.get(key) is None
+    assert store.stats()["blobs"] == 0
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    blobs = BlobStore(str(tmp_path / "blobs.db"))
+    index = HistoryIndex(
+        str(tmp_path / "history.db"),
+        JsonlStore(str(tmp_path / "results.jsonl")),
+        text_loader=lambda e: analyzer.entry_blob(e, "document_text"),
+    )
+    monkeypatch.setattr(analyzer, "blob_store", blobs)
+    monkeypatch.setattr(analyzer, "history_index", index)
+    return blobs
+
+
+def entry(raw_response):
+    return {
+        "file": "cv.pdf",
+        "result": {"pontuacao_final": 80},
+        "prompt": "Analise o currículo",
+        "raw_response": raw_response,
+        "document_text": "Python e SQL",
+    }
+
+
+def test_deleting_an_entry_releases_its_blobs(history):
+    first = analyzer.save_result_entry(entry("resposta 1"))
+    second = analyzer.save_result_entry(entry("resposta 2"))
+    # prompt and document text shared by both entries, one response each
+    assert history.stats()["blobs"] == 4
+
+    analyzer.delete_history_entry(first)
+    assert history.stats()["blobs"] == 3
+    kept = analyzer.load_history_entry(second)
+    assert analyzer.entry_blob(kept, "prompt") == "Analise o currículo"
+
+    analyzer.delete_history_entry(second)
+    assert history.stats()["blobs"] == 0
+
+
+def test_txt_export_contains_the_blob_fields(history, tmp_path):
+    entry_id = analyzer.save_result_entry(entry("resposta 1"))
+    stored = analyzer.load_history_entry(entry_id)
+    assert "prompt" not in stored
+
+    out = tmp_path / "cv_analise.txt"
+    analyzer.export_entry_to_txt(stored, str(out))
+
+    exported = json.loads(out.read_text(encoding="utf-8"))
+    assert exported["prompt"] == "Analise o currículo"
+    assert exported["raw_response"] == "resposta 1"
+    assert exported["document_text"] == "Python e SQL"
+    assert "blobs" not in exported
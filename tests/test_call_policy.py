@@ -0,0 +1,122 @@
+import pytest
+
+from benchmark import FakeOllama
+from call_policy import CallPolicy
+from ollama_client import OllamaClient, OllamaError
+
+
+@pytest.fixture
+def fake():
+    server = FakeOllama(latency=0.01, token_rate=1e6).start()
+    yield server
+    server.stop()
+
+
+def policy(**kwargs):
+    outcomes = []
+    kwargs.setdefault("backoff", 0.0)
+    p = CallPolicy(on_outcome=lambda *args: outcomes.append(args[:3]), **kwargs)
+    return p, outcomes
+
+
+def generate(fake, timeouts=None):
+    client = OllamaClient(fake.url, cli_fallback=False)
+
+    def fn(timeout, hedge_after):
+        if timeouts is not None:
+            timeouts.append(timeout)
+        return client.generate("m", "olá", timeout=timeout)
+
+    return fn
+
+
+def test_server_error_is_retried(fake):
+    p, outcomes = policy(retries=2)
+    fake.fail_rate = 1.0
+    fn = generate(fake)
+
+    def fail_once(timeout, hedge_after):
+        try:
+            return fn(timeout, hedge_after)
+        finally:
+            fake.fail_rate = 0.0
+
+    response = p.call("text", "m", fail_once, 5)
+
+    assert response["done"]
+    assert fake.failures == 1
+    assert outcomes == [("text", "m", "server_error"), ("text", "m", "ok")]
+
+
+def test_server_error_gives_up_after_the_retries(fake):
+    p, outcomes = policy(retries=2)
+    fake.fail_rate = 1.0
+
+    with pytest.raises(OllamaError) as raised:
+        p.call("text", "m", generate(fake), 5)
+
+    assert raised.value.status == 503
+    assert fake.failures == 3
+    assert p.stats()["text:m"]["outcomes"] == {"server_error": 3}
+
+
+def test_client_error_is_not_retried(fake):
+    p, outcomes = policy(retries=2)
+    client = OllamaClient(fake.url, cli_fallback=False)
+    attempts = []
+
+    def missing(timeout, hedge_after):
+        attempts.append(timeout)
+        return client.request("/api/missing", {}, timeout)
+
+    with pytest.raises(OllamaError) as raised:
+        p.call("text", "m", missing, 5)
+
+    assert raised.value.status == 404
+    assert len(attempts) == 1
+    assert outcomes == [("text", "m", "error")]
+
+
+def test_timeout_doubles_up_to_the_cap(fake):
+    fake.latency = 1.0
+    p, outcomes = policy(retries=3, min_timeout=0.05, max_timeout=0.15)
+    timeouts = []
+
+    with pytest.raises(TimeoutError):
+        p.call("text", "m", generate(fake, timeouts), 0.05)
+
+    assert timeouts == [0.05, 0.1, 0.15, 0.15]
+    assert outcomes == [("text", "m", "timeout")] * 4
+
+
+def test_timeout_follows_the_p95_within_bounds():
+    p = CallPolicy(min_timeout=10, max_timeout=100, timeout_factor=3, min_samples=5)
+    for seconds in (5, 6, 7, 8):
+        p.observe("text", "m", seconds)
+    assert p.timeout("text", "m", 42) == 42  # too few samples: the default
+
+    for seconds in range(9, 25):
+        p.observe("text", "m", seconds)
+    assert p.timeout("text", "m", 42) == 24 * 3
+
+    for _ in range(5):
+        p.observe("text", "fast", 0.1)
+    assert p.timeout("text", "fast", 42) == 10
+
+    for _ in range(5):
+        p.observe("text", "slow", 60)
+    assert p.timeout("text", "slow", 42) == 100
+
+
+def test_successful_calls_teach_the_timeout(fake):
+    p, outcomes = policy(min_timeout=0.5, min_samples=3)
+    timeouts = []
+    fn = generate(fake, timeouts)
+
+    for _ in range(4):
+        p.call("text", "m", fn, 30)
+
+    # FakeOllama answers in milliseconds: the floor replaces the default
+    assert timeouts == [30, 30, 30, 0.5]
+    assert outcomes == [("text", "m", "ok")] * 4
+    assert p.stats()["text:m"] == {"timeout": 0.5, "outcomes": {"ok": 4}}
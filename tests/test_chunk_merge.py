@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+import analyzer
+
+NAME = analyzer.REQUIREMENTS[0]
+
+
+def chunk(status, score=50):
+    return {
+        "validacao": [{"item": NAME, "status": status, "detalhes": status}],
+        "pontuacao_final": score,
+        "melhorias_recomendadas": "",
+    }
+
+
+def merged_status(results, weights):
+    merged = analyzer.merge_chunk_results(results, weights)
+    return merged["validacao"][0]["status"]
+
+
+def test_status_weighted_by_chunk_size():
+    results = [chunk("Atende"), chunk("Parcial"), chunk("Parcial")]
+    assert merged_status(results, [5000, 1000, 1000]) == "Atende"
+    assert merged_status(results, [1000, 1000, 1000]) == "Parcial"
+
+
+def test_tie_goes_to_earliest_chunk():
+    results = [chunk("Parcial"), chunk("Atende")]
+    assert merged_status(results, [1000, 1000]) == "Parcial"
+    assert merged_status(results[::-1], [1000, 1000]) == "Atende"
+
+
+def test_tie_is_independent_of_hash_seed():
+    code = (
+        "import analyzer\n"
+        f"r = [{chunk('Atende')!r}, {chunk('Parcial')!r}]\n"
+        "print(analyzer.merge_chunk_results(r, [1, 1])['validacao'][0]['status'])"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    seen = set()
+    for seed in range(1, 7):
+        env = dict(os.environ, PYTHONHASHSEED=str(seed))
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=root,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        seen.add(out.stdout.strip())
+    assert seen == {"Atende"}
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+import pytest
+
+import analyzer
+from folder_watch import FolderWatcher, WatchIndex
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+@pytest.fixture
+def watch(tmp_path, monkeypatch):
+    """
+    Run run_watch() on a fresh folder with `result` as the outcome of every
+    analysis; returns (folder, db_path, analyzed paths, run).
+    """
+    folder = tmp_path / "cvs"
+    folder.mkdir()
+    db_path = str(tmp_path / "watch.db")
+    monkeypatch.setattr(analyzer, "WATCH_DB", db_path)
+    monkeypatch.setattr(analyzer, "WATCH_DEBOUNCE", 0.05)
+    monkeypatch.setattr(analyzer, "WATCH_INTERVAL", 0.05)
+    analyzed = []
+
+    def run(result, until):
+        def validate(path, text_model, image_model, use_cache):
+            analyzed.append(path)
+            name = os.path.basename(path)
+            return {"id": len(analyzed), "file": name, "result": result}
+
+        monkeypatch.setattr(analyzer, "validate_resume_local", validate)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=analyzer.run_watch,
+            args=(str(folder), "m"),
+            kwargs={"stop": stop},
+        )
+        thread.start()
+        try:
+            assert wait_for(until)
+            time.sleep(0.2)
+        finally:
+            stop.set()
+            thread.join(10)
+
+    return folder, db_path, analyzed, run
+
+
+def test_failed_analysis_is_not_recorded(watch):
+    folder, db_path, analyzed, run = watch
+    (folder / "cv.pdf").write_bytes(b"%PDF-1.4 cv")
+
+    run({"error": "Falha ao converter JSON: Nenhum JSON encontrado"}, lambda: analyzed)
+    assert WatchIndex(db_path).count() == 0
+
+    # after a restart the unchanged file is analyzed again
+    run({"pontuacao_final": 80}, lambda: len(analyzed) == 2)
+    assert WatchIndex(db_path).count() == 1
+
+
+def test_analyzed_file_is_skipped_after_restart(watch):
+    folder, db_path, analyzed, run = watch
+    (folder / "cv.pdf").write_bytes(b"%PDF-1.4 cv")
+
+    run({"pontuacao_final": 80}, lambda: analyzed)
+    run({"pontuacao_final": 80}, lambda: True)
+
+    assert len(analyzed) == 1
+    assert WatchIndex(db_path).count() == 1
+
+
+def test_polling_notices_new_and_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(FolderWatcher, "_observe", lambda self: None)
+    index = WatchIndex(str(tmp_path / "watch.db"))
+    ready = []
+
+    def on_ready(path, stat, digest):
+        ready.append(os.path.basename(path))
+        index.put(path, stat[0], stat[1], digest)
+
+    watcher = FolderWatcher(
+        tmp_path, index, on_ready, [".pdf"], debounce=0.05, interval=0.1
+    )
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, args=(stop,))
+    thread.start()
+    try:
+        (tmp_path / "a.pdf").write_bytes(b"one")
+        (tmp_path / "notes.txt").write_bytes(b"ignored")
+        assert wait_for(lambda: ready == ["a.pdf"])
+        (tmp_path / "a.pdf").write_bytes(b"two")
+        assert wait_for(lambda: ready == ["a.pdf", "a.pdf"])
+        time.sleep(0.3)
+    finally:
+        stop.set()
+        thread.join(5)
+    assert ready == ["a.pdf", "a.pdf"]
@@ -0,0 +1,90 @@
+import pytest
+
+from history_store import HistoryIndex, JsonlStore
+
+
+def entry(file, score, model, statuses, text="", melhorias=""):
+    return {
+        "timestamp": f"2024-01-0{score // 10}T10:00:00",
+        "file": file,
+        "text_model": model,
+        "text": text,
+        "result": {
+            "pontuacao_final": score,
+            "validacao": [
+                {"item": item, "status": status, "detalhes": f"{item}: {status}"}
+                for item, status in statuses.items()
+            ],
+            "melhorias_recomendadas": melhorias,
+        },
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = HistoryIndex(
+        str(tmp_path / "history.db"),
+        JsonlStore(str(tmp_path / "results.jsonl")),
+        text_loader=lambda e: e.get("text"),
+    )
+    ids = {}
+    for e in (
+        entry("ana.pdf", 85, "llama", {"Python": "Atende"}, "Engenheira de dados"),
+        entry("bruno.pdf", 40, "qwen", {"Python": "Não atende"}, "Vendedor"),
+        entry("carla.pdf", 65, "llama", {"Inglês": "Atende parcialmente"}),
+        entry("davi.pdf", 70, "qwen", {"Python": "atende"}, melhorias="Certificação"),
+    ):
+        ids[e["file"]] = index.add(e)
+    index.ids = ids
+    return index
+
+
+def files(index, **filters):
+    assert index.count(**filters) == len(index.page(**filters))
+    return sorted(row["file"] for row in index.page(**filters))
+
+
+def test_score_range(index):
+    assert files(index, min_score=65) == ["ana.pdf", "carla.pdf", "davi.pdf"]
+    assert files(index, max_score=65) == ["bruno.pdf", "carla.pdf"]
+    assert files(index, min_score=50, max_score=80) == ["carla.pdf", "davi.pdf"]
+
+
+def test_text_model(index):
+    assert files(index, text_model="qwen") == ["bruno.pdf", "davi.pdf"]
+
+
+def test_item_and_status_ignore_case_and_accents(index):
+    assert files(index, item="python") == ["ana.pdf", "bruno.pdf", "davi.pdf"]
+    assert files(index, item="Python", status="ATENDE") == ["ana.pdf", "davi.pdf"]
+    assert files(index, item="ingles", status="atende") == ["carla.pdf"]
+    assert files(index, status="nao") == ["bruno.pdf"]
+
+
+def test_full_text_query(index):
+    # file name, document text, detalhes and melhorias are all searched
+    assert files(index, query="bruno") == ["bruno.pdf"]
+    assert files(index, query="engenh") == ["ana.pdf"]
+    assert files(index, query="ingles") == ["carla.pdf"]
+    assert files(index, query="certificacao") == ["davi.pdf"]
+    # every word is required; quotes cannot break the MATCH syntax
+    assert files(index, query='python "atende') == ["ana.pdf", "bruno.pdf", "davi.pdf"]
+    assert files(index, query="python vendedor") == ["bruno.pdf"]
+
+
+def test_filters_combine(index):
+    assert files(index, query="python", text_model="llama", min_score=80) == [
+        "ana.pdf"
+    ]
+
+
+def test_deleted_entries_leave_the_index(index, tmp_path):
+    index.delete(index.ids["davi.pdf"])
+    assert files(index, text_model="qwen") == ["bruno.pdf"]
+    assert files(index, query="certificacao") == []
+
+    # the tombstone is in the journal: a fresh index agrees
+    rebuilt = HistoryIndex(str(tmp_path / "rebuilt.db"), index.journal)
+    rebuilt.sync()
+    assert files(rebuilt) == ["ana.pdf", "bruno.pdf", "carla.pdf"]
+    assert [e["file"] for e in rebuilt] == ["ana.pdf", "bruno.pdf", "carla.pdf"]
@@ -0,0 +1,55 @@
+import sys
+import types
+
+import analyzer
+import image_prep
+
+
+class FakePixmap:
+    """
+    Enough of pymupdf.Pixmap for prepare_images: built from "image bytes"
+    that are the grayscale samples themselves.
+    """
+
+    alpha = False
+    colorspace = None
+
+    def __init__(self, *args):
+        source = args[-1]
+        self.samples = source if isinstance(source, bytes) else source.samples
+        self.width = self.height = 100
+
+    def shrink(self, factor):
+        pass
+
+
+def fake_pymupdf(monkeypatch):
+    module = types.SimpleNamespace(Pixmap=FakePixmap, csGRAY="gray", csRGB="rgb")
+    monkeypatch.setitem(sys.modules, "pymupdf", module)
+
+
+def text_scan():
+    # black glyphs on a white page: ~10% dark pixels, entropy below 1 bit
+    return (b"\xff" * 9 + b"\x00") * 1000
+
+
+def solid_fill():
+    return b"\xee" * 10000
+
+
+def test_text_scan_entropy_is_above_threshold(monkeypatch):
+    fake_pymupdf(monkeypatch)
+    entropy = image_prep.image_entropy(FakePixmap(text_scan()))
+    assert analyzer.OCR_MIN_ENTROPY < entropy < 1.0
+
+
+def test_text_scans_are_kept_and_fills_dropped(monkeypatch):
+    fake_pymupdf(monkeypatch)
+    images = [("page0_0.png", text_scan()), ("page0_1.png", solid_fill())]
+
+    kept, skipped = image_prep.prepare_images(
+        images, min_entropy=analyzer.OCR_MIN_ENTROPY
+    )
+
+    assert [name for name, _ in kept] == ["page0_0.png"]
+    assert skipped["low_entropy"] == 1
@@ -0,0 +1,17 @@
+import benchmark
+
+
+def test_import_main_within_budget():
+    best, _ = benchmark.measure_import("main")
+    assert best <= benchmark.IMPORT_BUDGET_MS, f"import main took {best:.0f} ms"
+
+
+def test_import_main_leaves_heavy_modules_unloaded():
+    _, loaded = benchmark.measure_import("main", runs=1)
+    assert loaded == []
+
+
+def test_check_import_time_reports_lazy_modules(monkeypatch):
+    monkeypatch.setattr(benchmark, "LAZY_MODULES", ["json"])
+    _, problems = benchmark.check_import_time(module="analyzer", runs=1)
+    assert "import analyzer carregou json" in problems
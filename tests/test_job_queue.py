@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+import analyzer
+from job_queue import CANCELLED, DONE, JobScheduler
+from metrics import StageTrace
+from ollama_client import CancelToken, OllamaCancelled
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class Recorder:
+    """
+    A run() for JobScheduler whose jobs block until released; records the
+    order jobs (and steps) start in and the peak number running at once.
+    """
+
+    def __init__(self, steps=1):
+        self.steps = steps
+        self.started = []
+        self.gates = {}
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def gate(self, path):
+        return self.gates.setdefault(path, threading.Event())
+
+    def __call__(self, job, events):
+        with self.lock:
+            self.started.append((job.path, job.step))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        self.gate(job.path).wait(5)
+        with self.lock:
+            self.running -= 1
+        if job.step + 1 < self.steps:
+            return True
+        events.put(("ok", job.path))
+        return False
+
+
+def test_slots_limit_parallel_jobs():
+    run = Recorder()
+    scheduler = JobScheduler(run, slots=2)
+    jobs = [scheduler.submit(f"cv{i}.pdf") for i in range(5)]
+
+    assert wait_for(lambda: run.running == 2)
+    time.sleep(0.05)
+    assert scheduler.running_count() == 2
+    for job in jobs:
+        run.gate(job.path).set()
+    assert wait_for(lambda: all(j.status == DONE for j in jobs))
+    assert run.peak == 2
+
+
+def test_higher_priority_starts_first():
+    run = Recorder()
+    scheduler = JobScheduler(run, slots=1)
+    first = scheduler.submit("first.pdf")
+    assert wait_for(lambda: run.started)
+    scheduler.submit("low.pdf", priority=0)
+    high = scheduler.submit("high.pdf", priority=0)
+    assert scheduler.set_priority(high.id, 5)
+
+    for path in ("first.pdf", "low.pdf", "high.pdf"):
+        run.gate(path).set()
+    assert wait_for(lambda: len(run.started) == 3)
+    assert [p for p, _ in run.started] == ["first.pdf", "high.pdf", "low.pdf"]
+    assert first.status == DONE
+
+
+def test_affinity_prefers_jobs_sharing_a_running_model():
+    run = Recorder()
+    models = {"a.pdf": "x", "b.pdf": "y", "c.pdf": "x", "d.pdf": "x"}
+    scheduler = JobScheduler(
+        run, slots=2, affinity=lambda job: models[job.path]
+    )
+    scheduler.submit("a.pdf")
+    assert wait_for(lambda: run.started)
+    scheduler.submit("b.pdf")  # needs another model: waits
+    scheduler.submit("c.pdf")  # shares "x" with the running job
+    assert wait_for(lambda: len(run.started) == 2)
+    assert run.started[1][0] == "c.pdf"
+
+    for path in models:
+        run.gate(path).set()
+    assert wait_for(lambda: len(run.started) == 3)
+    assert sorted(p for p, _ in run.started) == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_job_cancelled_between_steps_does_not_run_step_two():
+    run = Recorder(steps=2)
+    events = []
+    scheduler = JobScheduler(run, slots=1, on_event=lambda j, s, p: events.append(s))
+    job = scheduler.submit("cv.pdf")
+    assert wait_for(lambda: run.started)
+
+    # cancelled while step 0 finishes: the job must not be requeued
+    scheduler.cancel(job.id)
+    run.gate("cv.pdf").set()
+
+    assert wait_for(lambda: job.finished)
+    assert job.status == CANCELLED
+    assert run.started == [("cv.pdf", 0)]
+    assert "requeued" not in events and "ok" not in events
+
+
+def test_cancelled_analysis_is_not_saved_on_a_cache_hit(monkeypatch):
+    cached = (
+        '{"validacao": [], "pontuacao_final": 50, "melhorias_recomendadas": ""}'
+    )
+    cache = type(
+        "Hit",
+        (),
+        {"get": lambda self, key: cached.encode(), "put": lambda self, k, v: None},
+    )()
+    saved = []
+    monkeypatch.setattr(analyzer, "response_cache", cache)
+    monkeypatch.setattr(analyzer, "save_result_entry", saved.append)
+    prepared = {
+        "path": "cv.pdf",
+        "trace": StageTrace(),
+        "text": "texto",
+        "ocr_text": "",
+        "image_model": None,
+        "ocr_skipped": {},
+        "seconds": 0.0,
+    }
+    token = CancelToken()
+    token.cancel()
+
+    with pytest.raises(OllamaCancelled):
+        analyzer.analyze_prepared(prepared, "m", use_cache=True, cancel=token)
+    assert saved == []
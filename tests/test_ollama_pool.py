@@ -0,0 +1,116 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmark import FakeOllama
+from ollama_pool import OllamaPool
+
+
+class BrokenOllama:
+    """
+    A server that answers every request with `status` and `body`; the
+    (status, body) `answer` can be replaced while it runs.
+    """
+
+    def __init__(self, status=502, body=b'{"error": "bad gateway"}'):
+        self.answer = (status, body)
+        broken = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _answer(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                # one read: a body swapped mid-answer would not match its length
+                status, body = broken.answer
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _answer
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address[:2]
+        self.url = f"http://{host}:{port}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fakes():
+    servers = [FakeOllama(latency=0.01, token_rate=1e6).start() for _ in range(3)]
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_requests_are_spread_over_the_servers(fakes):
+    pool = OllamaPool([f.url for f in fakes], health_interval=0)
+    try:
+        for _ in range(9):
+            pool.generate("m", "x")
+    finally:
+        pool.close()
+    assert [f.requests for f in fakes] == [3, 3, 3]
+
+
+def test_unreachable_server_is_skipped_and_ejected(fakes):
+    dead = "http://127.0.0.1:1"
+    pool = OllamaPool([dead, fakes[0].url], health_interval=0, max_failures=1)
+    try:
+        for _ in range(4):
+            assert pool.generate("m", "x")["response"]
+        stats = {s["host"]: s for s in pool.stats()}
+    finally:
+        pool.close()
+    assert not stats[dead]["available"]
+    assert fakes[0].requests == 4
+
+
+@pytest.mark.parametrize(
+    "status, body",
+    [(502, b'{"error": "bad gateway"}'), (200, b"<html>proxy</html>")],
+)
+def test_health_checks_survive_a_broken_endpoint(fakes, status, body):
+    broken = BrokenOllama(status, body)
+    fakes[0].use_model("m")
+    pool = OllamaPool(
+        [broken.url, fakes[0].url], health_interval=0.05, max_failures=1
+    )
+    try:
+        pool._start_health_checks()
+        assert wait_for(
+            lambda: not {s["host"]: s for s in pool.stats()}[broken.url]["available"]
+        )
+        assert pool._health_thread.is_alive()
+        assert [m["host"] for m in pool.ps()] == [fakes[0].url]
+
+        # once it answers /api/ps again it is brought back
+        broken.answer = (200, b'{"models": []}')
+        assert wait_for(
+            lambda: {s["host"]: s for s in pool.stats()}[broken.url]["available"]
+        )
+        assert pool._health_thread.is_alive()
+    finally:
+        pool.close()
+        broken.stop()
@@ -0,0 +1,73 @@
+import sys
+import types
+
+import page_extract
+
+
+class FakePage:
+    def __init__(self, index):
+        self.index = index
+
+    def get_images(self, full=False):
+        return []
+
+    def get_text(self):
+        return f"página {self.index}"
+
+
+class FakePdf:
+    def __init__(self, pages):
+        self.page_count = pages
+
+    def __getitem__(self, index):
+        return FakePage(index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def fake_pymupdf(monkeypatch, pages):
+    opened = []
+
+    def open_pdf(path):
+        opened.append(path)
+        return FakePdf(pages)
+
+    module = types.SimpleNamespace(open=open_pdf)
+    monkeypatch.setitem(sys.modules, "pymupdf", module)
+    return opened
+
+
+def test_small_pdf_is_opened_once_with_several_workers(monkeypatch):
+    opened = fake_pymupdf(monkeypatch, pages=2)
+
+    pages = list(page_extract.iter_pdf("cv.pdf", workers=4, min_pages=50))
+
+    assert [p[:2] for p in pages] == [(0, "página 0"), (1, "página 1")]
+    assert opened == ["cv.pdf"]
+
+
+def test_single_worker_opens_once(monkeypatch):
+    opened = fake_pymupdf(monkeypatch, pages=80)
+
+    pages = list(page_extract.iter_pdf("big.pdf", workers=1, min_pages=50))
+
+    assert len(pages) == 80
+    assert opened == ["big.pdf"]
+
+
+def test_pools_are_keyed_on_workers_and_spawned():
+    try:
+        two = page_extract._get_pool(2)
+        assert page_extract._get_pool(2) is two
+        three = page_extract._get_pool(3)
+        assert three is not two
+        assert three._max_workers == 3
+        assert two._mp_context.get_start_method() == "spawn"
+        assert two.submit(page_extract.default_workers).result(timeout=60) >= 1
+    finally:
+        page_extract.shutdown_pools()
+    assert page_extract._pools == {}
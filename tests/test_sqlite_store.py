@@ -0,0 +1,26 @@
+import os
+import threading
+
+from sqlite_store import LocalConnection
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, value TEXT);"
+
+
+def test_connection_per_thread_sees_the_same_database(tmp_path):
+    db = LocalConnection(os.path.join(tmp_path, "sub", "store.sqlite3"), SCHEMA)
+    conn = db.get()
+    assert db.get() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.execute("INSERT INTO items VALUES ('a', '1')")
+
+    seen = {}
+
+    def other():
+        seen["conn"] = db.get()
+        seen["rows"] = seen["conn"].execute("SELECT key, value FROM items").fetchall()
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    thread.join()
+    assert seen["conn"] is not conn
+    assert seen["rows"] == [("a", "1")]
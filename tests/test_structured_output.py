@@ -0,0 +1,76 @@
+import json
+
+import analyzer
+
+
+def valid_result():
+    return {
+        "validacao": [
+            {"item": name, "status": "Atende", "detalhes": "ok"}
+            for name in analyzer.REQUIREMENTS
+        ],
+        "pontuacao_final": 80,
+        "melhorias_recomendadas": "nenhuma",
+    }
+
+
+def fake_chat(responses, prompts):
+    def chat(model, prompt, options=None, use_cache=True, **kwargs):
+        prompts.append(prompt)
+        return responses.pop(0), False
+
+    return chat
+
+
+def test_unparseable_reply_is_repaired(monkeypatch):
+    prompts = []
+    responses = ["Desculpe, não consigo.", json.dumps(valid_result())]
+    monkeypatch.setattr(analyzer, "cached_ollama_chat", fake_chat(responses, prompts))
+
+    data, response, _, repaired = analyzer.analyze_with_schema("m", "PROMPT")
+
+    assert "error" not in data
+    assert data["pontuacao_final"] == 80
+    assert len(prompts) == 2
+    assert prompts[1].startswith("PROMPT")
+    assert "Desculpe" not in prompts[1]
+    assert repaired and repaired[0]["validacao"] == analyzer.REQUIREMENTS
+
+
+def test_repair_resends_only_the_failed_fields(monkeypatch):
+    partial = valid_result()
+    partial["pontuacao_final"] = "alta"
+    prompts = []
+    responses = [json.dumps(partial), json.dumps({"pontuacao_final": 70})]
+    monkeypatch.setattr(analyzer, "cached_ollama_chat", fake_chat(responses, prompts))
+
+    data, _, _, repaired = analyzer.analyze_with_schema("m", "PROMPT")
+
+    assert data["pontuacao_final"] == 70
+    assert data["validacao"] == partial["validacao"]
+    assert "- pontuacao_final" in prompts[1]
+    assert "validacao:" not in prompts[1]
+    assert partial["melhorias_recomendadas"] not in prompts[1]
+
+
+def test_repair_prompt_of_a_full_chunk_fits_the_context():
+    model = analyzer.TEXT_MODELS[0]
+    budget = analyzer.text_token_budget(model)
+    chunk = "x" * int(budget * analyzer.CHARS_PER_TOKEN)
+    prompt = analyzer.build_prompt(chunk, analyzer.REQUIREMENTS, part=(1, 2))
+    repair = analyzer.build_repair_prompt(prompt, analyzer.ALL_FIELDS_FAILED)
+
+    used = analyzer.estimate_tokens(repair) + analyzer.RESPONSE_TOKEN_RESERVE
+    assert used <= analyzer.context_tokens(model)
+
+
+def test_unparseable_reply_without_repair_is_an_error(monkeypatch):
+    prompts = []
+    responses = ["sem json", "ainda sem json"]
+    monkeypatch.setattr(analyzer, "cached_ollama_chat", fake_chat(responses, prompts))
+
+    data, _, _, repaired = analyzer.analyze_with_schema("m", "PROMPT")
+
+    assert data["error"].startswith("Falha ao converter JSON")
+    assert data["raw"] == "sem json"
+    assert repaired == []